@@ -0,0 +1,62 @@
+"""add_ticket_fee_function
+
+Revision ID: b5f1ea89f506
+Revises: f5a8d2c61e47
+Create Date: 2026-10-17 16:20:07.104512
+
+ticket_fee(entry_time, exit_time, vehicle_type_rate, default_rate): the
+flat-rate fee of services/pricing.calculate_fee as an IMMUTABLE SQL function.
+Set-based reports can then compute fees inside the aggregation. It takes
+the rates as arguments, so it reads no tables and the planner can inline it.
+
+- whole minutes parked, at least one (floored, like billed_hours());
+- started hours of those minutes;
+- times the vehicle type rate, else the garage default_rate, else 0;
+- 0 when either time is missing.
+
+One overload per timestamp type, so the subtraction happens in the type of
+the ticket columns, without a session time zone cast.
+
+Day/night tariff schedules (USE_TARIFF_SCHEDULES) are not applied here.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5f1ea89f506"
+down_revision: Union[str, Sequence[str], None] = "f5a8d2c61e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_TYPES = ("timestamp", "timestamptz")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for ts in TIMESTAMP_TYPES:
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION ticket_fee(
+              entry_time {ts}, exit_time {ts}, vehicle_type_rate numeric, default_rate numeric
+            ) RETURNS numeric
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$
+              SELECT CASE
+                WHEN entry_time IS NULL OR exit_time IS NULL THEN 0
+                ELSE CAST(
+                       CEIL(GREATEST(1, FLOOR(EXTRACT(EPOCH FROM exit_time - entry_time) / 60)) / 60)
+                       AS bigint
+                     ) * COALESCE(vehicle_type_rate, default_rate, 0)
+              END
+            $$
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for ts in TIMESTAMP_TYPES:
+        op.execute(f"DROP FUNCTION IF EXISTS ticket_fee({ts}, {ts}, numeric, numeric)")
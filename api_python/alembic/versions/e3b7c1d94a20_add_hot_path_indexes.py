@@ -0,0 +1,105 @@
+"""add_hot_path_indexes
+
+Revision ID: e3b7c1d94a20
+Revises: c2559069f3b5
+Create Date: 2026-10-17 10:12:41.318204
+
+Indexes for the queries that run on every gate event and dashboard refresh:
+
+- ix_tickets_open_spot_id: occupancy checks (NOT EXISTS open ticket on spot,
+  free-spot allocation, spot lists).
+- ix_tickets_open_garage_id: open tickets per garage (status cards).
+- ix_tickets_unpaid_garage_id: unpaid / partially paid per garage.
+- ix_tickets_garage_id_entry_time: dashboard ticket list filtered by garage
+  and entry date.
+- ix_payments_ticket_id: payment sums per ticket (amount included so the sum
+  is an index-only scan).
+- ix_payments_paid_at_id: revenue ranges and the payments list order.
+
+Built with CREATE INDEX CONCURRENTLY so gates keep writing during the
+migration; that cannot run inside a transaction, hence autocommit_block().
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b7c1d94a20"
+down_revision: Union[str, Sequence[str], None] = "c2559069f3b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tickets_open_spot_id",
+            "tickets",
+            ["spot_id"],
+            postgresql_where=sa.text("ticket_state = 'OPEN'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_tickets_open_garage_id",
+            "tickets",
+            ["garage_id"],
+            postgresql_where=sa.text("ticket_state = 'OPEN'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_tickets_unpaid_garage_id",
+            "tickets",
+            ["garage_id"],
+            postgresql_where=sa.text(
+                "payment_status IN ('UNPAID', 'PARTIALLY_PAID')"
+            ),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_tickets_garage_id_entry_time",
+            "tickets",
+            ["garage_id", "entry_time"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_payments_ticket_id",
+            "payments",
+            ["ticket_id"],
+            postgresql_include=["amount"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_payments_paid_at_id",
+            "payments",
+            ["paid_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, name in (
+            ("payments", "ix_payments_paid_at_id"),
+            ("payments", "ix_payments_ticket_id"),
+            ("tickets", "ix_tickets_garage_id_entry_time"),
+            ("tickets", "ix_tickets_unpaid_garage_id"),
+            ("tickets", "ix_tickets_open_garage_id"),
+            ("tickets", "ix_tickets_open_spot_id"),
+        ):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,55 @@
+"""add_daily_revenue_rollup
+
+Revision ID: f5a8d2c61e47
+Revises: e3b7c1d94a20
+Create Date: 2026-10-17 14:05:19.552830
+
+Per-garage, per-UTC-day payment totals, maintained by the payments API in the
+same transaction as the payment write and backfilled here from history.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f5a8d2c61e47"
+down_revision: Union[str, Sequence[str], None] = "e3b7c1d94a20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "daily_revenue",
+        sa.Column(
+            "garage_id",
+            sa.Integer(),
+            sa.ForeignKey("parking_config.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("amount", sa.Numeric(), nullable=False, server_default="0"),
+        sa.Column("payment_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        INSERT INTO daily_revenue (garage_id, day, amount, payment_count)
+        SELECT t.garage_id,
+               (p.paid_at::timestamptz AT TIME ZONE 'UTC')::date,
+               SUM(p.amount),
+               COUNT(*)
+        FROM payments p
+        JOIN tickets t ON t.id = p.ticket_id
+        WHERE p.paid_at IS NOT NULL
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_revenue")
@@ -0,0 +1,127 @@
+"""
+Small in-process LRU cache with a TTL, for read-heavy endpoints that are
+polled (dashboard). Thread-safe; one instance per cached endpoint. Every
+instance registers itself in CACHES (unless register=False) so GET
+/admin/cache can report hit/miss counters.
+
+get_or_compute() computes outside the lock. An invalidate() that matches a
+key while it is being computed bumps the key's generation, and the result
+(computed from pre-write data) is returned but not stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+CACHES: dict[str, "TTLCache"] = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(
+        self, name: str, maxsize: int, ttl_seconds: float, register: bool = True
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Keys being computed: key -> [computations in flight, generation].
+        self._computing: dict[Hashable, list[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if register:
+            CACHES[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # Caller holds the lock.
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing (outside the lock) on a miss."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            computing = self._computing.setdefault(key, [0, 0])
+            computing[0] += 1
+            generation = computing[1]
+        try:
+            value = compute()
+            with self._lock:
+                if self.enabled and computing[1] == generation:
+                    self._store(key, value)
+        finally:
+            with self._lock:
+                computing[0] -= 1
+                if not computing[0]:
+                    del self._computing[key]
+        return value
+
+    def _bump_computing(self, predicate: Callable[[Hashable], bool]) -> None:
+        # Caller holds the lock.
+        for key, computing in self._computing.items():
+            if predicate(key):
+                computing[1] += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop entries whose key matches; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            self._bump_computing(predicate)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bump_computing(lambda key: True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,132 @@
+"""
+Per-garage change versions for ETag / If-None-Match (app/etag.py).
+
+Every committed write that reaches garage_data_changed() bumps the garage's
+version and the global one; an unknown garage (None) also bumps the epoch that
+every per-garage tag includes. Versions live in a shared-memory table like the
+occupancy counters, so all workers on the host hand out the same tags. A
+random nonce, drawn when the table is created, keeps tags from a previous
+table (restart, or a per-process table in another worker) from matching.
+
+Only bump() claims a garage's slot; reading a tag for a garage that was never
+written claims nothing. forget() frees a deleted garage's slot. Each slot also
+records when it was last bumped, so replica reads can avoid tagging lagging
+data with a new version (read_routing.recent_garage_change).
+"""
+
+import secrets
+import time
+
+from api_python.app.config import (
+    CHANGE_VERSIONS_SHM_NAME,
+    OCCUPANCY_MAX_GARAGES,
+    OCCUPANCY_SHARED_MEMORY,
+)
+from api_python.app.invalidation import on_garage_change
+from api_python.app.shm import SharedCells
+
+# Header cells, then (garage_id, version, bumped_at_ms) slots. garage_id 0
+# marks a never used slot, _FREED one released by forget() (probing goes on).
+_NONCE, _EPOCH, _GLOBAL, _EPOCH_BUMPED_AT, _GLOBAL_BUMPED_AT = 0, 1, 2, 3, 4
+_HEADER = 5
+_SLOT_WIDTH = 3
+_FREED = -1
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class ChangeVersions:
+    def __init__(self, name: str, max_garages: int, shared: bool) -> None:
+        self.max_garages = max(1, max_garages)
+        self._table = SharedCells(
+            name, _HEADER + self.max_garages * _SLOT_WIDTH, shared
+        )
+        self._cells = self._table.cells
+        self._lock = self._table.lock
+        with self._lock:
+            if not self._cells[_NONCE]:
+                self._cells[_NONCE] = secrets.randbits(62) or 1
+
+    def close(self) -> None:
+        self._table.close()
+
+    def _find(self, garage_id: int) -> tuple[int | None, int | None]:
+        """(garage_id's slot, first reusable slot); caller holds the lock."""
+        start = (garage_id * 2654435761) % self.max_garages
+        free = None
+        for probe in range(self.max_garages):
+            base = _HEADER + ((start + probe) % self.max_garages) * _SLOT_WIDTH
+            slot_garage = self._cells[base]
+            if slot_garage == garage_id:
+                return base, None
+            if slot_garage == _FREED and free is None:
+                free = base
+            elif slot_garage == 0:
+                return None, base if free is None else free
+        return None, free
+
+    def bump(self, garage_id: int | None) -> None:
+        with self._lock:
+            now = _now_ms()
+            self._cells[_GLOBAL] += 1
+            self._cells[_GLOBAL_BUMPED_AT] = now
+            if garage_id is None:
+                self._cells[_EPOCH] += 1
+                self._cells[_EPOCH_BUMPED_AT] = now
+                return
+            slot, free = self._find(garage_id)
+            if slot is None and free is not None:
+                slot = free
+                self._cells[slot] = garage_id
+                self._cells[slot + 1] = 0
+            if slot is not None:
+                self._cells[slot + 1] += 1
+                self._cells[slot + 2] = now
+
+    def forget(self, garage_id: int) -> None:
+        """Free a deleted garage's slot; every per-garage tag changes."""
+        with self._lock:
+            slot, _ = self._find(garage_id)
+            if slot is None:
+                return
+            self._cells[slot] = _FREED
+            self._cells[_EPOCH] += 1
+            self._cells[_EPOCH_BUMPED_AT] = _now_ms()
+
+    def tag(self, garage_id: int | None) -> str:
+        """Changes whenever data of garage_id (None: any garage) may have changed."""
+        with self._lock:
+            nonce = self._cells[_NONCE]
+            slot, free = (None, None) if garage_id is None else self._find(garage_id)
+            if slot is not None:
+                version = self._cells[slot + 1]
+            elif free is not None:
+                version = 0  # never written since the table was created
+            else:
+                # All garages, or no slot left: any write changes the tag.
+                return f"{nonce:x}.{self._cells[_GLOBAL]}"
+            return f"{nonce:x}.{self._cells[_EPOCH]}.{garage_id}.{version}"
+
+    def changed_within(self, garage_id: int | None, seconds: float) -> bool:
+        """Whether garage_id's tag (None: the all-garages tag) moved in the last seconds."""
+        with self._lock:
+            bumped_at = self._cells[_GLOBAL_BUMPED_AT]
+            if garage_id is not None:
+                slot, free = self._find(garage_id)
+                if slot is not None or free is not None:
+                    bumped_at = self._cells[_EPOCH_BUMPED_AT]
+                    if slot is not None:
+                        bumped_at = max(bumped_at, self._cells[slot + 2])
+        return _now_ms() - bumped_at < seconds * 1000
+
+
+versions = ChangeVersions(
+    CHANGE_VERSIONS_SHM_NAME, OCCUPANCY_MAX_GARAGES, OCCUPANCY_SHARED_MEMORY
+)
+
+
+@on_garage_change
+def _bump_version(garage_id: int | None) -> None:
+    versions.bump(garage_id)
@@ -32,11 +32,11 @@ _log = logging.getLogger(__name__)
 
 
 # _env_int je funkcija koja se koristi za konvertovanje stringa u integer
-def _env_int(name: str, default: int) -> int:
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
     raw = os.getenv(name, str(default)).strip()
     # strip is a function that is used to remove whitespace from the beginning and end of a string
     try:
-        return max(0, int(raw))
+        return max(minimum, int(raw))
     except ValueError:
         return default
 
@@ -112,10 +112,98 @@ def _normalize_and_validate_cors_origins(raw: str) -> tuple[list[str], list[str]
 # If False, API only sets exit_time; fee/state expected from a DB trigger.
 USE_API_FEE_CALCULATION: bool = _env_bool("USE_API_FEE_CALCULATION", default=False)
 
+# If True, garages with day_rate, night_rate, open_time and close_time set bill
+# day/night rates by time of day (UTC) instead of default_rate. Vehicle type
+# rates still take precedence. Only applies where the API computes fees.
+USE_TARIFF_SCHEDULES: bool = _env_bool("USE_TARIFF_SCHEDULES", default=False)
+
 # If True, API recalculates ticket.payment_status after create/update/delete.
 # If False, payment_status is expected to be updated by a DB trigger.
 USE_API_PAYMENT_STATUS: bool = _env_bool("USE_API_PAYMENT_STATUS", default=False)
 
+# If True, ticket entry/exit and payment creation run on an async engine
+# (AsyncSession, asyncpg) instead of the Starlette threadpool. Off by default.
+USE_ASYNC_DB: bool = _env_bool("USE_ASYNC_DB", default=False)
+
+# Connection pool of every engine (QueuePool); the defaults are SQLAlchemy's.
+# DB_POOL_TIMEOUT: seconds a checkout waits for a free connection.
+# DB_POOL_RECYCLE: reconnect connections older than this many seconds (0: never).
+# DB_POOL_PRE_PING: test a connection before reuse, so a restarted PostgreSQL
+# does not surface as request errors. DB_POOL_USE_LIFO: reuse the most recent
+# connection first, so idle ones can be closed server-side.
+DB_POOL_SIZE: int = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW: int = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT: int = _env_int("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE: int = _env_int("DB_POOL_RECYCLE", 0)
+DB_POOL_PRE_PING: bool = _env_bool("DB_POOL_PRE_PING", default=False)
+DB_POOL_USE_LIFO: bool = _env_bool("DB_POOL_USE_LIFO", default=False)
+
+# psycopg 3 (postgresql+psycopg://) prepares a statement server-side once it
+# has run DB_PREPARE_THRESHOLD times on a connection, keeping up to
+# DB_PREPARED_MAX per connection. -1 disables it (PgBouncer transaction mode).
+DB_PREPARE_THRESHOLD: int = _env_int("DB_PREPARE_THRESHOLD", 2, minimum=-1)
+DB_PREPARED_MAX: int = _env_int("DB_PREPARED_MAX", 100)
+
+# Read replica: when DATABASE_READ_URL is set, list/overview/analytics GETs use it.
+# After a client writes, its reads go to the primary for this many seconds
+# (read-your-writes; 0 disables the window). Reads of a garage any client
+# changed within the window go to the primary too, so an ETag carrying the
+# new change version never tags data from a lagging replica.
+DATABASE_READ_URL: str | None = os.getenv("DATABASE_READ_URL") or None
+DB_READ_YOUR_WRITES_SECONDS: int = _env_int("DB_READ_YOUR_WRITES_SECONDS", 5)
+
+# Per-request SQL statement counting (X-DB-Query-Count / X-DB-Time-Ms headers).
+# A statement repeated this many times in one request is logged as a likely N+1
+# (0 disables the warning).
+DB_QUERY_STATS: bool = _env_bool("DB_QUERY_STATS", default=True)
+DB_N_PLUS_ONE_THRESHOLD: int = _env_int("DB_N_PLUS_ONE_THRESHOLD", 5)
+
+# In-process cache for GET /dashboard/analytics. Writes invalidate the affected
+# garage; the TTL bounds staleness from other workers and direct DB edits.
+# TTL 0 disables the cache.
+DASHBOARD_CACHE_TTL_SECONDS: int = _env_int("DASHBOARD_CACHE_TTL_SECONDS", 30)
+DASHBOARD_CACHE_MAX_ENTRIES: int = _env_int("DASHBOARD_CACHE_MAX_ENTRIES", 256)
+
+# Occupancy counters per garage (free/occupied spots, open tickets) read by the
+# overview and status cards. With OCCUPANCY_SHARED_MEMORY the table lives in a
+# named shared-memory segment (OCCUPANCY_SHM_NAME) seen by every worker on the
+# host; otherwise each process keeps its own. OCCUPANCY_RECONCILE_SECONDS is
+# how often the table is recounted from the DB (0: only at startup).
+OCCUPANCY_SHARED_MEMORY: bool = _env_bool("OCCUPANCY_SHARED_MEMORY", default=True)
+OCCUPANCY_SHM_NAME: str = os.getenv("OCCUPANCY_SHM_NAME") or "parking_occupancy"
+OCCUPANCY_MAX_GARAGES: int = _env_int("OCCUPANCY_MAX_GARAGES", 1024)
+OCCUPANCY_RECONCILE_SECONDS: int = _env_int("OCCUPANCY_RECONCILE_SECONDS", 60)
+
+# Entry picks spots from a per-process index of free spot ids (loaded per
+# garage, rebuilt by the occupancy reconcile) and confirms the pick with a row
+# lock. After FREE_SPOT_PICK_RETRIES rejected picks, or with FREE_SPOT_INDEX
+# off, it scans parking_spot in SQL as before.
+FREE_SPOT_INDEX: bool = _env_bool("FREE_SPOT_INDEX", default=True)
+FREE_SPOT_PICK_RETRIES: int = _env_int("FREE_SPOT_PICK_RETRIES", 3)
+
+# ETag / If-None-Match on polled GETs (overview, analytics, timeline, ticket
+# dashboard, spots), from per-garage change versions bumped by every garage
+# write. The versions table follows OCCUPANCY_SHARED_MEMORY and
+# OCCUPANCY_MAX_GARAGES. ETAG_WINDOW_SECONDS also rolls every ETag over that
+# often, bounding staleness from open-ticket fees and direct DB edits
+# (0: versions only). The segment name carries the table layout version.
+ETAG_ENABLED: bool = _env_bool("ETAG_ENABLED", default=True)
+ETAG_WINDOW_SECONDS: int = _env_int("ETAG_WINDOW_SECONDS", 30)
+CHANGE_VERSIONS_SHM_NAME: str = (
+    os.getenv("CHANGE_VERSIONS_SHM_NAME") or "parking_change_versions_v2"
+)
+
+# Server-Sent Events stream of dashboard changes (GET /events/dashboard). With
+# DASHBOARD_EVENTS_PG_NOTIFY events travel through PostgreSQL LISTEN/NOTIFY so
+# every worker streams every write (needs a session-mode connection, not a
+# transaction-pooling proxy); otherwise only this process's writes are seen.
+# The last DASHBOARD_EVENTS_BUFFER events can be resumed with Last-Event-ID.
+DASHBOARD_EVENTS_PG_NOTIFY: bool = _env_bool("DASHBOARD_EVENTS_PG_NOTIFY", default=True)
+DASHBOARD_EVENTS_HEARTBEAT_SECONDS: int = _env_int(
+    "DASHBOARD_EVENTS_HEARTBEAT_SECONDS", 15
+)
+DASHBOARD_EVENTS_BUFFER: int = _env_int("DASHBOARD_EVENTS_BUFFER", 1000)
+
 # CORS: set CORS_DISABLED=true to skip adding CORSMiddleware (server-only/same-origin).
 CORS_DISABLED: bool = _env_bool("CORS_DISABLED", default=False)
 
@@ -181,5 +269,15 @@ CORS_ALLOW_HEADERS: list[str] = [
     "Accept",
     "Authorization",
     "X-API-Key",
+    "X-Last-Write",
+    "If-None-Match",
+    "Last-Event-ID",
+]
+# Response headers browser code may read (CORS hides non-simple headers otherwise).
+CORS_EXPOSE_HEADERS: list[str] = [
+    "ETag",
+    "X-Last-Write",
+    "X-DB-Query-Count",
+    "X-DB-Time-Ms",
 ]
 
@@ -1,6 +1,32 @@
 ﻿import os
-from sqlalchemy import create_engine
+import weakref
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.requests import Request
+
+from api_python.app.config import (
+    DATABASE_READ_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_USE_LIFO,
+    DB_PREPARE_THRESHOLD,
+    DB_PREPARED_MAX,
+    USE_ASYNC_DB,
+)
+from api_python.app.db_metrics import (
+    PoolMetrics,
+    attach_pool_listeners,
+    attach_query_listeners,
+    metered_pool_class,
+)
+from api_python.app.read_routing import recent_garage_change, recent_write
 
 # Env is loaded in app.config (load_dotenv from project root). The app entry point
 # (api_python.app.main) must import api_python.app.config before api_python.app.db so DATABASE_URL is available.
@@ -16,11 +42,90 @@ _sql_echo = os.getenv("SQL_ECHO", "false").strip().lower() in ("true", "1", "yes
 # connect_timeout: fail fast if PostgreSQL is down instead of hanging (seconds)
 # wait max 5 seconds for the database to connect if variable DB_CONNECT_TIMEOUT is not set 
 _connect_timeout = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
-engine = create_engine(
-    DATABASE_URL,
-    echo=_sql_echo,
-    connect_args={"connect_timeout": _connect_timeout},
-)
+
+
+# Pool options (DB_POOL_* in app.config); -1 is SQLAlchemy's "never recycle".
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE or -1,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_use_lifo": DB_POOL_USE_LIFO,
+}
+
+# name -> (metrics, engine); read by GET /admin/db/pool
+POOL_METRICS: dict[str, tuple[PoolMetrics, Engine]] = {}
+
+# engine -> the metrics its pool class records into (set by the factories below)
+_ENGINE_METRICS: weakref.WeakKeyDictionary[Engine, PoolMetrics] = weakref.WeakKeyDictionary()
+
+
+def _register_pool_metrics(name: str, eng: Engine) -> None:
+    metrics = _ENGINE_METRICS[eng]
+    attach_pool_listeners(eng, metrics)
+    attach_query_listeners(eng)
+    POOL_METRICS[name] = (metrics, eng)
+
+
+def pool_stats() -> list[dict]:
+    """Snapshot of every registered engine pool (see db_metrics.PoolMetrics)."""
+    return [
+        metrics.snapshot(eng.pool) for metrics, eng in POOL_METRICS.values()
+    ]
+
+
+# psycopg 3 (postgresql+psycopg://) prepares a statement server-side once it
+# has run DB_PREPARE_THRESHOLD times on a connection, so the hot raw SQL
+# (spot allocation, overview aggregate, payment sums) is planned once per
+# connection instead of on every call. psycopg2 has no equivalent. asyncpg
+# prepares every statement and keeps its own per-connection cache, so these
+# settings do not apply to it; behind PgBouncer in transaction mode add
+# prepared_statement_cache_size=0 to ASYNC_DATABASE_URL.
+# Set DB_PREPARE_THRESHOLD=-1 behind PgBouncer in transaction mode.
+_prepare_threshold = DB_PREPARE_THRESHOLD
+_prepared_max = DB_PREPARED_MAX
+
+
+def _is_psycopg3(url: str) -> bool:
+    return make_url(url).get_driver_name() == "psycopg"
+
+
+def _connect_args(url: str) -> dict[str, Any]:
+    args: dict[str, Any] = {"connect_timeout": _connect_timeout}
+    if _is_psycopg3(url):
+        args["prepare_threshold"] = None if _prepare_threshold < 0 else _prepare_threshold
+    return args
+
+
+def _attach_prepared_max(eng) -> None:
+    """Cap psycopg 3's prepared statements per connection (sync and async engines)."""
+
+    @event.listens_for(eng, "connect")
+    def _set_prepared_max(dbapi_connection, connection_record):
+        # The async engine passes SQLAlchemy's adapter; the setting lives on
+        # the psycopg connection behind it.
+        connection = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+        connection.prepared_max = _prepared_max
+
+
+def _create_sync_engine(url: str, pool_name: str):
+    metrics = PoolMetrics(pool_name)
+    eng = create_engine(
+        url,
+        echo=_sql_echo,
+        connect_args=_connect_args(url),
+        poolclass=metered_pool_class(QueuePool, metrics),
+        **POOL_OPTIONS,
+    )
+    _ENGINE_METRICS[eng] = metrics
+    if _is_psycopg3(url):
+        _attach_prepared_max(eng)
+    _register_pool_metrics(pool_name, eng)
+    return eng
+
+
+engine = _create_sync_engine(DATABASE_URL, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -33,6 +138,93 @@ def get_db():
         db.close()
 
 
+# Read replica (DATABASE_READ_URL). Without it, reads share the primary engine.
+# Pointing DATABASE_READ_URL at the same database under a second URL exercises
+# the routing locally.
+if DATABASE_READ_URL:
+    read_engine = _create_sync_engine(DATABASE_READ_URL, "replica")
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def get_db_readonly(request: Request):
+    """Session for list/overview/analytics reads.
+
+    Uses the replica unless this client wrote recently (read-your-writes) or
+    the requested garage changed recently (see read_routing).
+    """
+    use_primary = read_engine is engine or recent_write(request) or recent_garage_change(request)
+    factory = SessionLocal if use_primary else ReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _default_async_url(url: str) -> str:
+    """Same database as DATABASE_URL, reached through an async driver.
+
+    psycopg 3 URLs are kept as-is (the driver is async-capable); anything else
+    switches to asyncpg.
+    """
+    if _is_psycopg3(url):
+        return url
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
+# Async mode (USE_ASYNC_DB=true): a second engine on the same database so the
+# entry/exit/payment hot paths can await PostgreSQL instead of holding a
+# threadpool thread. Built only when enabled so asyncpg stays optional.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _default_async_url(
+    DATABASE_URL
+)
+async_engine = None
+AsyncSessionLocal = None
+
+
+def _create_async_engine(url: str, pool_name: str = "async"):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    metrics = PoolMetrics(pool_name)
+    eng = create_async_engine(
+        url,
+        echo=_sql_echo,
+        connect_args=(
+            _connect_args(url) if _is_psycopg3(url) else {"timeout": _connect_timeout}
+        ),
+        poolclass=metered_pool_class(AsyncAdaptedQueuePool, metrics),
+        **POOL_OPTIONS,
+    )
+    _ENGINE_METRICS[eng.sync_engine] = metrics
+    if _is_psycopg3(url):
+        _attach_prepared_max(eng.sync_engine)
+    return eng
+
+
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = _create_async_engine(ASYNC_DATABASE_URL)
+    _register_pool_metrics("async", async_engine.sync_engine)
+    # expire_on_commit=False: attributes stay loaded after commit, so response
+    # serialization does not trigger lazy loads outside the event loop.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled (set USE_ASYNC_DB=true).")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 class Base(DeclarativeBase):
     pass
 
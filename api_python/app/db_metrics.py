@@ -0,0 +1,264 @@
+"""
+Database metrics.
+
+- Connection pool: counters are collected through SQLAlchemy pool event
+  listeners; checkout wait time is measured by a thin QueuePool subclass
+  because the pool has no "before checkout" event. Exposed by
+  GET /admin/db/pool.
+- Statements: before/after_cursor_execute listeners count statements and DB
+  time per request (QueryStatsMiddleware -> X-DB-Query-Count / X-DB-Time-Ms
+  headers and a log line) and flag N+1 patterns. query_budget() lets tests fail
+  when a route issues more statements than declared.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from api_python.app.config import DB_N_PLUS_ONE_THRESHOLD
+
+_log = logging.getLogger(__name__)
+
+# Checkouts that waited longer than this are counted as slow (milliseconds).
+SLOW_CHECKOUT_MS = 100.0
+
+
+class PoolMetrics:
+    """Thread-safe counters for one engine's pool."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.slow_waits = 0
+        self.timeouts = 0
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, elapsed_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            if elapsed_ms >= SLOW_CHECKOUT_MS:
+                self.slow_waits += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        """Counters plus live pool state (size/idle/overflow) at call time."""
+        with self._lock:
+            data = {
+                "name": self.name,
+                "connections_created": self.connections_created,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "waits": self.waits,
+                "wait_avg_ms": (self.wait_total_ms / self.waits) if self.waits else 0.0,
+                "wait_max_ms": self.wait_max_ms,
+                "slow_waits": self.slow_waits,
+                "timeouts": self.timeouts,
+            }
+        # QueuePool exposes these; other pool classes (e.g. NullPool) do not.
+        data["pool_size"] = pool.size() if hasattr(pool, "size") else None
+        data["idle"] = pool.checkedin() if hasattr(pool, "checkedin") else None
+        data["overflow"] = pool.overflow() if hasattr(pool, "overflow") else None
+        return data
+
+
+def metered_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Subclass of `base` that times every checkout into `metrics`.
+
+    A class attribute (not an instance one) so it survives pool.recreate()
+    on engine.dispose().
+    """
+
+    class MeteredPool(base):  # type: ignore[valid-type, misc]
+        _metrics = metrics
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                conn = super().connect()
+            except PoolTimeoutError:
+                self._metrics.record_wait(
+                    (time.perf_counter() - start) * 1000, timed_out=True
+                )
+                raise
+            self._metrics.record_wait((time.perf_counter() - start) * 1000)
+            return conn
+
+    MeteredPool.__name__ = f"Metered{base.__name__}"
+    return MeteredPool
+
+
+def attach_pool_listeners(engine, metrics: PoolMetrics) -> None:
+    """Register metrics listeners on the engine's pool (kept across dispose)."""
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    event.listen(engine, "invalidate", metrics.on_invalidate)
+
+
+# --- Per-request statement counting ---
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+
+class QueryStats:
+    """Statements and DB time observed in one scope (request or test block)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+        self.db_time_ms = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.db_time_ms += elapsed_ms
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run at least `threshold` times (likely N+1 loops)."""
+        if threshold <= 0:
+            return []
+        return [(sql, n) for sql, n in self.statements.items() if n >= threshold]
+
+
+_request_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar(
+    "request_query_stats", default=None
+)
+# Budgets are process-wide: TestClient runs the app in another thread, so a
+# context variable set in the test would not be visible to the route.
+_budgets: list[QueryStats] = []
+_budgets_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if _budgets:
+        with _budgets_lock:
+            for budget in _budgets:
+                budget.record(statement, elapsed_ms)
+
+
+def attach_query_listeners(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Count statements per request; report in headers and the log."""
+
+    async def dispatch(self, request: Request, call_next):
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_stats.reset(token)
+        response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+        response.headers[QUERY_TIME_HEADER] = f"{stats.db_time_ms:.1f}"
+        _log.debug(
+            "%s %s -> %s: %d queries, %.1f ms DB",
+            request.method,
+            request.url.path,
+            response.status_code,
+            stats.count,
+            stats.db_time_ms,
+        )
+        for sql, n in stats.repeated(DB_N_PLUS_ONE_THRESHOLD):
+            _log.warning(
+                "Possible N+1 in %s %s: statement ran %d times: %s",
+                request.method,
+                request.url.path,
+                n,
+                " ".join(sql.split())[:200],
+            )
+        return response
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Fail when more than `max_queries` statements run inside the block.
+
+    Usable as `with query_budget(3): client.get(...)` or as a decorator on a
+    test (then every request made by the test counts).
+    """
+
+    def __init__(self, max_queries: int) -> None:
+        self.max_queries = max_queries
+        self.stats = QueryStats()
+
+    def __enter__(self) -> "query_budget":
+        self.stats = QueryStats()
+        with _budgets_lock:
+            _budgets.append(self.stats)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        with _budgets_lock:
+            _budgets.remove(self.stats)
+        if exc_type is None and self.stats.count > self.max_queries:
+            listing = "\n".join(
+                f"  {n}x {' '.join(sql.split())[:160]}"
+                for sql, n in self.stats.statements.most_common()
+            )
+            raise QueryBudgetExceeded(
+                f"{self.stats.count} queries executed, budget is "
+                f"{self.max_queries}:\n{listing}"
+            )
+        return False
@@ -1,8 +1,9 @@
 ﻿from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from api_python.app.errors import build_error_payload
+from api_python.app.etag import NotModified
 
 
 def _legacy_detail_to_fields(detail: list[dict]) -> list[dict[str, str]]:
@@ -32,6 +33,13 @@ def register_exception_handlers(app: FastAPI) -> None:
             ),
         )
 
+    @app.exception_handler(NotModified)
+    async def not_modified_handler(request: Request, exc: NotModified):
+        return Response(
+            status_code=304,
+            headers={"ETag": exc.etag, "Cache-Control": "no-cache"},
+        )
+
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(
         request: Request, exc: RequestValidationError
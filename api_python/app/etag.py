@@ -0,0 +1,56 @@
+"""
+Weak ETags for polled GETs, from the garage's change version
+(app/change_versions.py) and the request's path and query params.
+
+Use as a route dependency: a matching If-None-Match ends the request with 304
+before the endpoint runs (so no query is made); otherwise the ETag is set on
+the response. ETAG_WINDOW_SECONDS rolls every tag over periodically, since
+some values move without a write through this API (fees of open tickets, edits
+made directly in the DB or from another host).
+"""
+
+import hashlib
+import time
+
+from fastapi import Request, Response
+
+from api_python.app.change_versions import versions
+from api_python.app.config import ETAG_ENABLED, ETAG_WINDOW_SECONDS
+from api_python.app.read_routing import request_garage_id
+
+
+class NotModified(Exception):
+    """Raised by check_etag; answered with an empty 304 (error_handlers)."""
+
+    def __init__(self, etag: str) -> None:
+        super().__init__(etag)
+        self.etag = etag
+
+
+def compute_etag(request: Request) -> str:
+    window = int(time.time() // ETAG_WINDOW_SECONDS) if ETAG_WINDOW_SECONDS > 0 else 0
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    key = f"{versions.tag(request_garage_id(request))}|{window}|{request.url.path}?{params}"
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison (RFC 9110): W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == opaque
+        for candidate in (c.strip() for c in if_none_match.split(","))
+    )
+
+
+def check_etag(request: Request, response: Response) -> None:
+    if not ETAG_ENABLED:
+        return
+    etag = compute_etag(request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    response.headers["ETag"] = etag
+    # Revalidate every time; the browser cache then sends If-None-Match itself.
+    response.headers["Cache-Control"] = "no-cache"
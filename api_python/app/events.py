@@ -0,0 +1,232 @@
+"""
+Dashboard change events for GET /events/dashboard (Server-Sent Events).
+
+Writes call publish() after their commit. With DASHBOARD_EVENTS_PG_NOTIFY the
+event is sent with pg_notify from a background thread and every worker's
+LISTEN thread hands it to its local hub, so a viewer connected to any worker
+(or host) sees every write. Otherwise the local hub gets the event directly.
+
+The hub keeps the last DASHBOARD_EVENTS_BUFFER events so a reconnecting client
+can resume from Last-Event-ID; when that id is no longer buffered the stream
+sends a `reset` event and the client refetches everything once.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import uuid
+from collections import deque
+
+from sqlalchemy import text
+
+from api_python.app.config import (
+    DASHBOARD_EVENTS_BUFFER,
+    DASHBOARD_EVENTS_PG_NOTIFY,
+)
+from api_python.app.db import engine
+from api_python.app.services.occupancy import counters
+
+_log = logging.getLogger(__name__)
+
+CHANNEL = "dashboard_events"
+RESET = "reset"
+# Events a slow client may fall behind by before it gets a reset instead.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """One stream's queue of (seq, event), fed from any thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, item: tuple[int, dict]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # loop closed; unsubscribe follows
+
+    def _put(self, item: tuple[int, dict]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventHub:
+    def __init__(self, buffer_size: int) -> None:
+        self._lock = threading.Lock()
+        self._buffer: deque[tuple[int, dict]] = deque(maxlen=max(1, buffer_size))
+        self._subscribers: set[Subscription] = set()
+        self._seq = 0
+
+    def dispatch(self, event: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event)
+            self._buffer.append(item)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(item)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def replay(self, last_event_id: str) -> tuple[list[tuple[int, dict]], bool]:
+        """Buffered events after last_event_id; False if it is not buffered."""
+        with self._lock:
+            items = list(self._buffer)
+        for index, (_, event) in enumerate(items):
+            if event["id"] == last_event_id:
+                return items[index + 1 :], True
+        return [], False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buffer.clear()
+
+
+hub = EventHub(DASHBOARD_EVENTS_BUFFER)
+
+
+def _event(event_type: str, garage_id: int | None, data: dict) -> dict:
+    event = {
+        "id": uuid.uuid4().hex[:16],
+        "type": event_type,
+        "garage_id": garage_id,
+        "data": data,
+    }
+    occupancy = counters.get(garage_id) if garage_id is not None else None
+    if occupancy is not None:
+        event["data"]["occupancy"] = {
+            "free_spots": occupancy.free_spots,
+            "occupied_spots": occupancy.occupied_spots,
+            "open_tickets": occupancy.open_tickets,
+        }
+    return event
+
+
+class _PgBridge:
+    """pg_notify sender thread plus a LISTEN thread feeding the local hub."""
+
+    def __init__(self) -> None:
+        self._outbox: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._sender: threading.Thread | None = None
+        self._listener: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def send(self, event: dict) -> None:
+        with self._lock:
+            if self._sender is None:
+                self._sender = threading.Thread(
+                    target=self._send_loop, name="dashboard-events-notify", daemon=True
+                )
+                self._sender.start()
+        self._outbox.put(event)
+
+    def _send_loop(self) -> None:
+        while True:
+            event = self._outbox.get()
+            if event is None:
+                return
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": CHANNEL, "payload": json.dumps(event, default=str)},
+                    )
+                    conn.commit()
+            except Exception:
+                # Viewers resync on their next reset/reconnect; the write stands.
+                _log.exception("dashboard event %s not sent", event["type"])
+
+    def start_listener(self) -> None:
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._stop.clear()
+            self._listener = threading.Thread(
+                target=self._listen_loop, name="dashboard-events-listen", daemon=True
+            )
+            self._listener.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._sender is not None:
+                self._outbox.put(None)
+                self._sender = None
+            self._listener = None
+
+    def _listen_loop(self) -> None:
+        reconnect = False
+        while not self._stop.is_set():
+            try:
+                self._listen(reconnect)
+            except Exception:
+                _log.exception("dashboard events LISTEN failed; reconnecting")
+                self._stop.wait(5)
+            reconnect = True
+
+    def _listen(self, reconnect: bool) -> None:
+        pooled = engine.raw_connection()
+        # Held for the process lifetime; keep it out of the pool's accounting.
+        pooled.detach()
+        conn = pooled.driver_connection
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            if reconnect:
+                # Notifications sent while disconnected are lost.
+                hub.dispatch(_event(RESET, None, {}))
+            if hasattr(conn, "poll"):  # psycopg2
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        hub.dispatch(json.loads(conn.notifies.pop(0).payload))
+            else:  # psycopg 3
+                while not self._stop.is_set():
+                    for notify in conn.notifies(timeout=1.0):
+                        hub.dispatch(json.loads(notify.payload))
+        finally:
+            pooled.close()
+
+
+_bridge = _PgBridge()
+
+
+def start() -> None:
+    """Start receiving other workers' events (app lifespan)."""
+    if DASHBOARD_EVENTS_PG_NOTIFY:
+        _bridge.start_listener()
+
+
+def stop() -> None:
+    _bridge.stop()
+
+
+def publish(event_type: str, garage_id: int | None, **data) -> None:
+    """Announce a committed write to dashboard streams; never raises."""
+    try:
+        event = _event(event_type, garage_id, data)
+        if DASHBOARD_EVENTS_PG_NOTIFY:
+            _bridge.send(event)
+        else:
+            hub.dispatch(event)
+    except Exception:
+        _log.exception("dashboard event %s for garage %s failed", event_type, garage_id)
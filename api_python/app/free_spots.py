@@ -0,0 +1,181 @@
+"""
+Per-garage index of free parking spots, so entry can pick a spot without
+scanning parking_spot against tickets.
+
+Each loaded garage keeps its active spots, the free ones among them, and
+min-heaps of free spot ids (all, and rentable only) with lazy deletion. A
+pick is O(log n) and returns the lowest free id, like the SQL allocation.
+The index is per process and only proposes spots: services/spots.py
+confirms each pick with a row lock and falls back to the SQL scan.
+services/occupancy.py loads garages from the DB and applies committed
+entries, exits and spot (de)activations.
+
+A picked spot stays pending, not free, until the entry commits (taken())
+or gives it up (release()), so a rolled-back entry does not lose it.
+"""
+
+import heapq
+import threading
+
+
+class GarageFreeSpots:
+    """Free spots of one garage: spot_id -> rentable for active spots, plus heaps."""
+
+    def __init__(self, active: dict[int, bool], occupied: set[int]) -> None:
+        self.active = dict(active)
+        self.free = {spot_id for spot_id in self.active if spot_id not in occupied}
+        # Picked, not yet taken or released.
+        self.pending: set[int] = set()
+        # Sorted lists are valid heaps.
+        self._heap = sorted(self.free)
+        self._rentable_heap = sorted(s for s in self.free if self.active[s])
+
+    def pop(self, rentable_only: bool = False) -> int | None:
+        """Remove and return the lowest free (rentable) spot id."""
+        heap = self._rentable_heap if rentable_only else self._heap
+        while heap:
+            spot_id = heapq.heappop(heap)
+            if spot_id in self.free:
+                self.free.discard(spot_id)
+                self.pending.add(spot_id)
+                return spot_id
+        return None
+
+    def push(self, spot_id: int) -> None:
+        """Mark an active spot free again."""
+        self.pending.discard(spot_id)
+        if spot_id not in self.active or spot_id in self.free:
+            return
+        self.free.add(spot_id)
+        heapq.heappush(self._heap, spot_id)
+        if self.active[spot_id]:
+            heapq.heappush(self._rentable_heap, spot_id)
+        # Entries popped from one heap stay in the other until skipped.
+        if len(self._heap) + len(self._rentable_heap) > 4 * len(self.free) + 64:
+            self._heap = sorted(self.free)
+            self._rentable_heap = sorted(s for s in self.free if self.active[s])
+
+    def discard(self, spot_id: int) -> None:
+        self.free.discard(spot_id)
+        self.pending.discard(spot_id)
+
+    def release(self, spot_id: int, free: bool) -> None:
+        """End a pick that was not used; free=False when the DB has it taken."""
+        if spot_id not in self.pending:
+            return
+        self.pending.discard(spot_id)
+        if free:
+            self.push(spot_id)
+
+    def activate(self, spot_id: int, rentable: bool, occupied: bool) -> None:
+        self.active[spot_id] = rentable
+        if not occupied:
+            self.push(spot_id)
+
+    def deactivate(self, spot_id: int) -> None:
+        self.active.pop(spot_id, None)
+        self.discard(spot_id)
+
+
+class FreeSpotIndex:
+    """Thread-safe {garage_id: GarageFreeSpots}, loaded lazily.
+
+    Every change bumps the garage's version, loaded or not, so a DB load that
+    raced with a write is dropped (same protocol as OccupancyCounters).
+    """
+
+    def __init__(self) -> None:
+        self._garages: dict[int, GarageFreeSpots] = {}
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _changed(self, garage_id: int) -> GarageFreeSpots | None:
+        self._versions[garage_id] = self._versions.get(garage_id, 0) + 1
+        return self._garages.get(garage_id)
+
+    def loaded(self, garage_id: int) -> bool:
+        with self._lock:
+            return garage_id in self._garages
+
+    def version(self, garage_id: int) -> int:
+        """Version to pass to store()."""
+        with self._lock:
+            return self._versions.get(garage_id, 0)
+
+    def store(
+        self,
+        garage_id: int,
+        active: dict[int, bool],
+        occupied: set[int],
+        expected_version: int,
+    ) -> bool:
+        """Replace the garage's spots with a DB load unless a write happened meanwhile."""
+        with self._lock:
+            if self._versions.get(garage_id, 0) != expected_version:
+                return False
+            self._garages[garage_id] = GarageFreeSpots(active, occupied)
+            return True
+
+    def pick(self, garage_id: int, rentable_only: bool = False) -> int | None:
+        """Take the lowest free spot id (None: garage not loaded or no free spot).
+
+        The spot is pending until taken() or release().
+        """
+        with self._lock:
+            garage = self._garages.get(garage_id)
+            return None if garage is None else garage.pop(rentable_only)
+
+    def release(self, garage_id: int, spot_id: int, free: bool = True) -> None:
+        """Give back a picked spot the entry did not use (no-op if not pending)."""
+        with self._lock:
+            garage = self._garages.get(garage_id)
+            if garage is not None:
+                garage.release(spot_id, free)
+
+    def taken(self, garage_id: int, spot_ids) -> None:
+        with self._lock:
+            garage = self._changed(garage_id)
+            if garage is not None:
+                for spot_id in spot_ids:
+                    garage.discard(spot_id)
+
+    def freed(self, garage_id: int, spot_id: int) -> None:
+        with self._lock:
+            garage = self._changed(garage_id)
+            if garage is not None:
+                garage.push(spot_id)
+
+    def activated(self, garage_id: int, spot_id: int, rentable: bool, occupied: bool) -> None:
+        with self._lock:
+            garage = self._changed(garage_id)
+            if garage is not None:
+                garage.activate(spot_id, rentable, occupied)
+
+    def deactivated(self, garage_id: int, spot_id: int) -> None:
+        with self._lock:
+            garage = self._changed(garage_id)
+            if garage is not None:
+                garage.deactivate(spot_id)
+
+    def invalidate(self, garage_id: int | None) -> None:
+        """Drop a garage (None: every garage); the next pick reloads it."""
+        with self._lock:
+            if garage_id is None:
+                garage_ids = set(self._garages) | set(self._versions)
+            else:
+                garage_ids = {garage_id}
+            for gid in garage_ids:
+                self._changed(gid)
+                self._garages.pop(gid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._garages.clear()
+            self._versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "garages": len(self._garages),
+                "free_spots": sum(len(g.free) for g in self._garages.values()),
+            }
@@ -0,0 +1,28 @@
+"""
+Write notifications for derived data (caches, and anything else that keeps a
+per-garage view). Call garage_data_changed(garage_id) after a write that
+affects a garage's counts or revenue has committed; None means "unknown
+garage" and invalidates everything.
+"""
+
+import logging
+from collections.abc import Callable
+
+_log = logging.getLogger(__name__)
+
+_listeners: list[Callable[[int | None], None]] = []
+
+
+def on_garage_change(listener: Callable[[int | None], None]) -> Callable[[int | None], None]:
+    """Register a listener (usable as a decorator)."""
+    _listeners.append(listener)
+    return listener
+
+
+def garage_data_changed(garage_id: int | None) -> None:
+    for listener in _listeners:
+        try:
+            listener(garage_id)
+        except Exception:
+            # The write already committed; a failing listener must not turn it into an error.
+            _log.exception("garage change listener failed for garage %s", garage_id)
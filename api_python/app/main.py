@@ -1,6 +1,9 @@
 ﻿# pyright: reportMissingImports=false
 # Import config first so load_dotenv() runs before db engine is created.
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -9,14 +12,22 @@ from sqlalchemy import text
 from api_python.app.config import (
     CORS_ALLOW_HEADERS,
     CORS_ALLOW_METHODS,
+    CORS_EXPOSE_HEADERS,
     CORS_MAX_AGE,
     CORS_DISABLED,
     CORS_ORIGINS,
+    DATABASE_READ_URL,
+    DB_QUERY_STATS,
+    DB_READ_YOUR_WRITES_SECONDS,
+    OCCUPANCY_RECONCILE_SECONDS,
 )
-from api_python.app.db import get_db
+from api_python.app.db import SessionLocal, get_db
 from api_python.app.auth import APIKeyMiddleware
+from api_python.app.db_metrics import QueryStatsMiddleware
+from api_python.app.read_routing import ReadYourWritesMiddleware
 from api_python.app.errors import api_error
 from api_python.app.error_handlers import register_exception_handlers
+from api_python.app.routers.admin import router as admin_router
 from api_python.app.routers.auth import router as auth_router
 from api_python.app.routers.tickets import router as tickets_router
 from api_python.app.routers.payments import router as payments_router
@@ -26,8 +37,28 @@ from api_python.app.routers.spots import router as spots_router
 from api_python.app.routers.garages import router as garages_router
 from api_python.app.routers.upload import router as upload_router
 from api_python.app.routers.dashboard import router as dashboard_router
+from api_python.app.routers.events import router as events_router
+from api_python.app import events
+from api_python.app.services.occupancy import run_reconciler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The shared occupancy segment can outlive a previous run: recount it now,
+    # then periodically.
+    reconciler = asyncio.create_task(
+        run_reconciler(SessionLocal, OCCUPANCY_RECONCILE_SECONDS)
+    )
+    events.start()
+    try:
+        yield
+    finally:
+        reconciler.cancel()
+        events.stop()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Parking API",
     description=(
         "API for managing parking garages, spots, vehicles, tickets, and "
@@ -57,6 +88,11 @@ app = FastAPI(
             "name": "Dashboard",
             "description": "Aggregated dashboard metrics (fewer round-trips).",
         },
+        {
+            "name": "Events",
+            "description": "Server-Sent Events stream of dashboard changes.",
+        },
+        {"name": "Admin", "description": "Operational metrics (DB pool)."},
     ],
 )
 
@@ -68,9 +104,15 @@ if not CORS_DISABLED:
         allow_credentials=True,
         allow_methods=CORS_ALLOW_METHODS,
         allow_headers=CORS_ALLOW_HEADERS,
+        expose_headers=CORS_EXPOSE_HEADERS,
         max_age=CORS_MAX_AGE,
     )
 app.add_middleware(APIKeyMiddleware)
+# Only needed when reads can go to a lagging replica.
+if DATABASE_READ_URL and DB_READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+if DB_QUERY_STATS:
+    app.add_middleware(QueryStatsMiddleware)
 register_exception_handlers(app)
 
 
@@ -141,5 +183,7 @@ app.include_router(tickets_router)
 app.include_router(payments_router)
 app.include_router(spots_router)
 app.include_router(dashboard_router)
+app.include_router(events_router)
 app.include_router(upload_router, prefix="/upload")
+app.include_router(admin_router)
 
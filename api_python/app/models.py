@@ -1,5 +1,6 @@
 from sqlalchemy import (
     Column,
+    Date,
     Integer,
     String,
     Numeric,
@@ -8,6 +9,7 @@ from sqlalchemy import (
     ForeignKey,
     SmallInteger,
     Boolean,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.sql import func, text
@@ -66,6 +68,25 @@ class  Vehicle(Base):
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    # Hot-path indexes (alembic e3b7c1d94a20).
+    __table_args__ = (
+        Index(
+            "ix_tickets_open_spot_id",
+            "spot_id",
+            postgresql_where=text("ticket_state = 'OPEN'"),
+        ),
+        Index(
+            "ix_tickets_open_garage_id",
+            "garage_id",
+            postgresql_where=text("ticket_state = 'OPEN'"),
+        ),
+        Index(
+            "ix_tickets_unpaid_garage_id",
+            "garage_id",
+            postgresql_where=text("payment_status IN ('UNPAID', 'PARTIALLY_PAID')"),
+        ),
+        Index("ix_tickets_garage_id_entry_time", "garage_id", "entry_time"),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -90,6 +111,10 @@ class Ticket(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_ticket_id", "ticket_id", postgresql_include=["amount"]),
+        Index("ix_payments_paid_at_id", "paid_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"))
@@ -99,3 +124,16 @@ class Payment(Base):
     paid_at = Column(DateTime, server_default=func.now())
 
     ticket = relationship("Ticket")
+
+
+class DailyRevenue(Base):
+    """Per-garage, per-UTC-day payment totals (services/revenue_rollup.py)."""
+
+    __tablename__ = "daily_revenue"
+
+    garage_id = Column(
+        Integer, ForeignKey("parking_config.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    amount = Column(Numeric, nullable=False, server_default=text("0"))
+    payment_count = Column(Integer, nullable=False, server_default=text("0"))
@@ -0,0 +1,134 @@
+"""
+Per-garage occupancy counters (spots, occupied spots, open tickets) in a
+SharedCells table (app/shm.py), shared by the workers on the host.
+
+The table is a fixed open-addressing array of int64 slots, one per garage.
+What is in it is only a view: services/occupancy.py loads missing garages from
+the DB, applies deltas after commits and reconciles the table periodically.
+"""
+
+from typing import NamedTuple
+
+from api_python.app.shm import SharedCells
+
+# Slot layout (int64 each). garage_id 0 marks an unused slot; version is bumped
+# by every delta/invalidation so a DB load that raced with a write is dropped.
+# The counters follow, in Occupancy field order.
+_GARAGE_ID, _VERSION, _LOADED = 0, 1, 2
+_FIRST_COUNTER = 3
+
+
+class Occupancy(NamedTuple):
+    total_spots: int
+    active_spots: int
+    occupied_spots: int  # active spots with an OPEN ticket
+    rentable_spots: int  # active and rentable
+    open_tickets: int
+
+    @property
+    def free_spots(self) -> int:
+        return max(0, self.active_spots - self.occupied_spots)
+
+
+_SLOT_WIDTH = _FIRST_COUNTER + len(Occupancy._fields)
+
+
+class OccupancyCounters:
+    def __init__(self, name: str, max_garages: int, shared: bool) -> None:
+        self.name = name
+        self.max_garages = max(1, max_garages)
+        self._table = SharedCells(name, self.max_garages * _SLOT_WIDTH, shared)
+        self.shared = self._table.shared
+        self._cells = self._table.cells
+        self._lock = self._table.lock
+
+    def close(self) -> None:
+        """Detach from the segment (it stays for the other workers)."""
+        self._table.close()
+
+    def _find(self, garage_id: int, claim: bool = False) -> int | None:
+        """Base index of garage_id's slot (claiming an empty one if asked)."""
+        start = (garage_id * 2654435761) % self.max_garages
+        for probe in range(self.max_garages):
+            base = ((start + probe) % self.max_garages) * _SLOT_WIDTH
+            slot_garage = self._cells[base + _GARAGE_ID]
+            if slot_garage == garage_id:
+                return base
+            if slot_garage == 0:
+                if not claim:
+                    return None
+                self._cells[base + _GARAGE_ID] = garage_id
+                return base
+        return None
+
+    def get(self, garage_id: int) -> Occupancy | None:
+        """Loaded counters for garage_id, or None (caller loads from the DB)."""
+        with self._lock:
+            base = self._find(garage_id)
+            if base is None or not self._cells[base + _LOADED]:
+                return None
+            return Occupancy(
+                *self._cells[base + _FIRST_COUNTER : base + _SLOT_WIDTH].tolist()
+            )
+
+    def version(self, garage_id: int) -> int | None:
+        """Version to pass to store(); None when the table is full."""
+        with self._lock:
+            base = self._find(garage_id, claim=True)
+            return None if base is None else self._cells[base + _VERSION]
+
+    def store(self, garage_id: int, values: Occupancy, expected_version: int) -> bool:
+        """Store values counted from the DB unless a write happened meanwhile."""
+        with self._lock:
+            base = self._find(garage_id)
+            if base is None or self._cells[base + _VERSION] != expected_version:
+                return False
+            for offset, value in enumerate(values):
+                self._cells[base + _FIRST_COUNTER + offset] = int(value)
+            self._cells[base + _LOADED] = 1
+            return True
+
+    def add(self, garage_id: int, **deltas: int) -> None:
+        """Apply committed changes; ignored for garages not loaded yet."""
+        with self._lock:
+            base = self._find(garage_id)
+            if base is None:
+                return
+            self._cells[base + _VERSION] += 1
+            if not self._cells[base + _LOADED]:
+                return
+            for field, delta in deltas.items():
+                cell = base + _FIRST_COUNTER + Occupancy._fields.index(field)
+                self._cells[cell] = max(0, self._cells[cell] + delta)
+
+    def invalidate(self, garage_id: int | None) -> None:
+        """Force a reload from the DB (None: every garage)."""
+        with self._lock:
+            if garage_id is None:
+                bases = range(0, len(self._cells), _SLOT_WIDTH)
+            else:
+                base = self._find(garage_id)
+                bases = () if base is None else (base,)
+            for base in bases:
+                self._cells[base + _VERSION] += 1
+                self._cells[base + _LOADED] = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            for i in range(len(self._cells)):
+                self._cells[i] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            garages = loaded = 0
+            for base in range(0, len(self._cells), _SLOT_WIDTH):
+                if self._cells[base + _GARAGE_ID]:
+                    garages += 1
+                    loaded += bool(self._cells[base + _LOADED])
+        return {
+            "name": self.name,
+            "shared": self.shared,
+            "max_garages": self.max_garages,
+            "garages": garages,
+            "loaded": loaded,
+        }
@@ -0,0 +1,180 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is fetched with `WHERE <sort key> after <last row of previous page>`
+instead of OFFSET, so deep pages cost the same as the first one. The cursor is
+opaque to clients: base64url JSON of the last row's sort-key values. OFFSET is
+still accepted; a cursor takes precedence over it.
+
+Sort keys must end in a unique column (id) so the order is total.
+
+Totals: an exact COUNT(*) on tickets/payments can cost more than the page, so
+list endpoints take include_total=exact|estimated|none. Estimated uses
+pg_class.reltuples for an unfiltered single-table listing and the planner's
+row estimate (EXPLAIN) otherwise.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import Table, and_, false, or_, text
+from sqlalchemy.orm import Query, Session
+
+from api_python.app.errors import api_error
+
+
+CURSOR_DESCRIPTION = (
+    "Opaque next_cursor from the previous page. Takes precedence over offset."
+)
+INCLUDE_TOTAL_DESCRIPTION = (
+    "exact: COUNT(*); estimated: planner row estimate (cheap, approximate); "
+    "none: total is null."
+)
+
+
+@dataclass(frozen=True)
+class SortKey:
+    column: Any
+    descending: bool = False
+    nullable: bool = False
+
+    def order_by(self):
+        return self.column.desc() if self.descending else self.column.asc()
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(keys: Sequence[SortKey], row: Any) -> str:
+    values = [_to_json(getattr(row, key.column.key)) for key in keys]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(keys: Sequence[SortKey], cursor: str) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor does not match this listing")
+        out = []
+        for key, value in zip(keys, values):
+            if value is None:
+                if not key.nullable:
+                    raise ValueError(f"{key.column.key} cannot be null")
+                out.append(None)
+            elif key.column.type.python_type is datetime:
+                out.append(datetime.fromisoformat(value))
+            elif key.column.type.python_type is int:
+                if not isinstance(value, int):
+                    raise ValueError(f"{key.column.key} must be an integer")
+                out.append(value)
+            else:
+                out.append(value)
+        return out
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise api_error(400, "INVALID_CURSOR", "Invalid pagination cursor.", str(e))
+
+
+def _equal(key: SortKey, value: Any):
+    return key.column.is_(None) if value is None else key.column == value
+
+
+def _beyond(key: SortKey, value: Any):
+    # PostgreSQL defaults: NULLS LAST for ASC, NULLS FIRST for DESC.
+    if key.descending:
+        if value is None:
+            return key.column.is_not(None)
+        return key.column < value
+    if value is None:
+        return false()
+    if key.nullable:
+        return or_(key.column > value, key.column.is_(None))
+    return key.column > value
+
+
+def after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """Rows strictly after `values` in the lexicographic order of `keys`."""
+    branches = [
+        and_(*(_equal(k, v) for k, v in zip(keys[:i], values[:i])), _beyond(keys[i], values[i]))
+        for i in range(len(keys))
+    ]
+    condition = or_(*branches)
+    first, first_value = keys[0], values[0]
+    if len(keys) > 1 and first_value is not None:
+        # Redundant range bound on the leading column so an index scan can start there.
+        bound = first.column <= first_value if first.descending else first.column >= first_value
+        if first.nullable and not first.descending:
+            bound = or_(bound, first.column.is_(None))
+        condition = and_(bound, condition)
+    return condition
+
+
+def paginate(
+    q: Query,
+    keys: Sequence[SortKey],
+    *,
+    limit: int,
+    offset: int = 0,
+    cursor: str | None = None,
+) -> tuple[list[Any], str | None]:
+    """Fetch one page ordered by `keys`; returns (rows, next_cursor)."""
+    q = q.order_by(None).order_by(*(key.order_by() for key in keys))
+    if cursor:
+        q = q.filter(after(keys, decode_cursor(keys, cursor)))
+    elif offset:
+        q = q.offset(offset)
+    rows = q.limit(limit + 1).all()
+    next_cursor = encode_cursor(keys, rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _reltuples(db: Session, table: Table) -> int | None:
+    value = db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table.fullname},
+    ).scalar()
+    # -1 (or NULL) until the table has been vacuumed/analyzed.
+    if value is None or value < 0:
+        return None
+    return int(value)
+
+
+def _planner_rows(db: Session, stmt) -> int:
+    compiled = stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = (
+        db.connection()
+        .exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_total(db: Session, q: Query) -> int:
+    stmt = q.enable_eagerloads(False).order_by(None).statement
+    froms = stmt.get_final_froms()
+    if stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+        rows = _reltuples(db, froms[0])
+        if rows is not None:
+            return rows
+    return _planner_rows(db, stmt)
+
+
+def count_total(db: Session, q: Query, mode: str) -> tuple[int | None, bool]:
+    """(total, total_is_exact) for the listing `q` per include_total `mode`."""
+    if mode == "none":
+        return None, False
+    if mode == "estimated":
+        return estimate_total(db, q), False
+    return q.count(), True
@@ -0,0 +1,80 @@
+"""
+Read-your-writes support for replica routing. After a successful write
+(POST/PUT/PATCH/DELETE) the response carries the write time in a cookie and an
+X-Last-Write header; get_db_readonly sends that client's reads to the primary
+until DB_READ_YOUR_WRITES_SECONDS have passed, so it never sees replica lag on
+its own changes. Clients that do not keep cookies can echo the header back.
+
+recent_garage_change() does the same for writes by any client: reads of a
+garage whose change version moved within the window go to the primary, so
+a response tagged with the new version (app/etag.py) holds the new data.
+"""
+
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from api_python.app.change_versions import versions
+from api_python.app.config import DB_READ_YOUR_WRITES_SECONDS
+
+LAST_WRITE_COOKIE = "db_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _last_write_at(request: Request) -> float | None:
+    raw = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(
+        LAST_WRITE_COOKIE
+    )
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def recent_write(request: Request, now: float | None = None) -> bool:
+    """True when this client wrote within the read-your-writes window."""
+    if DB_READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    last = _last_write_at(request)
+    if last is None:
+        return False
+    now = time.time() if now is None else now
+    return 0 <= now - last < DB_READ_YOUR_WRITES_SECONDS
+
+
+def request_garage_id(request: Request) -> int | None:
+    """The garage_id query param (None: absent, malformed, or all garages)."""
+    try:
+        return int(request.query_params["garage_id"])
+    except (KeyError, ValueError):
+        return None
+
+
+def recent_garage_change(request: Request) -> bool:
+    """True when the requested garage (or any, without garage_id) changed within the window."""
+    if DB_READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    return versions.changed_within(request_garage_id(request), DB_READ_YOUR_WRITES_SECONDS)
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Stamp successful writes so follow-up reads stick to the primary."""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if request.method in _WRITE_METHODS and response.status_code < 400:
+            stamp = f"{time.time():.3f}"
+            response.headers[LAST_WRITE_HEADER] = stamp
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                stamp,
+                max_age=DB_READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
@@ -0,0 +1,60 @@
+"""Operational endpoints (pool, cache and occupancy metrics). Protected like every non-public path."""
+
+from fastapi import APIRouter
+
+from api_python.app import schemas
+from api_python.app.cache import CACHES
+from api_python.app.db import POOL_OPTIONS, pool_stats
+from api_python.app.services.occupancy import counters, free_spots
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get(
+    "/db/pool",
+    response_model=schemas.DbPoolStatsResponse,
+    summary="Database pool metrics",
+    description=(
+        "Live checked-out/idle/overflow connections and cumulative checkout "
+        "wait counters per engine. Use to size DB_POOL_SIZE/DB_MAX_OVERFLOW."
+    ),
+)
+def db_pool_metrics():
+    return schemas.DbPoolStatsResponse(
+        settings=schemas.DbPoolSettings(**POOL_OPTIONS),
+        pools=[schemas.DbPoolStats(**row) for row in pool_stats()],
+    )
+
+
+@router.get(
+    "/cache",
+    response_model=list[schemas.CacheStats],
+    summary="Response cache metrics",
+    description=(
+        "Hit/miss/eviction/invalidation counters per in-process cache "
+        "(this worker only). Use to tune DASHBOARD_CACHE_TTL_SECONDS and "
+        "DASHBOARD_CACHE_MAX_ENTRIES."
+    ),
+)
+def cache_metrics():
+    return [schemas.CacheStats(**cache.stats()) for cache in CACHES.values()]
+
+
+@router.get(
+    "/occupancy",
+    response_model=schemas.OccupancyStats,
+    summary="Occupancy counter table",
+    description=(
+        "Whether the per-garage occupancy counters live in shared memory, and "
+        "how many garages are tracked and loaded. Raise OCCUPANCY_MAX_GARAGES "
+        "if garages approaches it (overflowing garages are counted in SQL). "
+        "free_spot_garages / free_spots: this worker's free-spot index."
+    ),
+)
+def occupancy_metrics():
+    index = free_spots.stats()
+    return schemas.OccupancyStats(
+        **counters.stats(),
+        free_spot_garages=index["garages"],
+        free_spots=index["free_spots"],
+    )
@@ -3,13 +3,19 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from api_python.app.db import get_db
+from api_python.app.db import get_db_readonly
 from api_python.app import schemas
+from api_python.app.errors import api_error
+from api_python.app.etag import check_etag
 from api_python.app.services.dashboard_analytics import (
-    compute_spot_ticket_counts,
-    compute_total_outstanding,
-    count_unpaid_and_partial,
-    sum_payments_in_range,
+    MAX_ANALYTICS_BATCH_GARAGES,
+    cached_status_cards,
+)
+from api_python.app.services.outstanding import garage_scope
+from api_python.app.services.timeline import (
+    MAX_TIMELINE_BUCKETS,
+    bucket_count,
+    compute_timeline,
 )
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
@@ -18,15 +24,17 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 @router.get(
     "/analytics",
     response_model=schemas.DashboardAnalyticsResponse,
+    dependencies=[Depends(check_etag)],
     summary="Dashboard analytics (status + revenue)",
     description=(
         "Returns spot/ticket counts and revenue/outstanding in one response. "
         "Pass today, month_from, month_to as calendar dates (YYYY-MM-DD) "
-        "matching the dashboard client (typically local date strings)."
+        "matching the dashboard client (typically local date strings). "
+        "With per_garage=true the same numbers are also returned per garage."
     ),
 )
 def dashboard_analytics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     garage_id: int | None = Query(default=None),
     today: date = Query(
         ...,
@@ -40,21 +48,110 @@ def dashboard_analytics(
         ...,
         description="Last day of month (inclusive).",
     ),
+    per_garage: bool = Query(
+        default=False,
+        description="Also return one row of status-card numbers per garage.",
+    ),
 ):
-    free, occupied, inactive, open_t = compute_spot_ticket_counts(db, garage_id)
-    today_rev = sum_payments_in_range(db, garage_id, today, today)
-    month_rev = sum_payments_in_range(db, garage_id, month_from, month_to)
-    unpaid_partial = count_unpaid_and_partial(db, garage_id)
-    outstanding = compute_total_outstanding(db, garage_id)
+    # One aggregate statement for every card (see STATUS_CARDS_SQL), cached
+    # until a write touches the garage.
+    totals, rows = cached_status_cards(
+        db, garage_scope(garage_id), today, month_from, month_to
+    )
 
     return schemas.DashboardAnalyticsResponse(
-        free_spots=free,
-        occupied_spots=occupied,
-        inactive_spots=inactive,
-        open_tickets=open_t,
-        today_revenue=today_rev,
-        month_revenue=month_rev,
-        unpaid_partially_paid_count=unpaid_partial,
-        total_outstanding=outstanding,
+        **totals,
+        garages=(
+            [schemas.GarageStatusCards(**row) for row in rows] if per_garage else None
+        ),
+    )
+
+
+@router.get(
+    "/analytics/batch",
+    response_model=schemas.DashboardAnalyticsBatchResponse,
+    dependencies=[Depends(check_etag)],
+    summary="Dashboard analytics for several garages",
+    description=(
+        "Status cards and revenue for each garage in garage_ids (repeat the "
+        "parameter; omit it for every garage) plus their grand total, from "
+        "the same grouped statement as /dashboard/analytics. Unknown ids are "
+        "skipped."
+    ),
+)
+def dashboard_analytics_batch(
+    db: Session = Depends(get_db_readonly),
+    garage_ids: list[int] | None = Query(
+        default=None,
+        description="Garages to include (default: all).",
+    ),
+    today: date = Query(
+        ...,
+        description=("Calendar date for 'today' revenue (inclusive, UTC day bounds)."),
+    ),
+    month_from: date = Query(
+        ...,
+        description="First day of month (inclusive).",
+    ),
+    month_to: date = Query(
+        ...,
+        description="Last day of month (inclusive).",
+    ),
+):
+    if garage_ids is not None and len(set(garage_ids)) > MAX_ANALYTICS_BATCH_GARAGES:
+        raise api_error(
+            400,
+            "TOO_MANY_GARAGES",
+            f"At most {MAX_ANALYTICS_BATCH_GARAGES} garage_ids per request.",
+            {"max_garages": MAX_ANALYTICS_BATCH_GARAGES},
+        )
+    totals, rows = cached_status_cards(db, garage_ids, today, month_from, month_to)
+    return schemas.DashboardAnalyticsBatchResponse(
+        total=schemas.DashboardAnalyticsResponse(**totals),
+        garages=[schemas.GarageStatusCards(**row) for row in rows],
     )
 
+
+@router.get(
+    "/timeline",
+    response_model=schemas.TimelineResponse,
+    dependencies=[Depends(check_etag)],
+    summary="Occupancy timeline (hour/day buckets)",
+    description=(
+        "Entries, exits, peak occupancy and revenue per hour or UTC day between "
+        "from and to (inclusive calendar dates), bucketed in SQL. Every bucket "
+        "in the range is returned, empty ones as zeros. With "
+        "by_vehicle_type=true each bucket also carries entries/exits per "
+        "vehicle type."
+    ),
+)
+def dashboard_timeline(
+    db: Session = Depends(get_db_readonly),
+    garage_id: int | None = Query(default=None),
+    from_date: date = Query(..., alias="from", description="First day (inclusive)."),
+    to_date: date = Query(..., alias="to", description="Last day (inclusive)."),
+    bucket: schemas.TimelineBucketSize = Query("day"),
+    by_vehicle_type: bool = Query(
+        default=False,
+        description="Also return entries/exits per vehicle type in each bucket.",
+    ),
+):
+    if to_date < from_date:
+        raise api_error(
+            400, "INVALID_DATE_RANGE", "'to' must not be before 'from'."
+        )
+    if bucket_count(from_date, to_date, bucket) > MAX_TIMELINE_BUCKETS:
+        raise api_error(
+            400,
+            "TIMELINE_TOO_MANY_BUCKETS",
+            f"Range exceeds {MAX_TIMELINE_BUCKETS} {bucket} buckets.",
+            {"max_buckets": MAX_TIMELINE_BUCKETS},
+        )
+    buckets = compute_timeline(
+        db, garage_id, from_date, to_date, bucket, by_vehicle_type
+    )
+    return schemas.TimelineResponse(
+        garage_id=garage_id,
+        bucket=bucket,
+        buckets=[schemas.TimelineBucket(**b) for b in buckets],
+    )
@@ -0,0 +1,108 @@
+"""Server-Sent Events stream of dashboard changes (see app/events.py)."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from api_python.app.config import DASHBOARD_EVENTS_HEARTBEAT_SECONDS
+from api_python.app.events import RESET, hub
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Client reconnect delay (EventSource `retry:`), milliseconds.
+RETRY_MS = 3000
+
+
+def format_event(event: dict) -> str:
+    payload = {"garage_id": event["garage_id"], **event["data"]}
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(payload, separators=(',', ':'), default=str)}\n\n"
+    )
+
+
+def _reset() -> str:
+    return f"event: {RESET}\ndata: {{}}\n\n"
+
+
+def _wanted(event: dict, garage_id: int | None) -> bool:
+    return (
+        garage_id is None
+        or event["garage_id"] is None
+        or event["garage_id"] == garage_id
+    )
+
+
+async def dashboard_event_stream(
+    request: Request,
+    garage_id: int | None,
+    last_event_id: str | None,
+    heartbeat_seconds: float = DASHBOARD_EVENTS_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    # Subscribe before replaying so nothing falls between the two; events seen
+    # in both are skipped by sequence number.
+    subscription = hub.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        sent = 0
+        if last_event_id:
+            backlog, found = hub.replay(last_event_id)
+            if not found:
+                yield _reset()
+            for seq, event in backlog:
+                sent = seq
+                if _wanted(event, garage_id):
+                    yield format_event(event)
+        while True:
+            if subscription.overflowed:
+                # Fell too far behind: drop the queue, client refetches once.
+                while not subscription.queue.empty():
+                    sent = subscription.queue.get_nowait()[0]
+                subscription.overflowed = False
+                yield _reset()
+            try:
+                seq, event = await asyncio.wait_for(
+                    subscription.queue.get(), heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            if seq <= sent:
+                continue
+            sent = seq
+            if _wanted(event, garage_id):
+                yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@router.get(
+    "/dashboard",
+    summary="Dashboard change stream (SSE)",
+    description=(
+        "text/event-stream of compact change events: ticket_entered, "
+        "ticket_closed, ticket_updated, ticket_deleted, spot_changed, "
+        "payment_recorded, payment_updated, payment_deleted, garage_changed. "
+        "Data carries garage_id, the ids involved and, when known, the garage's "
+        "free/occupied spots and open tickets. A `reset` event means events "
+        "were missed: refetch once. Heartbeat comments keep idle connections "
+        "open; reconnect with Last-Event-ID to resume."
+    ),
+    response_class=StreamingResponse,
+)
+async def dashboard_events(
+    request: Request,
+    garage_id: int | None = Query(default=None),
+    last_event_id: str | None = Header(default=None),
+):
+    return StreamingResponse(
+        dashboard_event_stream(request, garage_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
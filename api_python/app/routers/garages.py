@@ -2,9 +2,21 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
-from api_python.app.db import get_db
+from api_python.app.db import get_db, get_db_readonly
 from api_python.app import models, schemas
 from api_python.app.errors import api_error
+from api_python.app.change_versions import versions
+from api_python.app.etag import check_etag
+from api_python.app import events
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.services import occupancy
+from api_python.app.pagination import (
+    CURSOR_DESCRIPTION,
+    INCLUDE_TOTAL_DESCRIPTION,
+    SortKey,
+    count_total,
+    paginate,
+)
 
 router = APIRouter(prefix="/garages", tags=["Garages"])
 
@@ -12,6 +24,7 @@ router = APIRouter(prefix="/garages", tags=["Garages"])
 @router.get(
     "/overview",
     response_model=list[schemas.GarageOverviewRow],
+    dependencies=[Depends(check_etag)],
     summary="Garage overview (counts only)",
     description=(
         "Returns one row per garage with spot counts (total, free, occupied, "
@@ -20,64 +33,65 @@ router = APIRouter(prefix="/garages", tags=["Garages"])
     ),
 )
 def garage_overview(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     garage_id: int | None = Query(
         default=None,
         description="If set, return only this garage's overview.",
     ),
 ):
-    # Aggregation in DB: one query for all garages (or one). No spot lists.
-    q = text(
-        """
-        SELECT
-            pc.id AS garage_id,
-            pc.name,
-            COUNT(p.id)::int AS total_spots,
-            COUNT(p.id) FILTER (WHERE p.is_active AND NOT EXISTS (
-                SELECT 1 FROM tickets t
-                WHERE t.spot_id = p.id AND t.ticket_state = 'OPEN'
-            ))::int AS free_spots,
-            COUNT(p.id) FILTER (WHERE p.is_active AND EXISTS (
-                SELECT 1 FROM tickets t
-                WHERE t.spot_id = p.id AND t.ticket_state = 'OPEN'
-            ))::int AS occupied_spots,
-            COUNT(p.id) FILTER (WHERE p.is_active AND p.is_rentable)::int
-                AS rentable_spots
-        FROM parking_config pc
-        LEFT JOIN parking_spot p ON p.garage_id = pc.id
-        WHERE (:garage_id IS NULL OR pc.id = :garage_id)
-        GROUP BY pc.id, pc.name
-        ORDER BY pc.id
-    """
-    )
-    rows = db.execute(q, {"garage_id": garage_id}).mappings().all()
+    # Counts come from the occupancy counters (O(1) per garage); only garages
+    # not loaded yet are counted in SQL.
+    garages = db.execute(
+        text(
+            "SELECT id, name FROM parking_config "
+            "WHERE (CAST(:garage_id AS integer) IS NULL OR id = :garage_id) "
+            "ORDER BY id"
+        ),
+        {"garage_id": garage_id},
+    ).all()
+    counts = occupancy.read_occupancy(db, [g.id for g in garages])
     return [
         schemas.GarageOverviewRow(
-            garage_id=r["garage_id"],
-            name=r["name"],
-            total_spots=r["total_spots"],
-            free_spots=r["free_spots"],
-            occupied_spots=r["occupied_spots"],
-            rentable_spots=r["rentable_spots"],
+            garage_id=g.id,
+            name=g.name,
+            total_spots=counts[g.id].total_spots,
+            free_spots=counts[g.id].free_spots,
+            occupied_spots=counts[g.id].occupied_spots,
+            rentable_spots=counts[g.id].rentable_spots,
         )
-        for r in rows
+        for g in garages
+        if g.id in counts
     ]
 
 
+GARAGE_ORDER = (SortKey(models.ParkingConfig.id),)
+
+
 @router.get(
     "",
     response_model=schemas.PaginatedResponse[schemas.GarageResponse],
 )
 def list_garages(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
-    q = db.query(models.ParkingConfig).order_by(models.ParkingConfig.id)
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
+    q = db.query(models.ParkingConfig)
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, GARAGE_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
@@ -107,6 +121,8 @@ def create_garage(data: schemas.GarageCreate, db: Session = Depends(get_db)):
     db.add(g)
     db.commit()
     db.refresh(g)
+    garage_data_changed(g.id)
+    events.publish("garage_changed", g.id)
     return g
 
 
@@ -129,6 +145,8 @@ def update_garage(
     g.allow_subscription = data.allow_subscription
     db.commit()
     db.refresh(g)
+    garage_data_changed(garage_id)
+    events.publish("garage_changed", garage_id)
     return g
 
 
@@ -145,6 +163,8 @@ def patch_garage(
         setattr(g, key, value)
     db.commit()
     db.refresh(g)
+    garage_data_changed(garage_id)
+    events.publish("garage_changed", garage_id)
     return g
 
 
@@ -156,6 +176,10 @@ def delete_garage(garage_id: int, db: Session = Depends(get_db)):
     db.delete(g)
     try:
         db.commit()
+        occupancy.invalidate(garage_id)
+        garage_data_changed(garage_id)
+        versions.forget(garage_id)
+        events.publish("garage_changed", garage_id, deleted=True)
         return {"deleted": True}
     except IntegrityError:
         db.rollback()
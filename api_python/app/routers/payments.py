@@ -1,33 +1,59 @@
 ﻿from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone, date, timedelta
 
-from api_python.app.db import get_db
+from api_python.app.db import get_async_db, get_db, get_db_readonly
 from api_python.app import models, schemas
-from api_python.app.config import USE_API_PAYMENT_STATUS
+from api_python.app.config import USE_API_PAYMENT_STATUS, USE_ASYNC_DB
+from api_python.app.services.outstanding import (
+    compute_total_outstanding,
+    outstanding_with_breakdown,
+)
+from api_python.app.services import revenue_rollup
 from api_python.app.services.payments import recalc_ticket_payment_status
-from api_python.app.services.pricing import get_ticket_fee
+from api_python.app.services.pricing import naive_utc
 from api_python.app.errors import api_error
+from api_python.app import events
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.pagination import (
+    CURSOR_DESCRIPTION,
+    INCLUDE_TOTAL_DESCRIPTION,
+    SortKey,
+    count_total,
+    paginate,
+)
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
+# id breaks ties between payments recorded in the same instant.
+PAYMENT_ORDER = (
+    SortKey(models.Payment.paid_at, descending=True, nullable=True),
+    SortKey(models.Payment.id, descending=True),
+)
+TICKET_PAYMENT_ORDER = (SortKey(models.Payment.id),)
+
 
 @router.get(
     "",
     response_model=schemas.PaginatedResponse[schemas.PaymentResponse],
 )
 def list_payments(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     from_date: date | None = Query(default=None, alias="from"),
     to_date: date | None = Query(default=None, alias="to"),
     garage_id: int | None = Query(default=None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
     """List payments, filtered by paid_at date range (inclusive) and garage."""
-    q = db.query(models.Payment).order_by(models.Payment.paid_at.desc())
+    q = db.query(models.Payment)
     if garage_id is not None:
         q = q.join(models.Ticket).filter(models.Ticket.garage_id == garage_id)
     if from_date is not None:
@@ -38,16 +64,23 @@ def list_payments(
             (to_date + timedelta(days=1)).isoformat() + "T00:00:00+00:00"
         )
         q = q.filter(models.Payment.paid_at < end_exclusive)
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, PAYMENT_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
-@router.post("", response_model=schemas.PaymentResponse)
-def create_payment(data: schemas.PaymentCreate, db: Session = Depends(get_db)):
-    ticket = db.get(models.Ticket, data.ticket_id)
+def _check_payment_allowed(
+    ticket: models.Ticket | None, data: schemas.PaymentCreate
+) -> None:
     if not ticket:
         raise api_error(404, "TICKET_NOT_FOUND", "Ticket not found.")
 
@@ -58,46 +91,125 @@ def create_payment(data: schemas.PaymentCreate, db: Session = Depends(get_db)):
             "Payment is allowed only for closed tickets.",
         )
 
+
+def _check_overpayment(
+    ticket: models.Ticket, total_paid, data: schemas.PaymentCreate
+) -> None:
+    if total_paid + data.amount > ticket.fee:
+        raise api_error(
+            409,
+            "OVERPAYMENT_NOT_ALLOWED",
+            "Payment amount exceeds the remaining balance.",
+            details={
+                "ticket_id": data.ticket_id,
+                "remaining_balance": float(ticket.fee - total_paid),
+                "attempted_amount": float(data.amount),
+            },
+        )
+
+
+def _new_payment(data: schemas.PaymentCreate) -> models.Payment:
+    return models.Payment(
+        ticket_id=data.ticket_id,
+        amount=data.amount,
+        method=data.method,
+        currency=data.currency,
+        paid_at=data.paid_at or datetime.now(timezone.utc),
+    )
+
+
+def _publish_payment(event_type: str, garage_id: int | None, p: models.Payment) -> None:
+    events.publish(
+        event_type,
+        garage_id,
+        payment_id=p.id,
+        ticket_id=p.ticket_id,
+        amount=float(p.amount),
+    )
+
+
+def _payment_save_error(e: Exception):
+    return api_error(
+        500,
+        "DATABASE_ERROR",
+        "Payment could not be saved.",
+        details={"reason": e.__class__.__name__},
+    )
+
+
+def create_payment(data: schemas.PaymentCreate, db: Session = Depends(get_db)):
+    ticket = db.get(models.Ticket, data.ticket_id)
+    _check_payment_allowed(ticket, data)
+
     if ticket.fee is not None and ticket.fee > 0:
         total_paid = (
             db.query(func.coalesce(func.sum(models.Payment.amount), 0))
             .filter(models.Payment.ticket_id == data.ticket_id)
             .scalar()
         )
-        if total_paid + data.amount > ticket.fee:
-            raise api_error(
-                409,
-                "OVERPAYMENT_NOT_ALLOWED",
-                "Payment amount exceeds the remaining balance.",
-                details={
-                    "ticket_id": data.ticket_id,
-                    "remaining_balance": float(ticket.fee - total_paid),
-                    "attempted_amount": float(data.amount),
-                },
-            )
+        _check_overpayment(ticket, total_paid, data)
 
     try:
-        p = models.Payment(
-            ticket_id=data.ticket_id,
-            amount=data.amount,
-            method=data.method,
-            currency=data.currency,
-            paid_at=data.paid_at or datetime.now(timezone.utc),
-        )
+        p = _new_payment(data)
         db.add(p)
+        db.flush()
+        revenue_rollup.add_payment(db, p.id)
         if USE_API_PAYMENT_STATUS:
             recalc_ticket_payment_status(db, data.ticket_id)
         db.commit()
         db.refresh(p)
-        return p
     except Exception as e:
         db.rollback()
-        raise api_error(
-            500,
-            "DATABASE_ERROR",
-            "Payment could not be saved.",
-            details={"reason": e.__class__.__name__},
-        )
+        raise _payment_save_error(e)
+    # Committed: a failing hook must not report the payment as unsaved.
+    garage_data_changed(ticket.garage_id)
+    _publish_payment("payment_recorded", ticket.garage_id, p)
+    return p
+
+
+async def create_payment_async(
+    data: schemas.PaymentCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """Async variant of create_payment (USE_ASYNC_DB)."""
+    ticket = await db.get(models.Ticket, data.ticket_id)
+    _check_payment_allowed(ticket, data)
+
+    if ticket.fee is not None and ticket.fee > 0:
+        total_paid = (
+            await db.execute(
+                select(func.coalesce(func.sum(models.Payment.amount), 0)).where(
+                    models.Payment.ticket_id == data.ticket_id
+                )
+            )
+        ).scalar()
+        _check_overpayment(ticket, total_paid, data)
+
+    try:
+        p = _new_payment(data)
+        p.paid_at = naive_utc(p.paid_at)
+        db.add(p)
+        await db.flush()
+        await revenue_rollup.add_payment_async(db, p.id)
+        if USE_API_PAYMENT_STATUS:
+            await db.run_sync(
+                lambda session: recalc_ticket_payment_status(session, data.ticket_id)
+            )
+        await db.commit()
+        await db.refresh(p)
+    except Exception as e:
+        await db.rollback()
+        raise _payment_save_error(e)
+    garage_data_changed(ticket.garage_id)
+    _publish_payment("payment_recorded", ticket.garage_id, p)
+    return p
+
+
+router.add_api_route(
+    "",
+    create_payment_async if USE_ASYNC_DB else create_payment,
+    methods=["POST"],
+    response_model=schemas.PaymentResponse,
+)
 
 
 @router.get(
@@ -106,37 +218,23 @@ def create_payment(data: schemas.PaymentCreate, db: Session = Depends(get_db)):
 )
 def get_outstanding(
     garage_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
+    breakdown: bool = Query(
+        default=False, description="Also return the per-ticket rest to pay."
+    ),
+    db: Session = Depends(get_db_readonly),
 ):
     """Total still to pay for closed UNPAID/PARTIALLY_PAID tickets.
-    Uses computed fee from entry_time/exit_time when both are set, so direct DB
-    changes to times are reflected (same logic as /tickets/dashboard)."""
-    q = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.vehicle).joinedload(models.Vehicle.vehicle_type),
-        )
-        .filter(
-            models.Ticket.ticket_state == "CLOSED",
-            models.Ticket.payment_status.in_(["UNPAID", "PARTIALLY_PAID"]),
+    Uses the stored ticket fee (set at exit and on time corrections), the same
+    fee /tickets/dashboard shows."""
+    if not breakdown:
+        return schemas.OutstandingResponse(
+            total_outstanding=compute_total_outstanding(db, garage_id), tickets=None
         )
+    total, rows = outstanding_with_breakdown(db, garage_id)
+    return schemas.OutstandingResponse(
+        total_outstanding=total,
+        tickets=[schemas.OutstandingTicket(**row) for row in rows],
     )
-    if garage_id is not None:
-        q = q.filter(models.Ticket.garage_id == garage_id)
-    tickets = q.all()
-    total = 0.0
-    for t in tickets:
-        if t.entry_time is not None and t.exit_time is not None:
-            fee = float(get_ticket_fee(t, db))
-        else:
-            fee = float(t.fee or 0)
-        paid = (
-            db.query(func.coalesce(func.sum(models.Payment.amount), 0))
-            .filter(models.Payment.ticket_id == t.id)
-            .scalar()
-        )
-        total += fee - float(paid)
-    return schemas.OutstandingResponse(total_outstanding=max(0.0, total))
 
 
 @router.get(
@@ -145,19 +243,26 @@ def get_outstanding(
 )
 def payments_by_ticket(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
-    q = (
-        db.query(models.Payment)
-        .filter(models.Payment.ticket_id == ticket_id)
-        .order_by(models.Payment.id)
+    q = db.query(models.Payment).filter(models.Payment.ticket_id == ticket_id)
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, TICKET_PAYMENT_ORDER, limit=limit, offset=offset, cursor=cursor
     )
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
@@ -169,6 +274,12 @@ def get_payment(payment_id: int, db: Session = Depends(get_db)):
     return p
 
 
+def _ticket_garage_id(db: Session, ticket_id: int | None) -> int | None:
+    """Garage of the payment's ticket (None invalidates every garage)."""
+    ticket = db.get(models.Ticket, ticket_id) if ticket_id is not None else None
+    return ticket.garage_id if ticket else None
+
+
 @router.put("/{payment_id}", response_model=schemas.PaymentResponse)
 def update_payment(
     payment_id: int, data: schemas.PaymentUpdate, db: Session = Depends(get_db)
@@ -177,14 +288,21 @@ def update_payment(
     p = db.get(models.Payment, payment_id)
     if not p:
         raise api_error(404, "PAYMENT_NOT_FOUND", "Payment not found.")
+    # Rollup delta: old amount/day out, new amount/day in (same transaction).
+    revenue_rollup.remove_payment(db, p.id)
     p.amount = data.amount
     p.method = data.method
     p.currency = data.currency
     p.paid_at = data.paid_at or datetime.now(timezone.utc)
+    db.flush()
+    revenue_rollup.add_payment(db, p.id)
     if USE_API_PAYMENT_STATUS:
         recalc_ticket_payment_status(db, p.ticket_id)
+    garage_id = _ticket_garage_id(db, p.ticket_id)
     db.commit()
     db.refresh(p)
+    garage_data_changed(garage_id)
+    _publish_payment("payment_updated", garage_id, p)
     return p
 
 
@@ -194,13 +312,19 @@ def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     if not p:
         raise api_error(404, "PAYMENT_NOT_FOUND", "Payment not found.")
     ticket_id = p.ticket_id
+    garage_id = _ticket_garage_id(db, ticket_id)
+    revenue_rollup.remove_payment(db, p.id)
     db.delete(p)
     if USE_API_PAYMENT_STATUS:
         recalc_ticket_payment_status(db, ticket_id)
     try:
         db.commit()
-        return {"deleted": True}
     except IntegrityError:
         db.rollback()
         raise api_error(409, "PAYMENT_DELETE_CONFLICT", "Cannot delete payment.")
+    garage_data_changed(garage_id)
+    events.publish(
+        "payment_deleted", garage_id, payment_id=payment_id, ticket_id=ticket_id
+    )
+    return {"deleted": True}
 
@@ -3,26 +3,50 @@ from sqlalchemy.orm import Session
 from sqlalchemy import exists
 from sqlalchemy.exc import IntegrityError
 
-from api_python.app.db import get_db
+from api_python.app.db import get_db, get_db_readonly
 from api_python.app import models, schemas
 from api_python.app.errors import api_error
+from api_python.app.etag import check_etag
+from api_python.app import events
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.pagination import (
+    CURSOR_DESCRIPTION,
+    INCLUDE_TOTAL_DESCRIPTION,
+    SortKey,
+    count_total,
+    paginate,
+)
+from api_python.app.services import occupancy
 from api_python.app.services import spots as spots_service
 
 router = APIRouter(prefix="/spots", tags=["Parking Spots"])
 
+SPOT_ORDER = (SortKey(models.ParkingSpot.id, descending=True),)
+
+
+def _publish_spot_changed(spot: models.ParkingSpot) -> None:
+    events.publish(
+        "spot_changed", spot.garage_id, spot_id=spot.id, is_active=spot.is_active
+    )
+
 
 @router.get(
     "",
     response_model=schemas.PaginatedResponse[schemas.SpotResponse],
+    dependencies=[Depends(check_etag)],
 )
 def list_spots(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     garage_id: int | None = Query(default=None),
     active_only: bool = Query(default=True),
     rentable_only: bool = Query(default=False),
     only_free: bool = Query(default=False),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
     q = db.query(models.ParkingSpot)
 
@@ -40,18 +64,21 @@ def list_spots(
             )
         )
 
-    q = q.order_by(models.ParkingSpot.id.desc())
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, SPOT_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     occupied_ids = spots_service.spot_ids_with_open_tickets(db, [s.id for s in items])
     return schemas.PaginatedResponse(
         total=total,
+        total_is_exact=total_is_exact,
         limit=limit,
         offset=offset,
         items=[
             spots_service.to_spot_response(db, s, occupied=s.id in occupied_ids)
             for s in items
         ],
+        next_cursor=next_cursor,
     )
 
 
@@ -79,6 +106,9 @@ def create_spot(data: schemas.SpotCreate, db: Session = Depends(get_db)):
     try:
         db.commit()
         db.refresh(spot)
+        occupancy.invalidate(spot.garage_id)
+        garage_data_changed(spot.garage_id)
+        _publish_spot_changed(spot)
         return spots_service.to_spot_response(db, spot)
     except IntegrityError:
         db.rollback()
@@ -105,6 +135,9 @@ def update_spot(spot_id: int, data: schemas.SpotUpdate, db: Session = Depends(ge
     try:
         db.commit()
         db.refresh(spot)
+        occupancy.invalidate(spot.garage_id)
+        garage_data_changed(spot.garage_id)
+        _publish_spot_changed(spot)
         return spots_service.to_spot_response(db, spot)
     except IntegrityError:
         db.rollback()
@@ -135,8 +168,14 @@ def delete_spot(spot_id: int, db: Session = Depends(get_db)):
             "Cannot deactivate spot because it has an OPEN ticket.",
         )
 
+    was_active, rentable = spot.is_active, spot.is_rentable
     spot.is_active = False
+    garage_id = spot.garage_id
     db.commit()
+    if was_active:
+        occupancy.spot_deactivated(garage_id, spot_id, rentable)
+    garage_data_changed(garage_id)
+    events.publish("spot_changed", garage_id, spot_id=spot_id, is_active=False)
     return {"message": "Parking spot successfully deactivated", "spot_id": spot_id}
 
 
@@ -145,8 +184,14 @@ def activate_spot(spot_id: int, db: Session = Depends(get_db)):
     spot = db.get(models.ParkingSpot, spot_id)
     if not spot:
         raise api_error(404, "SPOT_NOT_FOUND", "Parking spot not found.")
+    was_active = spot.is_active
     spot.is_active = True
     db.commit()
     db.refresh(spot)
-    return spots_service.to_spot_response(db, spot)
+    occupied = spots_service.spot_is_occupied(db, spot.id)
+    if not was_active:
+        occupancy.spot_activated(spot.garage_id, spot.id, spot.is_rentable, occupied)
+    garage_data_changed(spot.garage_id)
+    _publish_spot_changed(spot)
+    return spots_service.to_spot_response(db, spot, occupied=occupied)
 
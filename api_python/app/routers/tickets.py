@@ -1,58 +1,81 @@
 ﻿from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from api_python.app.db import get_db
+from api_python.app.config import USE_ASYNC_DB
+from api_python.app.db import get_async_db, get_db, get_db_readonly
 from api_python.app import models, schemas
 from api_python.app.services.dashboard_analytics import (
     batch_payment_totals_by_ticket,
     compute_rest_to_pay_for_ticket,
 )
-from api_python.app.services.pricing import get_ticket_fee
 from api_python.app.services.tickets import (
+    MAX_BULK_ENTRIES,
+    MAX_BULK_EXITS,
     InvalidSpotError,
+    InvalidTicketTimesError,
     InvalidVehicleError,
     NoFreeSpotError,
     SpotGarageMismatchError,
     SpotInactiveError,
     SpotOccupiedError,
     TicketNotFoundError,
-    TicketPersistenceError,
+    TicketServiceError,
     TicketStateError,
-    TicketTokenRetryExceededError,
     apply_ticket_update,
     close_ticket,
+    close_ticket_async,
+    close_tickets,
+    create_ticket_entries,
     create_ticket_entry,
+    create_ticket_entry_async,
+    edit_ticket_times,
 )
 from api_python.app.errors import api_error
+from api_python.app.etag import check_etag
+from api_python.app import events
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.services import occupancy
+from api_python.app.services.quotes import cached_open_quotes
+from api_python.app.pagination import (
+    CURSOR_DESCRIPTION,
+    INCLUDE_TOTAL_DESCRIPTION,
+    SortKey,
+    count_total,
+    paginate,
+)
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"])
 
+TICKET_ORDER = (SortKey(models.Ticket.id, descending=True),)
+
 
 @router.get(
     "/dashboard",
     response_model=schemas.PaginatedResponse[schemas.TicketDashboardRow],
+    dependencies=[Depends(check_etag)],
 )
 def list_tickets_dashboard(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     garage_id: int | None = Query(default=None),
     ticket_state: schemas.TicketState | None = Query(default=None),
     from_date: date | None = Query(default=None),
     to_date: date | None = Query(default=None),
     limit: int = Query(1000, ge=1, le=5000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
     """List tickets with licence_plate and spot_code for dashboard."""
-    q = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.vehicle).joinedload(models.Vehicle.vehicle_type),
-            joinedload(models.Ticket.spot),
-            joinedload(models.Ticket.garage),
-        )
-        .order_by(models.Ticket.id.desc())
+    q = db.query(models.Ticket).options(
+        joinedload(models.Ticket.vehicle).joinedload(models.Vehicle.vehicle_type),
+        joinedload(models.Ticket.spot),
+        joinedload(models.Ticket.garage),
     )
     if garage_id is not None:
         q = q.filter(models.Ticket.garage_id == garage_id)
@@ -66,19 +89,18 @@ def list_tickets_dashboard(
             (to_date + timedelta(days=1)).isoformat() + "T00:00:00+00:00"
         )
         q = q.filter(models.Ticket.entry_time < end_exclusive)
-    total = q.count()
-    tickets = q.limit(limit).offset(offset).all()
+    total, total_is_exact = count_total(db, q, include_total)
+    tickets, next_cursor = paginate(
+        q, TICKET_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     pay_map = batch_payment_totals_by_ticket(db, [t.id for t in tickets])
     items = []
     for t in tickets:
-        # Use computed fee when entry_time and exit_time are set, so direct DB
-        # changes to entry/exit are reflected after refresh
-        # (dashboard display only).
+        # Stored fee (fixed at exit and on time corrections); direct DB edits
+        # of entry/exit are caught by scripts/check_ticket_fees.py.
         fee = t.fee
-        if t.entry_time is not None and t.exit_time is not None:
-            fee = get_ticket_fee(t, db)
         paid = pay_map.get(t.id, 0.0)
-        rest = compute_rest_to_pay_for_ticket(db, t, paid)
+        rest = compute_rest_to_pay_for_ticket(t, paid)
         items.append(
             schemas.TicketDashboardRow(
                 id=t.id,
@@ -105,21 +127,40 @@ def list_tickets_dashboard(
             )
         )
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
+@router.get("/open/quotes", response_model=schemas.OpenTicketQuotesResponse)
+def open_ticket_quotes(
+    garage_id: int = Query(...),
+    db: Session = Depends(get_db_readonly),
+):
+    """Current fee of every open ticket in a garage, from one query per minute."""
+    as_of, items = cached_open_quotes(db, garage_id)
+    return schemas.OpenTicketQuotesResponse(garage_id=garage_id, as_of=as_of, items=items)
+
+
 @router.get(
     "",
     response_model=schemas.PaginatedResponse[schemas.TicketResponse],
 )
 def list_tickets(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     state: schemas.TicketState | None = Query(default=None),
     payment_status: schemas.PaymentStatus | None = Query(default=None),
     garage_id: int | None = Query(default=None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
     q = db.query(models.Ticket)
 
@@ -130,11 +171,17 @@ def list_tickets(
     if garage_id is not None:
         q = q.filter(models.Ticket.garage_id == garage_id)
 
-    q = q.order_by(models.Ticket.id.desc())
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, TICKET_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
@@ -176,14 +223,42 @@ def update_ticket(
         raise api_error(409, "TICKET_NOT_OPEN", str(e))
 
 
+@router.patch(
+    "/{ticket_id}/times",
+    response_model=schemas.TicketResponse,
+    summary="Correct entry/exit times",
+    description=(
+        "Sets entry_time and/or exit_time (exit only on CLOSED tickets) and "
+        "recomputes the stored fee and payment status from them."
+    ),
+)
+def update_ticket_times(
+    ticket_id: int,
+    data: schemas.TicketTimesUpdate,
+    db: Session = Depends(get_db),
+):
+    try:
+        return edit_ticket_times(db, ticket_id, data)
+    except TicketNotFoundError:
+        raise api_error(404, "TICKET_NOT_FOUND", "Ticket not found.")
+    except InvalidTicketTimesError as e:
+        raise api_error(400, "INVALID_TICKET_TIMES", str(e))
+    except TicketStateError as e:
+        raise api_error(409, "TICKET_NOT_CLOSED", str(e))
+
+
 @router.delete("/{ticket_id}")
 def delete_ticket(ticket_id: int, db: Session = Depends(get_db)):
     t = db.get(models.Ticket, ticket_id)
     if not t:
         raise api_error(404, "TICKET_NOT_FOUND", "Ticket not found.")
+    garage_id = t.garage_id
     db.delete(t)
     try:
         db.commit()
+        occupancy.invalidate(garage_id)
+        garage_data_changed(garage_id)
+        events.publish("ticket_deleted", garage_id, ticket_id=ticket_id)
         return {"deleted": True}
     except IntegrityError:
         db.rollback()
@@ -194,60 +269,144 @@ def delete_ticket(ticket_id: int, db: Session = Depends(get_db)):
         )
 
 
-@router.post("/entry", response_model=schemas.TicketResponse)
-def ticket_entry(data: schemas.TicketEntry, db: Session = Depends(get_db)):
-    try:
-        return create_ticket_entry(db, data)
-    except (
-        InvalidVehicleError,
-        InvalidSpotError,
-        SpotGarageMismatchError,
-        SpotInactiveError,
-    ) as e:
-        if isinstance(e, InvalidVehicleError):
-            raise api_error(404, "VEHICLE_NOT_FOUND", "Vehicle does not exist.")
-        if isinstance(e, InvalidSpotError):
-            raise api_error(404, "SPOT_NOT_FOUND", "Parking spot does not exist.")
-        if isinstance(e, SpotGarageMismatchError):
-            raise api_error(
-                409,
-                "SPOT_GARAGE_MISMATCH",
-                "Selected parking spot does not belong to selected garage.",
-            )
-        raise api_error(409, "SPOT_INACTIVE", "Selected parking spot is inactive.")
-    except (SpotOccupiedError, NoFreeSpotError) as e:
-        if isinstance(e, SpotOccupiedError):
-            raise api_error(
-                409,
-                "SPOT_OCCUPIED",
-                "The selected parking spot is already occupied.",
-            )
-        raise api_error(
+def _entry_error(e: TicketServiceError) -> HTTPException:
+    if isinstance(e, InvalidVehicleError):
+        return api_error(404, "VEHICLE_NOT_FOUND", "Vehicle does not exist.")
+    if isinstance(e, InvalidSpotError):
+        return api_error(404, "SPOT_NOT_FOUND", "Parking spot does not exist.")
+    if isinstance(e, SpotGarageMismatchError):
+        return api_error(
+            409,
+            "SPOT_GARAGE_MISMATCH",
+            "Selected parking spot does not belong to selected garage.",
+        )
+    if isinstance(e, SpotInactiveError):
+        return api_error(409, "SPOT_INACTIVE", "Selected parking spot is inactive.")
+    if isinstance(e, SpotOccupiedError):
+        return api_error(
+            409,
+            "SPOT_OCCUPIED",
+            "The selected parking spot is already occupied.",
+        )
+    if isinstance(e, NoFreeSpotError):
+        return api_error(
             409,
             "NO_FREE_SPOTS_AVAILABLE",
             "No free spots available for this garage.",
         )
-    except (TicketPersistenceError, TicketTokenRetryExceededError) as e:
-        raise api_error(
-            500,
-            "DATABASE_ERROR",
-            "Ticket could not be saved.",
-            details={"reason": e.__class__.__name__},
-        )
+    return api_error(
+        500,
+        "DATABASE_ERROR",
+        "Ticket could not be saved.",
+        details={"reason": e.__class__.__name__},
+    )
+
+
+def _exit_error(e: TicketServiceError) -> HTTPException:
+    if isinstance(e, TicketNotFoundError):
+        return api_error(404, "TICKET_NOT_FOUND", "Ticket not found.")
+    return api_error(
+        409,
+        "TICKET_ALREADY_CLOSED",
+        "Ticket is not open.",
+    )
+
+
+def ticket_entry(data: schemas.TicketEntry, db: Session = Depends(get_db)):
+    try:
+        return create_ticket_entry(db, data)
+    except TicketServiceError as e:
+        raise _entry_error(e)
+
+
+async def ticket_entry_async(
+    data: schemas.TicketEntry, db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return await create_ticket_entry_async(db, data)
+    except TicketServiceError as e:
+        raise _entry_error(e)
 
 
-@router.post("/{ticket_id}/exit", response_model=schemas.TicketResponse)
 def ticket_exit(
     ticket_id: int, data: schemas.TicketExit, db: Session = Depends(get_db)
 ):
     try:
         return close_ticket(db, ticket_id, data)
-    except TicketNotFoundError:
-        raise api_error(404, "TICKET_NOT_FOUND", "Ticket not found.")
-    except TicketStateError:
+    except (TicketNotFoundError, TicketStateError) as e:
+        raise _exit_error(e)
+
+
+async def ticket_exit_async(
+    ticket_id: int, data: schemas.TicketExit, db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return await close_ticket_async(db, ticket_id, data)
+    except (TicketNotFoundError, TicketStateError) as e:
+        raise _exit_error(e)
+
+
+@router.post("/entry/bulk", response_model=schemas.TicketBulkEntryResponse)
+def ticket_entry_bulk(data: schemas.TicketBulkEntry, db: Session = Depends(get_db)):
+    """Open tickets for many vehicles in one garage; failures are reported per entry."""
+    if len(data.entries) > MAX_BULK_ENTRIES:
         raise api_error(
-            409,
-            "TICKET_ALREADY_CLOSED",
-            "Ticket is not open.",
+            400,
+            "TOO_MANY_ENTRIES",
+            f"At most {MAX_BULK_ENTRIES} entries per request.",
+            {"max_entries": MAX_BULK_ENTRIES},
         )
+    try:
+        outcomes = create_ticket_entries(db, data)
+    except TicketServiceError as e:
+        raise _entry_error(e)
+    results = [
+        schemas.TicketBulkEntryResult(index=i, error=_entry_error(outcome).detail["error"])
+        if isinstance(outcome, TicketServiceError)
+        else schemas.TicketBulkEntryResult(index=i, ticket=outcome)
+        for i, outcome in enumerate(outcomes)
+    ]
+    created = sum(r.ticket is not None for r in results)
+    return schemas.TicketBulkEntryResponse(
+        created=created, failed=len(results) - created, results=results
+    )
+
 
+@router.post("/exit/bulk", response_model=schemas.TicketBulkExitResponse)
+def ticket_exit_bulk(data: schemas.TicketBulkExit, db: Session = Depends(get_db)):
+    """Close many tickets at once; failures are reported per ticket."""
+    if len(data.exits) > MAX_BULK_EXITS:
+        raise api_error(
+            400,
+            "TOO_MANY_EXITS",
+            f"At most {MAX_BULK_EXITS} exits per request.",
+            {"max_exits": MAX_BULK_EXITS},
+        )
+    outcomes = close_tickets(db, data)
+    results = [
+        schemas.TicketBulkExitResult(
+            index=i, ticket_id=item.ticket_id, error=_exit_error(outcome).detail["error"]
+        )
+        if isinstance(outcome, TicketServiceError)
+        else schemas.TicketBulkExitResult(index=i, ticket_id=item.ticket_id, ticket=outcome)
+        for i, (item, outcome) in enumerate(zip(data.exits, outcomes))
+    ]
+    closed = sum(r.ticket is not None for r in results)
+    return schemas.TicketBulkExitResponse(
+        closed=closed, failed=len(results) - closed, results=results
+    )
+
+
+# USE_ASYNC_DB swaps the gate hot paths to the async engine; same contract.
+router.add_api_route(
+    "/entry",
+    ticket_entry_async if USE_ASYNC_DB else ticket_entry,
+    methods=["POST"],
+    response_model=schemas.TicketResponse,
+)
+router.add_api_route(
+    "/{ticket_id}/exit",
+    ticket_exit_async if USE_ASYNC_DB else ticket_exit,
+    methods=["POST"],
+    response_model=schemas.TicketResponse,
+)
@@ -2,27 +2,49 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from api_python.app.db import get_db
+from api_python.app.db import get_db, get_db_readonly
 from api_python.app import models, schemas
 from api_python.app.errors import api_error
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.pagination import (
+    CURSOR_DESCRIPTION,
+    INCLUDE_TOTAL_DESCRIPTION,
+    SortKey,
+    count_total,
+    paginate,
+)
 
 router = APIRouter(prefix="/vehicle-types", tags=["Vehicle Types"])
 
 
+VEHICLE_TYPE_ORDER = (SortKey(models.VehicleType.id),)
+
+
 @router.get(
     "",
     response_model=schemas.PaginatedResponse[schemas.VehicleTypeResponse],
 )
 def list_vehicle_types(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_readonly),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    include_total: schemas.TotalMode = Query(
+        "exact", description=INCLUDE_TOTAL_DESCRIPTION
+    ),
 ):
-    q = db.query(models.VehicleType).order_by(models.VehicleType.id)
-    total = q.count()
-    items = q.limit(limit).offset(offset).all()
+    q = db.query(models.VehicleType)
+    total, total_is_exact = count_total(db, q, include_total)
+    items, next_cursor = paginate(
+        q, VEHICLE_TYPE_ORDER, limit=limit, offset=offset, cursor=cursor
+    )
     return schemas.PaginatedResponse(
-        total=total, limit=limit, offset=offset, items=items
+        total=total,
+        total_is_exact=total_is_exact,
+        limit=limit,
+        offset=offset,
+        items=items,
+        next_cursor=next_cursor,
     )
 
 
@@ -54,6 +76,8 @@ def update_vehicle_type(
     vt.rate = data.rate
     try:
         db.commit()
+        # Type names show on every garage's ticket dashboard.
+        garage_data_changed(None)
         db.refresh(vt)
         return vt
     except IntegrityError:
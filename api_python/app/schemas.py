@@ -107,6 +107,37 @@ class TicketDashboardRow(BaseModel):
     rest_to_pay: float = 0.0
 
 
+class OpenTicketQuote(BaseModel):
+    ticket_id: int
+    entry_time: datetime
+    elapsed_seconds: int
+    fee_now: Decimal
+
+
+class OpenTicketQuotesResponse(BaseModel):
+    """Running fees of a garage's open tickets, as if they exited at as_of."""
+
+    garage_id: int
+    # Start of the current UTC minute; quotes are cached per minute.
+    as_of: datetime
+    items: list[OpenTicketQuote]
+
+
+class GarageStatusCards(BaseModel):
+    """Status cards + revenue summary for one garage."""
+
+    garage_id: int
+    name: str
+    free_spots: int
+    occupied_spots: int
+    inactive_spots: int
+    open_tickets: int
+    today_revenue: float
+    month_revenue: float
+    unpaid_partially_paid_count: int
+    total_outstanding: float
+
+
 class DashboardAnalyticsResponse(BaseModel):
     """Single response for status cards + revenue summary."""
 
@@ -118,6 +149,101 @@ class DashboardAnalyticsResponse(BaseModel):
     month_revenue: float
     unpaid_partially_paid_count: int
     total_outstanding: float
+    # Only with ?per_garage=true.
+    garages: list[GarageStatusCards] | None = None
+
+
+class DashboardAnalyticsBatchResponse(BaseModel):
+    """Status cards for several garages and their grand total."""
+
+    total: DashboardAnalyticsResponse
+    garages: list[GarageStatusCards]
+
+
+class TimelineVehicleTypeCounts(BaseModel):
+    vehicle_type: str | None
+    entries: int
+    exits: int
+
+
+class TimelineBucket(BaseModel):
+    """Entries, exits, peak occupancy and revenue for one hour/day bucket."""
+
+    bucket_start: datetime
+    entries: int
+    exits: int
+    peak_occupancy: int
+    revenue: float
+    # Only with ?by_vehicle_type=true.
+    vehicle_types: list[TimelineVehicleTypeCounts] | None = None
+
+
+class TimelineResponse(BaseModel):
+    garage_id: int | None
+    bucket: Literal["hour", "day"]
+    buckets: list[TimelineBucket]
+
+
+class DbPoolSettings(BaseModel):
+    """Pool options the engines were created with (DB_POOL_* env)."""
+
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+    pool_use_lifo: bool
+
+
+class DbPoolStats(BaseModel):
+    """Live state and cumulative counters for one engine pool."""
+
+    name: str
+    pool_size: int | None
+    checked_out: int
+    idle: int | None
+    overflow: int | None
+    peak_checked_out: int
+    connections_created: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    waits: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    slow_waits: int
+    timeouts: int
+
+
+class DbPoolStatsResponse(BaseModel):
+    settings: DbPoolSettings
+    pools: list[DbPoolStats]
+
+
+class CacheStats(BaseModel):
+    """Counters of one in-process response cache (since process start)."""
+
+    name: str
+    size: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
+
+
+class OccupancyStats(BaseModel):
+    """State of the occupancy counter table (shared by the host's workers)."""
+
+    name: str
+    shared: bool
+    max_garages: int
+    garages: int
+    loaded: int
+    free_spot_garages: int
+    free_spots: int
 
 
 # --- Pagination ---
@@ -125,15 +251,21 @@ T = TypeVar("T")
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
-    total: int
+    # None when include_total=none; an estimate when total_is_exact is False.
+    total: int | None
+    total_is_exact: bool = True
     limit: int
     offset: int
     items: list[T]
+    # Opaque keyset cursor for the next page (pass as ?cursor=); None on the last page.
+    next_cursor: str | None = None
 
 
 # DB CHECK constraint values — use in query params and any request body
 # that accepts these
 TicketState = Literal["OPEN", "CLOSED"]
+TotalMode = Literal["exact", "estimated", "none"]
+TimelineBucketSize = Literal["hour", "day"]
 PaymentStatus = Literal["NOT_APPLICABLE", "UNPAID", "PARTIALLY_PAID", "PAID"]
 OperationalStatus = Literal[
     "OK", "UNRECOGNIZED_PLATE", "POLICE_SUPERVISION", "MALFUNCTION"
@@ -167,15 +299,68 @@ class TicketEntry(BaseModel):
     image_url: str | None = None
 
 
+class TicketBulkEntryItem(BaseModel):
+    vehicle_id: int
+    entry_time: datetime | None = None
+    image_url: str | None = None
+
+
+class TicketBulkEntry(BaseModel):
+    """Entries into one garage; spots are always allocated (no spot_id)."""
+
+    garage_id: int
+    rentable_only: bool = False
+    entries: list[TicketBulkEntryItem] = Field(min_length=1)
+
+
+class TicketBulkEntryResult(BaseModel):
+    """Outcome of entries[index]: its ticket, or the error POST /tickets/entry would give."""
+
+    index: int
+    ticket: TicketResponse | None = None
+    error: ErrorBody | None = None
+
+
+class TicketBulkEntryResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[TicketBulkEntryResult]
+
+
 class TicketExit(BaseModel):
     exit_time: datetime | None = None
 
 
+class TicketBulkExitItem(BaseModel):
+    ticket_id: int
+    exit_time: datetime | None = None
+
+
+class TicketBulkExit(BaseModel):
+    exits: list[TicketBulkExitItem] = Field(min_length=1)
+
+
+class TicketBulkExitResult(BaseModel):
+    """Outcome of exits[index]: the closed ticket, or the error its exit would give."""
+
+    index: int
+    ticket_id: int
+    ticket: TicketResponse | None = None
+    error: ErrorBody | None = None
+
+
+class TicketBulkExitResponse(BaseModel):
+    closed: int
+    failed: int
+    results: list[TicketBulkExitResult]
+
+
 class TicketUpdate(BaseModel):
     """Partial update with domain-safe fields only.
 
     Lifecycle fields (ticket_state, payment_status, fee, entry_time) are
-    controlled by entry/exit and payment flows — not by this endpoint.
+    controlled by entry/exit and payment flows — not by this endpoint
+    (time corrections: PATCH /tickets/{id}/times).
     garage_id cannot be changed; use operational notes, image, or spot
     reassignment on OPEN tickets only.
     """
@@ -187,6 +372,15 @@ class TicketUpdate(BaseModel):
     image_url: str | None = Field(None, max_length=512)
 
 
+class TicketTimesUpdate(BaseModel):
+    """Correction of entry/exit times; the fee is recomputed from them."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    entry_time: datetime | None = None
+    exit_time: datetime | None = None
+
+
 class PaymentCreate(BaseModel):
     ticket_id: int
     amount: Decimal = Field(gt=0)  # uplata mora biti > 0
@@ -205,6 +399,16 @@ class PaymentResponse(BaseModel):
     paid_at: datetime | None
 
 
+class OutstandingTicket(BaseModel):
+    """Rest to pay for one ticket (fee computed as on the dashboard)."""
+
+    ticket_id: int
+    garage_id: int
+    fee: float
+    total_paid: float
+    rest_to_pay: float
+
+
 class OutstandingResponse(BaseModel):
     """Total amount still to be paid.
 
@@ -212,6 +416,8 @@ class OutstandingResponse(BaseModel):
     """
 
     total_outstanding: float
+    # Only with ?breakdown=true.
+    tickets: list[OutstandingTicket] | None = None
 
 
 class PaymentUpdate(BaseModel):
@@ -1,127 +1,246 @@
 ﻿"""Aggregated counts and revenue for GET /dashboard/analytics."""
 
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 
-from sqlalchemy import exists, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
 
 from api_python.app import models
-from api_python.app.services.pricing import get_ticket_fee
+from api_python.app.cache import TTLCache
+from api_python.app.change_versions import versions
+from api_python.app.config import (
+    DASHBOARD_CACHE_MAX_ENTRIES,
+    DASHBOARD_CACHE_TTL_SECONDS,
+)
+from api_python.app.invalidation import on_garage_change
+from api_python.app.services.occupancy import read_occupancy
+from api_python.app.services.outstanding import DUE_SQL, GARAGE_SCOPE_SQL
 
 
-def compute_spot_ticket_counts(
-    db: Session, garage_id: int | None
-) -> tuple[int, int, int, int]:
-    """Match StatusCards: free, occupied, inactive, open_tickets."""
-    base = db.query(models.ParkingSpot)
-    if garage_id is not None:
-        base = base.filter(models.ParkingSpot.garage_id == garage_id)
+# Most garage ids GET /dashboard/analytics/batch takes (omit them for all).
+MAX_ANALYTICS_BATCH_GARAGES = 500
 
-    total_all = base.count()
-    total_active = base.filter(models.ParkingSpot.is_active.is_(True)).count()
 
-    free_count = base.filter(
-        models.ParkingSpot.is_active.is_(True),
-        ~exists().where(
-            (models.Ticket.spot_id == models.ParkingSpot.id)
-            & (models.Ticket.ticket_state == "OPEN"),
-        ),
-    ).count()
+def _utc_day_start(d: date) -> datetime:
+    return datetime.fromisoformat(d.isoformat() + "T00:00:00+00:00")
 
-    inactive = max(0, total_all - total_active)
-    occupied = max(0, total_active - free_count)
 
-    tq = db.query(models.Ticket).filter(models.Ticket.ticket_state == "OPEN")
-    if garage_id is not None:
-        tq = tq.filter(models.Ticket.garage_id == garage_id)
-    open_tickets = tq.count()
+# Revenue, unpaid and outstanding per garage in one statement; spot counts and
+# open tickets come from the occupancy counters (services/occupancy.py).
+# Outstanding reuses the rest-to-pay CTE.
+# Revenue for days before the current UTC day comes from the daily_revenue
+# rollup (at most ~31 rows per garage); the current day is summed live from
+# payments, so writes that bypass the rollup still show up today.
+STATUS_CARDS_SQL = text(
+    f"""
+    WITH due AS ({DUE_SQL}),
+    unpaid AS (
+      SELECT t.garage_id, COUNT(*) AS unpaid_partial
+      FROM tickets t
+      WHERE t.payment_status IN ('UNPAID', 'PARTIALLY_PAID')
+        AND {GARAGE_SCOPE_SQL.format(column="t.garage_id")}
+      GROUP BY t.garage_id
+    ),
+    rolled AS (
+      SELECT
+        dr.garage_id,
+        SUM(dr.amount) FILTER (
+          WHERE dr.day >= :today_day AND dr.day < :today_end_day
+        ) AS today_revenue,
+        SUM(dr.amount) FILTER (
+          WHERE dr.day >= :month_day AND dr.day < :month_end_day
+        ) AS month_revenue
+      FROM daily_revenue dr
+      WHERE dr.day >= LEAST(CAST(:today_day AS date), :month_day)
+        AND dr.day < LEAST(
+          GREATEST(CAST(:today_end_day AS date), :month_end_day), :live_day
+        )
+        AND {GARAGE_SCOPE_SQL.format(column="dr.garage_id")}
+      GROUP BY dr.garage_id
+    ),
+    live AS (
+      SELECT
+        t.garage_id,
+        SUM(p.amount) FILTER (
+          WHERE p.paid_at >= :today_start AND p.paid_at < :today_end
+        ) AS today_revenue,
+        SUM(p.amount) FILTER (
+          WHERE p.paid_at >= :month_start AND p.paid_at < :month_end
+        ) AS month_revenue
+      FROM payments p
+      JOIN tickets t ON t.id = p.ticket_id
+      WHERE p.paid_at >= GREATEST(
+          LEAST(CAST(:today_start AS timestamptz), :month_start), :live_start
+        )
+        AND p.paid_at < GREATEST(CAST(:today_end AS timestamptz), :month_end)
+        AND {GARAGE_SCOPE_SQL.format(column="t.garage_id")}
+      GROUP BY t.garage_id
+    ),
+    owed AS (
+      SELECT garage_id, SUM(fee - total_paid) AS outstanding
+      FROM due
+      GROUP BY garage_id
+    )
+    SELECT
+      pc.id AS garage_id,
+      pc.name,
+      COALESCE(u.unpaid_partial, 0) AS unpaid_partial,
+      COALESCE(r.today_revenue, 0) + COALESCE(l.today_revenue, 0) AS today_revenue,
+      COALESCE(r.month_revenue, 0) + COALESCE(l.month_revenue, 0) AS month_revenue,
+      COALESCE(w.outstanding, 0) AS outstanding
+    FROM parking_config pc
+    LEFT JOIN unpaid u ON u.garage_id = pc.id
+    LEFT JOIN rolled r ON r.garage_id = pc.id
+    LEFT JOIN live l ON l.garage_id = pc.id
+    LEFT JOIN owed w ON w.garage_id = pc.id
+    WHERE {GARAGE_SCOPE_SQL.format(column="pc.id")}
+    ORDER BY pc.id
+    """
+)
 
-    return free_count, occupied, inactive, open_tickets
+
+def status_cards_statement(
+    garage_ids: list[int] | None,
+    today: date,
+    month_from: date,
+    month_to: date,
+    live_day: date | None = None,
+):
+    """STATUS_CARDS_SQL for garage_ids (None: every garage) with revenue days as
+    UTC bounds (inclusive end dates).
+
+    live_day (default: the current UTC day) is the first day summed from raw
+    payments instead of the rollup.
+    """
+    if live_day is None:
+        live_day = datetime.now(timezone.utc).date()
+    today_end = today + timedelta(days=1)
+    month_end = month_to + timedelta(days=1)
+    return STATUS_CARDS_SQL.bindparams(
+        garage_ids=garage_ids,
+        today_day=today,
+        today_end_day=today_end,
+        month_day=month_from,
+        month_end_day=month_end,
+        live_day=live_day,
+        today_start=_utc_day_start(today),
+        today_end=_utc_day_start(today_end),
+        month_start=_utc_day_start(month_from),
+        month_end=_utc_day_start(month_end),
+        live_start=_utc_day_start(live_day),
+    )
 
 
-def _payment_base_query(db: Session, garage_id: int | None):
-    q = db.query(models.Payment)
-    if garage_id is not None:
-        q = q.join(models.Ticket).filter(models.Ticket.garage_id == garage_id)
-    return q
+def _card(row) -> dict:
+    """Status-card numbers for one garage row (or a summed row)."""
+    return {
+        "free_spots": int(row["free_spots"]),
+        "occupied_spots": max(0, int(row["active_spots"]) - int(row["free_spots"])),
+        "inactive_spots": max(0, int(row["total_spots"]) - int(row["active_spots"])),
+        "open_tickets": int(row["open_tickets"]),
+        "today_revenue": float(row["today_revenue"]),
+        "month_revenue": float(row["month_revenue"]),
+        "unpaid_partially_paid_count": int(row["unpaid_partial"]),
+        "total_outstanding": max(0.0, float(row["outstanding"])),
+    }
 
 
-def sum_payments_in_range(
+_SUMMED = (
+    "total_spots",
+    "active_spots",
+    "free_spots",
+    "open_tickets",
+    "unpaid_partial",
+    "today_revenue",
+    "month_revenue",
+    "outstanding",
+)
+
+
+def compute_status_cards(
     db: Session,
-    garage_id: int | None,
-    from_date: date,
-    to_date_inclusive: date,
-) -> float:
-    """Sum payment amounts for paid_at in UTC day range (inclusive end date)."""
-    start = datetime.fromisoformat(from_date.isoformat() + "T00:00:00+00:00")
-    end_exclusive = datetime.fromisoformat(
-        (to_date_inclusive + timedelta(days=1)).isoformat() + "T00:00:00+00:00"
-    )
-    q = _payment_base_query(db, garage_id).filter(
-        models.Payment.paid_at >= start,
-        models.Payment.paid_at < end_exclusive,
-    )
-    total = q.with_entities(
-        func.coalesce(func.sum(models.Payment.amount), 0),
-    ).scalar()
-    return float(total or 0)
+    garage_ids: list[int] | None,
+    today: date,
+    month_from: date,
+    month_to: date,
+) -> tuple[dict, list[dict]]:
+    """(totals, per-garage rows) for GET /dashboard/analytics[/batch].
 
+    garage_ids None means every garage; unknown ids are skipped. One query,
+    plus one for garages whose occupancy counters are not loaded.
+    Outstanding is summed unclamped across garages and clamped once, matching
+    GET /payments/outstanding.
+    """
+    cards = db.execute(
+        status_cards_statement(garage_ids, today, month_from, month_to)
+    ).mappings().all()
+    counts = read_occupancy(db, [row["garage_id"] for row in cards])
+    rows = [
+        {
+            **row,
+            "total_spots": counts[row["garage_id"]].total_spots,
+            "active_spots": counts[row["garage_id"]].active_spots,
+            "free_spots": counts[row["garage_id"]].free_spots,
+            "open_tickets": counts[row["garage_id"]].open_tickets,
+        }
+        for row in cards
+        if row["garage_id"] in counts
+    ]
+    totals = {key: sum(row[key] for row in rows) for key in _SUMMED}
+    per_garage = [
+        {"garage_id": row["garage_id"], "name": row["name"], **_card(row)}
+        for row in rows
+    ]
+    return _card(totals), per_garage
 
-def count_unpaid_and_partial(db: Session, garage_id: int | None) -> int:
-    q1 = db.query(models.Ticket).filter(
-        models.Ticket.payment_status == "UNPAID",
-    )
-    q2 = db.query(models.Ticket).filter(
-        models.Ticket.payment_status == "PARTIALLY_PAID",
-    )
-    if garage_id is not None:
-        q1 = q1.filter(models.Ticket.garage_id == garage_id)
-        q2 = q2.filter(models.Ticket.garage_id == garage_id)
-    return q1.count() + q2.count()
-
-
-def compute_total_outstanding(db: Session, garage_id: int | None) -> float:
-    """Same logic as GET /payments/outstanding."""
-    q = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.vehicle).joinedload(models.Vehicle.vehicle_type),
-        )
-        .filter(
-            models.Ticket.ticket_state == "CLOSED",
-            models.Ticket.payment_status.in_(["UNPAID", "PARTIALLY_PAID"]),
-        )
+
+# Keyed by (garage ids, today, month_from, month_to, change versions); the ids
+# are a sorted tuple, or None for the all-garages view, which is dropped on
+# every change. Invalidation only reaches this worker; the change versions
+# (shared by the host's workers, read before computing) keep a body cached
+# here from being served under the ETag of a write made through another one.
+analytics_cache = TTLCache(
+    "dashboard_analytics", DASHBOARD_CACHE_MAX_ENTRIES, DASHBOARD_CACHE_TTL_SECONDS
+)
+
+
+@on_garage_change
+def _invalidate_analytics(garage_id: int | None) -> None:
+    def stale(key) -> bool:
+        if garage_id is None or not isinstance(key, tuple):
+            return True
+        scope = key[0]
+        return scope is None or garage_id in scope
+
+    analytics_cache.invalidate(stale)
+
+
+def cached_status_cards(
+    db: Session,
+    garage_ids: list[int] | None,
+    today: date,
+    month_from: date,
+    month_to: date,
+) -> tuple[dict, list[dict]]:
+    """compute_status_cards through analytics_cache (callers must not mutate)."""
+    scope = None if garage_ids is None else tuple(sorted(set(garage_ids)))
+    tags = versions.tag(None) if scope is None else tuple(versions.tag(g) for g in scope)
+    return analytics_cache.get_or_compute(
+        (scope, today, month_from, month_to, tags),
+        lambda: compute_status_cards(
+            db, None if scope is None else list(scope), today, month_from, month_to
+        ),
     )
-    if garage_id is not None:
-        q = q.filter(models.Ticket.garage_id == garage_id)
-    tickets = q.all()
-    total = 0.0
-    for t in tickets:
-        if t.entry_time is not None and t.exit_time is not None:
-            fee = float(get_ticket_fee(t, db))
-        else:
-            fee = float(t.fee or 0)
-        paid = (
-            db.query(func.coalesce(func.sum(models.Payment.amount), 0))
-            .filter(models.Payment.ticket_id == t.id)
-            .scalar()
-        )
-        total += fee - float(paid)
-    return max(0.0, total)
 
 
 def compute_rest_to_pay_for_ticket(
-    db: Session, ticket: models.Ticket, paid: Decimal | float
+    ticket: models.Ticket, paid: Decimal | float
 ) -> float:
-    """Remaining amount for dashboard row (0 when OPEN or PAID)."""
+    """Remaining amount for dashboard row (0 when OPEN or PAID), from the stored fee."""
     if ticket.ticket_state == "OPEN" or ticket.payment_status == "PAID":
         return 0.0
-    if ticket.entry_time is not None and ticket.exit_time is not None:
-        fee = float(get_ticket_fee(ticket, db))
-    else:
-        fee = float(ticket.fee or 0)
-    return max(0.0, fee - float(paid))
+    return max(0.0, float(ticket.fee or 0) - float(paid))
 
 
 def batch_payment_totals_by_ticket(
@@ -0,0 +1,89 @@
+"""
+Consistency check for stored ticket fees (scripts/check_ticket_fees.py).
+
+Reads use tickets.fee as fixed at exit or by a time correction. A closed
+ticket whose stored fee differs from the fee its entry/exit times give at
+current rates has drifted: its times were edited outside the API, or it
+predates a rate change (expected, so narrow the check with `since`).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api_python.app import models
+from api_python.app.config import USE_API_PAYMENT_STATUS
+from api_python.app.services.payments import recalc_ticket_payment_status
+from api_python.app.services.pricing import PricingInput, RateSnapshot, price_many
+
+BATCH_SIZE = 1000
+_REPORTED_COLUMNS = ("ticket_id", "garage_id", "entry_time", "exit_time", "stored_fee")
+
+
+def _closed_tickets(garage_id: int | None, since: datetime | None):
+    t, v = models.Ticket, models.Vehicle
+    query = (
+        select(
+            t.id.label("ticket_id"),
+            t.garage_id,
+            t.entry_time,
+            t.exit_time,
+            t.fee.label("stored_fee"),
+            v.vehicle_type_id,
+        )
+        .outerjoin(v, v.id == t.vehicle_id)
+        .where(
+            t.ticket_state == "CLOSED",
+            t.entry_time.is_not(None),
+            t.exit_time.is_not(None),
+        )
+        .order_by(t.id)
+    )
+    if garage_id is not None:
+        query = query.where(t.garage_id == garage_id)
+    if since is not None:
+        query = query.where(t.exit_time >= since)
+    return query
+
+
+def find_fee_drift(
+    db: Session, garage_id: int | None = None, since: datetime | None = None
+) -> list[dict]:
+    """Closed tickets (exited at/after since) whose stored fee does not match their times.
+
+    Priced in Python against one RateSnapshot, batch by batch, so the check
+    follows calculate_fee() exactly (tariff schedules included).
+    """
+    snapshot = RateSnapshot.load(db, garage_ids=None if garage_id is None else [garage_id])
+    result = db.execute(
+        _closed_tickets(garage_id, since).execution_options(yield_per=BATCH_SIZE)
+    ).mappings()
+    drifted = []
+    for rows in result.partitions():
+        fees = price_many(
+            [
+                PricingInput(r["entry_time"], r["exit_time"], r["vehicle_type_id"], r["garage_id"])
+                for r in rows
+            ],
+            snapshot,
+        )
+        for row, fee in zip(rows, fees):
+            if row["stored_fee"] != fee:
+                drifted.append(
+                    {key: row[key] for key in _REPORTED_COLUMNS} | {"expected_fee": fee}
+                )
+    return drifted
+
+
+def fix_fee_drift(db: Session, drifted: list[dict]) -> int:
+    """Store the expected fee (and payment status) for rows from find_fee_drift.
+
+    The caller commits.
+    """
+    for row in drifted:
+        ticket = db.get(models.Ticket, row["ticket_id"])
+        ticket.fee = row["expected_fee"]
+        if USE_API_PAYMENT_STATUS:
+            recalc_ticket_payment_status(db, ticket.id)
+    return len(drifted)
@@ -0,0 +1,232 @@
+"""
+Occupancy counters per garage (app/occupancy.py) backed by the DB.
+
+Reads are O(1) per garage once a garage is loaded; garages missing from the
+table are counted in one query. Ticket entry/exit and spot activate/deactivate
+apply deltas after their commit; rarer writes (spot edits, ticket deletes,
+garage deletes) invalidate the garage so the next read recounts it. A periodic
+reconcile recounts every garage and corrects drift from writes that bypass the
+API or from other hosts.
+
+The free-spot index (app/free_spots.py) follows the same deltas and
+invalidations; the reconcile reloads it too.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from api_python.app.config import (
+    FREE_SPOT_INDEX,
+    OCCUPANCY_MAX_GARAGES,
+    OCCUPANCY_SHARED_MEMORY,
+    OCCUPANCY_SHM_NAME,
+)
+from api_python.app.free_spots import FreeSpotIndex
+from api_python.app.occupancy import Occupancy, OccupancyCounters
+
+_log = logging.getLogger(__name__)
+
+counters = OccupancyCounters(
+    OCCUPANCY_SHM_NAME, OCCUPANCY_MAX_GARAGES, OCCUPANCY_SHARED_MEMORY
+)
+free_spots = FreeSpotIndex()
+
+_OCCUPANCY_SELECT = """
+    SELECT
+      pc.id AS garage_id,
+      COUNT(ps.id) AS total_spots,
+      COUNT(ps.id) FILTER (WHERE ps.is_active) AS active_spots,
+      COUNT(ps.id) FILTER (WHERE ps.is_active AND EXISTS (
+        SELECT 1 FROM tickets t
+        WHERE t.spot_id = ps.id AND t.ticket_state = 'OPEN'
+      )) AS occupied_spots,
+      COUNT(ps.id) FILTER (WHERE ps.is_active AND ps.is_rentable) AS rentable_spots,
+      (
+        SELECT COUNT(*) FROM tickets t
+        WHERE t.garage_id = pc.id AND t.ticket_state = 'OPEN'
+      ) AS open_tickets
+    FROM parking_config pc
+    LEFT JOIN parking_spot ps ON ps.garage_id = pc.id
+    {where}
+    GROUP BY pc.id
+"""
+
+OCCUPANCY_SQL = text(
+    _OCCUPANCY_SELECT.format(where="WHERE pc.id IN :garage_ids")
+).bindparams(bindparam("garage_ids", expanding=True))
+OCCUPANCY_ALL_SQL = text(_OCCUPANCY_SELECT.format(where=""))
+
+
+def _occupancy(row) -> Occupancy:
+    return Occupancy(*(int(row[field]) for field in Occupancy._fields))
+
+
+def read_occupancy(db: Session, garage_ids: Iterable[int]) -> dict[int, Occupancy]:
+    """Counters for garage_ids; unknown ids (no such garage) are left out."""
+    result: dict[int, Occupancy] = {}
+    versions: dict[int, int | None] = {}
+    for garage_id in garage_ids:
+        values = counters.get(garage_id)
+        if values is not None:
+            result[garage_id] = values
+        else:
+            versions[garage_id] = counters.version(garage_id)
+    if versions:
+        rows = db.execute(OCCUPANCY_SQL, {"garage_ids": list(versions)}).mappings()
+        for row in rows:
+            garage_id = row["garage_id"]
+            result[garage_id] = _occupancy(row)
+            # version None: table full, this garage is always counted in SQL.
+            version = versions[garage_id]
+            if version is not None:
+                counters.store(garage_id, result[garage_id], version)
+    return result
+
+
+_FREE_SPOTS_SELECT = """
+    SELECT
+      ps.garage_id,
+      ps.id AS spot_id,
+      ps.is_rentable,
+      EXISTS (
+        SELECT 1 FROM tickets t
+        WHERE t.spot_id = ps.id AND t.ticket_state = 'OPEN'
+      ) AS occupied
+    FROM parking_spot ps
+    WHERE ps.is_active = true {where}
+"""
+
+FREE_SPOTS_SQL = text(
+    _FREE_SPOTS_SELECT.format(where="AND ps.garage_id IN :garage_ids")
+).bindparams(bindparam("garage_ids", expanding=True))
+FREE_SPOTS_ALL_SQL = text(_FREE_SPOTS_SELECT.format(where=""))
+
+
+def _store_free_spots(rows, versions: dict[int, int]) -> None:
+    active: dict[int, dict[int, bool]] = {garage_id: {} for garage_id in versions}
+    occupied: dict[int, set[int]] = {garage_id: set() for garage_id in versions}
+    for row in rows:
+        garage_id = row["garage_id"]
+        if garage_id not in versions:
+            continue
+        active[garage_id][row["spot_id"]] = bool(row["is_rentable"])
+        if row["occupied"]:
+            occupied[garage_id].add(row["spot_id"])
+    for garage_id, version in versions.items():
+        free_spots.store(garage_id, active[garage_id], occupied[garage_id], version)
+
+
+def load_free_spots(db: Session, garage_id: int) -> None:
+    """Load one garage into the free-spot index (one query)."""
+    versions = {garage_id: free_spots.version(garage_id)}
+    _store_free_spots(db.execute(FREE_SPOTS_SQL, {"garage_ids": [garage_id]}).mappings(), versions)
+
+
+async def load_free_spots_async(db, garage_id: int) -> None:
+    """Async variant of load_free_spots (USE_ASYNC_DB)."""
+    versions = {garage_id: free_spots.version(garage_id)}
+    result = await db.execute(FREE_SPOTS_SQL, {"garage_ids": [garage_id]})
+    _store_free_spots(result.mappings(), versions)
+
+
+def reconcile_occupancy(db: Session) -> int:
+    """Recount every garage and overwrite its counters; returns corrections."""
+    garage_ids = db.execute(text("SELECT id FROM parking_config")).scalars().all()
+    versions = {garage_id: counters.version(garage_id) for garage_id in garage_ids}
+    corrected = 0
+    for row in db.execute(OCCUPANCY_ALL_SQL).mappings():
+        garage_id = row["garage_id"]
+        version = versions.get(garage_id)
+        if version is None:
+            continue
+        values = _occupancy(row)
+        before = counters.get(garage_id)
+        if counters.store(garage_id, values, version) and before not in (None, values):
+            corrected += 1
+            _log.info(
+                "occupancy: garage %s drifted %s -> %s", garage_id, before, values
+            )
+    if FREE_SPOT_INDEX:
+        versions = {garage_id: free_spots.version(garage_id) for garage_id in garage_ids}
+        _store_free_spots(db.execute(FREE_SPOTS_ALL_SQL).mappings(), versions)
+    return corrected
+
+
+async def run_reconciler(session_factory, interval_seconds: float) -> None:
+    """Reconcile now and then every interval_seconds (app lifespan task)."""
+
+    def reconcile_once() -> None:
+        db = session_factory()
+        try:
+            reconcile_occupancy(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            await asyncio.to_thread(reconcile_once)
+        except Exception:
+            _log.exception("occupancy reconcile failed")
+        if interval_seconds <= 0:
+            return
+        await asyncio.sleep(interval_seconds)
+
+
+def ticket_opened(garage_id: int, spot_id: int | None) -> None:
+    # Entry only assigns active, free spots.
+    counters.add(
+        garage_id, open_tickets=1, occupied_spots=1 if spot_id is not None else 0
+    )
+    if spot_id is not None:
+        free_spots.taken(garage_id, [spot_id])
+
+
+def tickets_opened(garage_id: int, spot_ids: list[int]) -> None:
+    """ticket_opened() for entries, each on an allocated spot."""
+    counters.add(garage_id, open_tickets=len(spot_ids), occupied_spots=len(spot_ids))
+    free_spots.taken(garage_id, spot_ids)
+
+
+def entry_failed(garage_id: int, spot_id: int) -> None:
+    """The entry holding spot_id did not commit; the index may offer it again."""
+    free_spots.release(garage_id, spot_id)
+
+
+def ticket_moved(garage_id: int, old_spot_id: int | None, new_spot_id: int) -> None:
+    # An open ticket changed spots: the counters stay, the free spots swap.
+    if old_spot_id is not None:
+        free_spots.freed(garage_id, old_spot_id)
+    free_spots.taken(garage_id, [new_spot_id])
+
+
+def ticket_closed(garage_id: int, spot_id: int | None) -> None:
+    counters.add(
+        garage_id, open_tickets=-1, occupied_spots=-1 if spot_id is not None else 0
+    )
+    if spot_id is not None:
+        free_spots.freed(garage_id, spot_id)
+
+
+def spot_activated(garage_id: int, spot_id: int, rentable: bool, occupied: bool) -> None:
+    counters.add(
+        garage_id,
+        active_spots=1,
+        rentable_spots=int(rentable),
+        occupied_spots=int(occupied),
+    )
+    free_spots.activated(garage_id, spot_id, rentable, occupied)
+
+
+def spot_deactivated(garage_id: int, spot_id: int, rentable: bool) -> None:
+    # Deactivation is refused while the spot has an open ticket.
+    counters.add(garage_id, active_spots=-1, rentable_spots=-int(rentable))
+    free_spots.deactivated(garage_id, spot_id)
+
+
+def invalidate(garage_id: int | None) -> None:
+    counters.invalidate(garage_id)
+    free_spots.invalidate(garage_id)
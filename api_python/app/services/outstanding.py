@@ -0,0 +1,90 @@
+"""
+Outstanding balance ("rest to pay") for CLOSED tickets that are UNPAID or
+PARTIALLY_PAID, in one aggregate statement (see sql/rest_to_pay_outstanding.sql).
+
+Fees are the stored tickets.fee, fixed at exit and when entry/exit times are
+corrected (services/tickets.py); scripts/check_ticket_fees.py flags rows whose
+stored fee no longer matches their times. The total is max(0, sum(fee - paid)); the
+breakdown clamps each ticket at 0. With the breakdown, the total comes from the
+same statement (a window SUM over the breakdown rows).
+"""
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Garage filter of the statements here and in the dashboard status statement:
+# :garage_ids is an integer array, NULL for every garage.
+GARAGE_SCOPE_SQL = (
+    "(CAST(:garage_ids AS integer[]) IS NULL OR {column} = ANY(:garage_ids))"
+)
+
+
+def garage_scope(garage_id: int | None) -> list[int] | None:
+    """:garage_ids for a single optional garage."""
+    return None if garage_id is None else [garage_id]
+
+
+# One row per ticket counted in the outstanding total. Also composed into the
+# dashboard status statement (dashboard_analytics.STATUS_CARDS_SQL).
+DUE_SQL = f"""
+      SELECT
+        t.id AS ticket_id,
+        t.garage_id,
+        COALESCE(t.fee, 0) AS fee,
+        COALESCE(p.total_paid, 0) AS total_paid
+      FROM tickets t
+      LEFT JOIN LATERAL (
+        SELECT SUM(pay.amount) AS total_paid
+        FROM payments pay
+        WHERE pay.ticket_id = t.id
+      ) p ON true
+      WHERE t.ticket_state = 'CLOSED'
+        AND t.payment_status IN ('UNPAID', 'PARTIALLY_PAID')
+        AND {GARAGE_SCOPE_SQL.format(column="t.garage_id")}
+"""
+
+OUTSTANDING_TOTAL_SQL = text(
+    f"""
+    WITH due AS ({DUE_SQL})
+    SELECT GREATEST(0, COALESCE(SUM(fee - total_paid), 0)) FROM due
+    """
+)
+
+OUTSTANDING_BREAKDOWN_SQL = text(
+    f"""
+    WITH due AS ({DUE_SQL})
+    SELECT ticket_id, garage_id, fee, total_paid,
+           GREATEST(0, fee - total_paid) AS rest_to_pay,
+           GREATEST(0, SUM(fee - total_paid) OVER ()) AS total_outstanding
+    FROM due
+    ORDER BY ticket_id
+    """
+)
+
+
+def compute_total_outstanding(db: Session, garage_id: int | None) -> float:
+    """Total still to pay (GET /payments/outstanding, dashboard analytics)."""
+    total = db.execute(
+        OUTSTANDING_TOTAL_SQL, {"garage_ids": garage_scope(garage_id)}
+    ).scalar()
+    return float(total or 0)
+
+
+def outstanding_with_breakdown(
+    db: Session, garage_id: int | None
+) -> tuple[float, list[dict]]:
+    """Total plus per-ticket fee, paid and rest_to_pay, in one statement."""
+    rows = db.execute(
+        OUTSTANDING_BREAKDOWN_SQL, {"garage_ids": garage_scope(garage_id)}
+    ).mappings().all()
+    total = float(rows[0]["total_outstanding"]) if rows else 0.0
+    return total, [
+        {
+            "ticket_id": r["ticket_id"],
+            "garage_id": r["garage_id"],
+            "fee": float(r["fee"]),
+            "total_paid": float(r["total_paid"]),
+            "rest_to_pay": float(r["rest_to_pay"]),
+        }
+        for r in rows
+    ]
@@ -1,11 +1,26 @@
-﻿import math
-from datetime import timedelta, timezone
+﻿from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from types import MappingProxyType
+from typing import NamedTuple, overload
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from api_python.app import models
+from api_python.app.config import USE_TARIFF_SCHEDULES
+from api_python.app.services.tariffs import TariffSchedule, compile_schedule
+
+_ZERO = Decimal("0")
+_MINUTE = timedelta(minutes=1)
 
 
-def _ensure_utc(dt):
+@overload
+def ensure_utc(dt: datetime) -> datetime: ...
+@overload
+def ensure_utc(dt: datetime | None) -> datetime | None: ...
+def ensure_utc(dt):
     """If datetime is naive, treat as UTC so we can subtract entry from exit safely."""
     if dt is None:
         return None
@@ -14,29 +29,184 @@ def _ensure_utc(dt):
     return dt
 
 
-def _get_rate_for_ticket(ticket, db) -> Decimal:
-    """Resolve hourly rate: vehicle type if present, otherwise garage default_rate."""
-    if ticket.vehicle_id and ticket.vehicle and ticket.vehicle.vehicle_type_id:
-        vt = ticket.vehicle.vehicle_type
-        if vt is not None:
-            return Decimal(vt.rate)
-    garage = db.get(models.ParkingConfig, ticket.garage_id)
-    if garage is not None and garage.default_rate is not None:
-        return Decimal(garage.default_rate)
-    return Decimal("0")
+def naive_utc(dt):
+    """UTC wall time without tzinfo, the way ensure_utc reads stored times back.
+
+    asyncpg refuses aware datetimes for the TIMESTAMP WITHOUT TIME ZONE
+    columns, so the async write paths convert first.
+    """
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class PricingInput(NamedTuple):
+    """What a fee depends on, without the ORM (raw rows, bulk exits, quotes)."""
+
+    entry_time: datetime | None
+    exit_time: datetime | None
+    vehicle_type_id: int | None
+    garage_id: int | None
+
+
+def _rates(db: Session, id_col, rate_col, ids: Iterable[int | None] | None):
+    """{id: rate} for ids (None: every row); no query for an empty id set."""
+    query = select(id_col, rate_col)
+    if ids is not None:
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return MappingProxyType({})
+        query = query.where(id_col.in_(ids))
+    return MappingProxyType(
+        {i: Decimal(rate) for i, rate in db.execute(query) if rate is not None}
+    )
+
+
+def garage_rate_tables(rows):
+    """({id: default_rate}, {id: TariffSchedule}) from parking_config rows.
+
+    Rows are (id, default_rate, day_rate, night_rate, open_time, close_time);
+    schedules are only compiled with USE_TARIFF_SCHEDULES.
+    """
+    rates, schedules = {}, {}
+    for garage_id, default_rate, *tariff in rows:
+        if default_rate is not None:
+            rates[garage_id] = Decimal(default_rate)
+        schedule = compile_schedule(*tariff) if USE_TARIFF_SCHEDULES else None
+        if schedule is not None:
+            schedules[garage_id] = schedule
+    return MappingProxyType(rates), MappingProxyType(schedules)
+
+
+def _garage_rates(db: Session, ids: Iterable[int | None] | None):
+    """garage_rate_tables() for ids (None: every row) from one parking_config query."""
+    pc = models.ParkingConfig
+    query = select(pc.id, pc.default_rate, pc.day_rate, pc.night_rate, pc.open_time, pc.close_time)
+    if ids is not None:
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return MappingProxyType({}), MappingProxyType({})
+        query = query.where(pc.id.in_(ids))
+    return garage_rate_tables(db.execute(query))
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """Rates read once: vehicle type rate first, then garage schedule or default_rate."""
+
+    vehicle_type_rates: Mapping[int, Decimal]
+    garage_rates: Mapping[int, Decimal]
+    garage_schedules: Mapping[int, TariffSchedule] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        vehicle_type_ids: Iterable[int | None] | None = None,
+        garage_ids: Iterable[int | None] | None = None,
+    ) -> "RateSnapshot":
+        """Rates for the given ids (None: every row), at most one query per table."""
+        return cls(
+            _rates(db, models.VehicleType.id, models.VehicleType.rate, vehicle_type_ids),
+            *_garage_rates(db, garage_ids),
+        )
+
+    @classmethod
+    def for_inputs(cls, db: Session, inputs: list[PricingInput]) -> "RateSnapshot":
+        """Just the rates inputs can use (garage rates only where needed)."""
+        vehicle_type_rates = _rates(
+            db,
+            models.VehicleType.id,
+            models.VehicleType.rate,
+            [i.vehicle_type_id for i in inputs],
+        )
+        garage_rates, garage_schedules = _garage_rates(
+            db, [i.garage_id for i in inputs if i.vehicle_type_id not in vehicle_type_rates]
+        )
+        return cls(vehicle_type_rates, garage_rates, garage_schedules)
+
+    def _vehicle_type_rate(self, vehicle_type_id: int | None) -> Decimal | None:
+        if vehicle_type_id is None:
+            return None
+        return self.vehicle_type_rates.get(vehicle_type_id)
+
+    def rate(self, vehicle_type_id: int | None, garage_id: int | None) -> Decimal:
+        rate = self._vehicle_type_rate(vehicle_type_id)
+        if rate is None and garage_id is not None:
+            rate = self.garage_rates.get(garage_id)
+        return _ZERO if rate is None else rate
+
+    def schedule(self, vehicle_type_id: int | None, garage_id: int | None):
+        """The garage's TariffSchedule when no vehicle type rate applies, else None."""
+        if self._vehicle_type_rate(vehicle_type_id) is not None or garage_id is None:
+            return None
+        return self.garage_schedules.get(garage_id)
+
+
+def billed_hours(entry_time: datetime, exit_time: datetime) -> int:
+    """Started hours (at least one) of the whole minutes (at least one) parked."""
+    minutes = max(1, (ensure_utc(exit_time) - ensure_utc(entry_time)) // _MINUTE)
+    return max(1, -(-minutes // 60))
+
+
+def price_many(items: Iterable[PricingInput], snapshot: RateSnapshot) -> list[Decimal]:
+    """Fees for many inputs against one snapshot; 0 where a time is missing."""
+    fees = []
+    for item in items:
+        entry_time, exit_time = item.entry_time, item.exit_time
+        if entry_time is None or exit_time is None:
+            fees.append(_ZERO)
+            continue
+        h = billed_hours(entry_time, exit_time)
+        schedule = snapshot.schedule(item.vehicle_type_id, item.garage_id)
+        if schedule is not None:
+            fees.append(schedule.fee(ensure_utc(entry_time), h * 60))
+        else:
+            fees.append(h * snapshot.rate(item.vehicle_type_id, item.garage_id))
+    return fees
+
+
+def pricing_inputs(db: Session, tickets: list[models.Ticket]) -> list[PricingInput]:
+    """PricingInput per ticket; vehicle types come from one query, not lazy loads."""
+    vehicle_ids = {t.vehicle_id for t in tickets if t.vehicle_id is not None}
+    vehicle_types: dict[int, int | None] = {}
+    if vehicle_ids:
+        rows = db.execute(
+            select(models.Vehicle.id, models.Vehicle.vehicle_type_id).where(
+                models.Vehicle.id.in_(vehicle_ids)
+            )
+        )
+        vehicle_types = {vehicle_id: vehicle_type_id for vehicle_id, vehicle_type_id in rows}
+    return [
+        PricingInput(t.entry_time, t.exit_time, vehicle_types.get(t.vehicle_id), t.garage_id)
+        for t in tickets
+    ]
+
+
+def price_tickets(
+    db: Session, tickets: list[models.Ticket], snapshot: RateSnapshot | None = None
+) -> list[Decimal]:
+    """Fees for many tickets against one snapshot (loaded for them if not given)."""
+    inputs = pricing_inputs(db, tickets)
+    if snapshot is None:
+        snapshot = RateSnapshot.for_inputs(db, inputs)
+    return price_many(inputs, snapshot)
 
 
 def calculate_fee(ticket, db) -> Decimal:
-    """Fee from entry/exit duration and rate (vehicle type or garage default)."""
+    """Fee from entry/exit duration and rate (vehicle type, garage schedule or default)."""
     if ticket.entry_time is None or ticket.exit_time is None:
-        return Decimal("0")
-    entry = _ensure_utc(ticket.entry_time)
-    exit_ = _ensure_utc(ticket.exit_time)
-    delta: timedelta = exit_ - entry
-    minutes = max(1, int(delta.total_seconds() / 60))
-    hours = max(1, math.ceil(minutes / 60))
-    rate = _get_rate_for_ticket(ticket, db)
-    return hours * rate
+        return _ZERO
+    return price_tickets(db, [ticket])[0]
+
+
+# calculate_fee() in SQL, for fees computed inside set-based queries: the
+# IMMUTABLE ticket_fee() function (migration b5f1ea89f506). Expects tickets as
+# `t` LEFT JOINed to vehicle_types as `vt` and parking_config as `pc`. Flat
+# rates only: it does not apply USE_TARIFF_SCHEDULES.
+TICKET_FEE_SQL = "ticket_fee(t.entry_time, t.exit_time, vt.rate, pc.default_rate)"
 
 
 def get_ticket_fee(ticket, db) -> Decimal:
@@ -45,4 +215,3 @@ def get_ticket_fee(ticket, db) -> Decimal:
     Used when USE_API_FEE_CALCULATION is true (no DB trigger).
     """
     return calculate_fee(ticket, db)
-
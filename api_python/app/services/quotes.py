@@ -0,0 +1,132 @@
+"""
+Running fees of open tickets for GET /tickets/open/quotes (exit kiosks, the
+open-tickets table).
+
+One query returns a garage's open tickets with every rate they can be
+priced at. They are priced with price_many() as if they exited at the start
+of the current minute, the same way calculate_fee() prices a real exit. A
+fee only steps once an hour of parking starts, so results are cached per
+garage and minute bucket and dropped on any write to the garage.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import MappingProxyType
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from api_python.app.cache import TTLCache
+from api_python.app.config import DASHBOARD_CACHE_MAX_ENTRIES
+from api_python.app.invalidation import on_garage_change
+from api_python.app.services.pricing import (
+    PricingInput,
+    RateSnapshot,
+    ensure_utc,
+    garage_rate_tables,
+    price_many,
+)
+
+QUOTE_BUCKET_SECONDS = 60
+
+# Served by ix_tickets_open_garage_id; the garage's tariff columns repeat on
+# every row so no second query is needed for the rates.
+OPEN_QUOTES_SQL = text(
+    """
+    SELECT
+      t.id AS ticket_id,
+      t.entry_time,
+      v.vehicle_type_id,
+      vt.rate AS vehicle_type_rate,
+      pc.default_rate,
+      pc.day_rate,
+      pc.night_rate,
+      pc.open_time,
+      pc.close_time
+    FROM tickets t
+    JOIN parking_config pc ON pc.id = t.garage_id
+    LEFT JOIN vehicle v ON v.id = t.vehicle_id
+    LEFT JOIN vehicle_types vt ON vt.id = v.vehicle_type_id
+    WHERE t.garage_id = :garage_id
+      AND t.ticket_state = 'OPEN'
+      AND t.entry_time IS NOT NULL
+    ORDER BY t.id
+    """
+)
+
+
+def quote_bucket(now: datetime | None = None) -> datetime:
+    """Start of the UTC minute quotes are computed for."""
+    now = ensure_utc(now) if now is not None else datetime.now(timezone.utc)
+    return now.replace(second=0, microsecond=0)
+
+
+def _elapsed_seconds(entry_time: datetime, as_of: datetime) -> int:
+    # entry_time is never NULL here (OPEN_QUOTES_SQL filters it).
+    return max(0, int((as_of - ensure_utc(entry_time)).total_seconds()))
+
+
+def compute_open_quotes(db: Session, garage_id: int, as_of: datetime) -> list[dict]:
+    """ticket_id, entry_time, elapsed_seconds and fee_now per open ticket, as of as_of."""
+    rows = db.execute(OPEN_QUOTES_SQL, {"garage_id": garage_id}).mappings().all()
+    if not rows:
+        return []
+    first = rows[0]
+    garage_rates, garage_schedules = garage_rate_tables(
+        [
+            (
+                garage_id,
+                first["default_rate"],
+                first["day_rate"],
+                first["night_rate"],
+                first["open_time"],
+                first["close_time"],
+            )
+        ]
+    )
+    snapshot = RateSnapshot(
+        vehicle_type_rates=MappingProxyType(
+            {
+                r["vehicle_type_id"]: Decimal(r["vehicle_type_rate"])
+                for r in rows
+                if r["vehicle_type_rate"] is not None
+            }
+        ),
+        garage_rates=garage_rates,
+        garage_schedules=garage_schedules,
+    )
+    fees = price_many(
+        [PricingInput(r["entry_time"], as_of, r["vehicle_type_id"], garage_id) for r in rows],
+        snapshot,
+    )
+    return [
+        {
+            "ticket_id": r["ticket_id"],
+            "entry_time": r["entry_time"],
+            "elapsed_seconds": _elapsed_seconds(r["entry_time"], as_of),
+            "fee_now": fee,
+        }
+        for r, fee in zip(rows, fees)
+    ]
+
+
+# Keyed by (garage_id, minute bucket); an entry outlives its bucket by at most
+# the TTL, and nothing asks for a past bucket.
+quotes_cache = TTLCache("open_ticket_quotes", DASHBOARD_CACHE_MAX_ENTRIES, QUOTE_BUCKET_SECONDS)
+
+
+@on_garage_change
+def _invalidate_quotes(garage_id: int | None) -> None:
+    quotes_cache.invalidate(
+        lambda key: garage_id is None or (isinstance(key, tuple) and key[0] == garage_id)
+    )
+
+
+def cached_open_quotes(
+    db: Session, garage_id: int, now: datetime | None = None
+) -> tuple[datetime, list[dict]]:
+    """(as_of, quotes) for the current minute bucket through quotes_cache."""
+    as_of = quote_bucket(now)
+    return as_of, quotes_cache.get_or_compute(
+        (garage_id, as_of), lambda: compute_open_quotes(db, garage_id, as_of)
+    )
@@ -0,0 +1,84 @@
+"""
+daily_revenue rollup: payment totals per (garage_id, UTC day).
+
+Payment writes apply their delta in the same transaction (add_payment /
+remove_payment around the change), so the rollup commits or rolls back with
+the payment. Revenue reads take closed days from the rollup and today from
+live payments (dashboard_analytics.STATUS_CARDS_SQL). rebuild_daily_revenue()
+recomputes history, e.g. after bulk imports that bypass the API.
+"""
+
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# UTC calendar day of payments.paid_at (stored without time zone, written in
+# the session time zone; same convention as the paid_at range filters).
+PAYMENT_DAY_SQL = "(p.paid_at::timestamptz AT TIME ZONE 'UTC')::date"
+
+_APPLY_PAYMENT_SQL = text(
+    f"""
+    INSERT INTO daily_revenue (garage_id, day, amount, payment_count)
+    SELECT t.garage_id, {PAYMENT_DAY_SQL}, :sign * p.amount, :sign
+    FROM payments p
+    JOIN tickets t ON t.id = p.ticket_id
+    WHERE p.id = :payment_id AND p.paid_at IS NOT NULL
+    ON CONFLICT (garage_id, day) DO UPDATE
+    SET amount = daily_revenue.amount + EXCLUDED.amount,
+        payment_count = daily_revenue.payment_count + EXCLUDED.payment_count
+    """
+)
+
+_DELETE_RANGE_SQL = text(
+    """
+    DELETE FROM daily_revenue
+    WHERE (CAST(:garage_id AS integer) IS NULL OR garage_id = :garage_id)
+      AND (CAST(:from_day AS date) IS NULL OR day >= :from_day)
+      AND (CAST(:to_day AS date) IS NULL OR day <= :to_day)
+    """
+)
+
+_REBUILD_RANGE_SQL = text(
+    f"""
+    INSERT INTO daily_revenue (garage_id, day, amount, payment_count)
+    SELECT t.garage_id, {PAYMENT_DAY_SQL} AS day, SUM(p.amount), COUNT(*)
+    FROM payments p
+    JOIN tickets t ON t.id = p.ticket_id
+    WHERE p.paid_at IS NOT NULL
+      AND (CAST(:garage_id AS integer) IS NULL OR t.garage_id = :garage_id)
+      AND (CAST(:from_day AS date) IS NULL OR {PAYMENT_DAY_SQL} >= :from_day)
+      AND (CAST(:to_day AS date) IS NULL OR {PAYMENT_DAY_SQL} <= :to_day)
+    GROUP BY t.garage_id, {PAYMENT_DAY_SQL}
+    """
+)
+
+
+def add_payment(db: Session, payment_id: int) -> None:
+    """Count a flushed payment row into its day (call after flush)."""
+    db.execute(_APPLY_PAYMENT_SQL, {"payment_id": payment_id, "sign": 1})
+
+
+def remove_payment(db: Session, payment_id: int) -> None:
+    """Take a payment row out of its day (call before changing or deleting it)."""
+    db.execute(_APPLY_PAYMENT_SQL, {"payment_id": payment_id, "sign": -1})
+
+
+async def add_payment_async(db: AsyncSession, payment_id: int) -> None:
+    await db.execute(_APPLY_PAYMENT_SQL, {"payment_id": payment_id, "sign": 1})
+
+
+def rebuild_daily_revenue(
+    db: Session,
+    garage_id: int | None = None,
+    from_day: date | None = None,
+    to_day: date | None = None,
+) -> int:
+    """Recompute rollup rows in scope from payments; returns rows written.
+
+    Does not commit. Run while payment writes in the range are quiet.
+    """
+    params = {"garage_id": garage_id, "from_day": from_day, "to_day": to_day}
+    db.execute(_DELETE_RANGE_SQL, params)
+    return db.execute(_REBUILD_RANGE_SQL, params).rowcount
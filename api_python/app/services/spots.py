@@ -1,9 +1,12 @@
 ﻿from collections.abc import Sequence
 
 from sqlalchemy import exists, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from api_python.app import models, schemas
+from api_python.app.config import FREE_SPOT_INDEX, FREE_SPOT_PICK_RETRIES
+from api_python.app.services import occupancy
 
 
 def spot_ids_with_open_tickets(db: Session, spot_ids: Sequence[int]) -> set[int]:
@@ -52,14 +55,7 @@ def to_spot_response(
     )
 
 
-def allocate_free_spot(db: Session, garage_id: int, rentable_only: bool = False) -> int:
-    """
-    Vrati ID slobodnog spota za dati garage_id.
-    Slobodan = is_active AND nije vezan za OPEN ticket.
-    Koristi FOR UPDATE SKIP LOCKED da izbegne race kad viĹˇe entry poziva
-    doÄ‘e odjednom.
-    """
-    sql = """
+_ALLOCATE_FREE_SPOTS = """
     SELECT ps.id
     FROM parking_spot ps
     WHERE ps.garage_id = :garage_id
@@ -73,16 +69,163 @@ def allocate_free_spot(db: Session, garage_id: int, rentable_only: bool = False)
       )
     ORDER BY ps.id
     FOR UPDATE OF ps SKIP LOCKED -- zaĹˇtita od race pri istovremenom entry-u.
-    LIMIT 1
+    LIMIT {limit}
+"""
+
+ALLOCATE_FREE_SPOT_SQL = text(_ALLOCATE_FREE_SPOTS.format(limit="1"))
+# Bulk entry: up to :limit free spots, locked in one statement.
+ALLOCATE_FREE_SPOTS_SQL = text(_ALLOCATE_FREE_SPOTS.format(limit=":limit"))
+
+# A spot picked from the free-spot index, by primary key, if it is still free
+# (same conditions as above). CONFIRM locks it; when CONFIRM skips a spot,
+# STILL_FREE (no lock) tells a spot another entry has locked from a taken one.
+_FREE_SPOT_BY_ID = """
+    SELECT ps.id
+    FROM parking_spot ps
+    WHERE ps.id = :spot_id
+      AND ps.garage_id = :garage_id
+      AND ps.is_active = true
+      AND (:rentable_only = false OR ps.is_rentable = true)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM tickets t
+        WHERE t.spot_id = ps.id
+          AND t.ticket_state = 'OPEN'
+      )
+    {lock}
+"""
+
+CONFIRM_FREE_SPOT_SQL = text(_FREE_SPOT_BY_ID.format(lock="FOR UPDATE OF ps SKIP LOCKED"))
+STILL_FREE_SPOT_SQL = text(_FREE_SPOT_BY_ID.format(lock=""))
+
+
+def _pick_free_spot(db: Session, garage_id: int, rentable_only: bool) -> int | None:
+    """Spot from the free-spot index, locked; None sends the caller to the scan.
+
+    The returned spot stays pending in the index until the entry commits
+    (occupancy.ticket_opened) or fails (occupancy.entry_failed).
     """
+    if not occupancy.free_spots.loaded(garage_id):
+        occupancy.load_free_spots(db, garage_id)
+    skipped: list[int] = []
+    spot_id = None
+    try:
+        for _ in range(FREE_SPOT_PICK_RETRIES):
+            spot_id = occupancy.free_spots.pick(garage_id, rentable_only)
+            if spot_id is None:
+                return None
+            params = {"spot_id": spot_id, "garage_id": garage_id, "rentable_only": rentable_only}
+            if db.execute(CONFIRM_FREE_SPOT_SQL, params).scalar() is not None:
+                return spot_id
+            params["rentable_only"] = False
+            if db.execute(STILL_FREE_SPOT_SQL, params).scalar() is not None:
+                skipped.append(spot_id)
+            else:
+                occupancy.free_spots.release(garage_id, spot_id, free=False)
+            spot_id = None
+        return None
+    except Exception:
+        if spot_id is not None:
+            skipped.append(spot_id)
+        raise
+    finally:
+        # Locked by a concurrent entry: offered again if that entry fails.
+        for skipped_id in skipped:
+            occupancy.free_spots.release(garage_id, skipped_id)
+
+
+async def _pick_free_spot_async(
+    db: AsyncSession, garage_id: int, rentable_only: bool
+) -> int | None:
+    if not occupancy.free_spots.loaded(garage_id):
+        await occupancy.load_free_spots_async(db, garage_id)
+    skipped: list[int] = []
+    spot_id = None
+    try:
+        for _ in range(FREE_SPOT_PICK_RETRIES):
+            spot_id = occupancy.free_spots.pick(garage_id, rentable_only)
+            if spot_id is None:
+                return None
+            params = {"spot_id": spot_id, "garage_id": garage_id, "rentable_only": rentable_only}
+            if (await db.execute(CONFIRM_FREE_SPOT_SQL, params)).scalar() is not None:
+                return spot_id
+            params["rentable_only"] = False
+            if (await db.execute(STILL_FREE_SPOT_SQL, params)).scalar() is not None:
+                skipped.append(spot_id)
+            else:
+                occupancy.free_spots.release(garage_id, spot_id, free=False)
+            spot_id = None
+        return None
+    except Exception:
+        if spot_id is not None:
+            skipped.append(spot_id)
+        raise
+    finally:
+        for skipped_id in skipped:
+            occupancy.free_spots.release(garage_id, skipped_id)
+
+
+def allocate_free_spot(db: Session, garage_id: int, rentable_only: bool = False) -> int:
+    """
+    Vrati ID slobodnog spota za dati garage_id.
+    Slobodan = is_active AND nije vezan za OPEN ticket.
+    Koristi FOR UPDATE SKIP LOCKED da izbegne race kad viĹˇe entry poziva
+    doÄ‘e odjednom.
+
+    With FREE_SPOT_INDEX the spot comes from the in-memory index and the
+    scan only runs when FREE_SPOT_PICK_RETRIES picks were rejected or the
+    index has no free spot.
+    """
+    if FREE_SPOT_INDEX:
+        spot_id = _pick_free_spot(db, garage_id, rentable_only)
+        if spot_id is not None:
+            return spot_id
 
     spot_id = db.execute(
-        text(sql),
+        ALLOCATE_FREE_SPOT_SQL,
         {"garage_id": garage_id, "rentable_only": rentable_only},
     ).scalar()
 
     if spot_id is None:
         raise ValueError("No free spots available")
 
+    if FREE_SPOT_INDEX:
+        # The index missed a free spot; reload it on the next entry.
+        occupancy.free_spots.invalidate(garage_id)
     return int(spot_id)
 
+
+async def allocate_free_spot_async(
+    db: AsyncSession, garage_id: int, rentable_only: bool = False
+) -> int:
+    """Async variant of allocate_free_spot (same index, query and locking)."""
+    if FREE_SPOT_INDEX:
+        spot_id = await _pick_free_spot_async(db, garage_id, rentable_only)
+        if spot_id is not None:
+            return spot_id
+
+    result = await db.execute(
+        ALLOCATE_FREE_SPOT_SQL,
+        {"garage_id": garage_id, "rentable_only": rentable_only},
+    )
+    spot_id = result.scalar()
+
+    if spot_id is None:
+        raise ValueError("No free spots available")
+
+    if FREE_SPOT_INDEX:
+        occupancy.free_spots.invalidate(garage_id)
+    return int(spot_id)
+
+
+def allocate_free_spots(
+    db: Session, garage_id: int, count: int, rentable_only: bool = False
+) -> list[int]:
+    """Up to count free spot IDs (lowest first), locked like allocate_free_spot."""
+    if count <= 0:
+        return []
+    rows = db.execute(
+        ALLOCATE_FREE_SPOTS_SQL,
+        {"garage_id": garage_id, "rentable_only": rentable_only, "limit": count},
+    ).scalars()
+    return [int(spot_id) for spot_id in rows]
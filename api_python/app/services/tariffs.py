@@ -0,0 +1,102 @@
+"""
+Day/night tariff schedules (USE_TARIFF_SCHEDULES).
+
+A garage with day_rate, night_rate, open_time and close_time all set bills
+day_rate per hour from open_time to close_time (UTC; the day wraps past
+midnight when close_time < open_time) and night_rate for the rest of the
+day. The billed window is the ticket's billed hours starting at its entry
+minute, so a schedule changes what each billed minute costs, not how many
+minutes are billed.
+
+A schedule is compiled once into sorted minute-of-day boundaries with the
+running cost at each one. The cost of any window is then two bisects and
+some arithmetic, however many days it spans.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+MINUTES_PER_DAY = 24 * 60
+
+_CENT = Decimal("0.01")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MINUTE = timedelta(minutes=1)
+
+
+def epoch_minute(dt: datetime) -> int:
+    """Whole UTC minutes since 1970-01-01 (floored); dt must be timezone-aware."""
+    return (dt - _EPOCH) // _MINUTE
+
+
+@dataclass(frozen=True)
+class TariffSchedule:
+    """Hourly rates over one UTC day; segment i starts at minute starts[i]."""
+
+    starts: tuple[int, ...]
+    rates: tuple[Decimal, ...]
+    # Rate-minutes (rate per hour x minutes) from midnight to starts[i].
+    costs: tuple[Decimal, ...]
+    day_cost: Decimal
+
+    @classmethod
+    def from_segments(cls, segments: list[tuple[int, Decimal]]) -> "TariffSchedule":
+        """Compile (start minute, hourly rate) pairs; the first must start at 0."""
+        segments = sorted(segments)
+        if not segments or segments[0][0] != 0:
+            raise ValueError("segments must start at minute 0")
+        starts = tuple(start for start, _ in segments)
+        rates = tuple(rate for _, rate in segments)
+        costs = [Decimal(0)]
+        for start, end, rate in zip(starts, starts[1:] + (MINUTES_PER_DAY,), rates):
+            costs.append(costs[-1] + (end - start) * rate)
+        return cls(starts, rates, tuple(costs[:-1]), costs[-1])
+
+    def cost_before(self, minute: int) -> Decimal:
+        """Rate-minutes from the epoch to an absolute minute."""
+        days, minute_of_day = divmod(minute, MINUTES_PER_DAY)
+        i = bisect_right(self.starts, minute_of_day) - 1
+        return (
+            days * self.day_cost
+            + self.costs[i]
+            + (minute_of_day - self.starts[i]) * self.rates[i]
+        )
+
+    def fee(self, entry_time: datetime, minutes: int) -> Decimal:
+        """Fee for `minutes` billed from the (aware) entry time's minute, in cents."""
+        start = epoch_minute(entry_time)
+        cost = self.cost_before(start + minutes) - self.cost_before(start)
+        return (cost / 60).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _minute_of_day(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+@lru_cache(maxsize=1024)
+def compile_schedule(
+    day_rate: Decimal | None,
+    night_rate: Decimal | None,
+    open_time: time | None,
+    close_time: time | None,
+) -> TariffSchedule | None:
+    """Schedule for a garage's tariff columns; None unless all four are set and open != close."""
+    if day_rate is None or night_rate is None or open_time is None or close_time is None:
+        return None
+    opens, closes = _minute_of_day(open_time), _minute_of_day(close_time)
+    if opens == closes:
+        return None
+
+    def is_day(minute: int) -> bool:
+        if opens < closes:
+            return opens <= minute < closes
+        return minute >= opens or minute < closes
+
+    return TariffSchedule.from_segments(
+        [
+            (start, Decimal(day_rate) if is_day(start) else Decimal(night_rate))
+            for start in sorted({0, opens, closes})
+        ]
+    )
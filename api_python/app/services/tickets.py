@@ -1,15 +1,33 @@
 ﻿from datetime import datetime, timezone
 
+from sqlalchemy import case, insert, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from api_python.app import models, schemas
-from api_python.app.config import USE_API_FEE_CALCULATION
-from api_python.app.services.pricing import get_ticket_fee
-from api_python.app.services.spots import allocate_free_spot
+from api_python.app import events
+from api_python.app.config import USE_API_FEE_CALCULATION, USE_API_PAYMENT_STATUS
+from api_python.app.invalidation import garage_data_changed
+from api_python.app.services import occupancy
+from api_python.app.services.payments import recalc_ticket_payment_status
+from api_python.app.services.pricing import (
+    ensure_utc,
+    get_ticket_fee,
+    naive_utc,
+    price_tickets,
+)
+from api_python.app.services.spots import (
+    allocate_free_spot,
+    allocate_free_spot_async,
+    allocate_free_spots,
+)
 from api_python.app.services.tokens import generate_ticket_token
 
 MAX_RETRIES = 5
+MAX_BULK_ENTRIES = 500
+MAX_BULK_EXITS = 500
 
 
 class TicketServiceError(Exception):
@@ -52,21 +70,31 @@ class TicketTokenRetryExceededError(TicketServiceError):
     pass
 
 
+class InvalidTicketTimesError(TicketServiceError):
+    pass
+
+
 class TicketPersistenceError(TicketServiceError):
     pass
 
 
+def _validate_requested_spot(
+    spot: models.ParkingSpot | None, garage_id: int
+) -> None:
+    if not spot:
+        raise InvalidSpotError("Invalid spot_id")
+    if spot.garage_id != garage_id:
+        raise SpotGarageMismatchError("spot_id does not belong to garage")
+    if not spot.is_active:
+        raise SpotInactiveError("Spot is not active")
+
+
 def _resolve_spot_id(db: Session, data: schemas.TicketEntry) -> int:
     spot_id = data.spot_id
 
     if spot_id is not None:
         spot = db.get(models.ParkingSpot, spot_id)
-        if not spot:
-            raise InvalidSpotError("Invalid spot_id")
-        if spot.garage_id != data.garage_id:
-            raise SpotGarageMismatchError("spot_id does not belong to garage")
-        if not spot.is_active:
-            raise SpotInactiveError("Spot is not active")
+        _validate_requested_spot(spot, data.garage_id)
 
         occupied = (
             db.query(models.Ticket)
@@ -90,6 +118,72 @@ def _resolve_spot_id(db: Session, data: schemas.TicketEntry) -> int:
         raise NoFreeSpotError(str(exc)) from exc
 
 
+async def _resolve_spot_id_async(
+    db: AsyncSession, data: schemas.TicketEntry
+) -> int:
+    spot_id = data.spot_id
+
+    if spot_id is not None:
+        spot = await db.get(models.ParkingSpot, spot_id)
+        _validate_requested_spot(spot, data.garage_id)
+
+        occupied = (
+            await db.execute(
+                select(models.Ticket.id)
+                .where(
+                    models.Ticket.spot_id == spot_id,
+                    models.Ticket.ticket_state == "OPEN",
+                )
+                .limit(1)
+            )
+        ).first()
+        if occupied:
+            raise SpotOccupiedError("Spot is occupied")
+        return spot_id
+
+    try:
+        return await allocate_free_spot_async(
+            db,
+            data.garage_id,
+            rentable_only=data.rentable_only,
+        )
+    except ValueError as exc:
+        raise NoFreeSpotError(str(exc)) from exc
+
+
+def _open_ticket_values(
+    garage_id: int,
+    spot_id: int,
+    entry: schemas.TicketEntry | schemas.TicketBulkEntryItem,
+    now: datetime | None = None,
+) -> dict:
+    return {
+        "ticket_token": generate_ticket_token(garage_id),
+        "vehicle_id": entry.vehicle_id,
+        "entry_time": entry.entry_time or now or datetime.now(timezone.utc),
+        "ticket_state": "OPEN",
+        "payment_status": "NOT_APPLICABLE",
+        "operational_status": "OK",
+        "garage_id": garage_id,
+        "fee": 0,
+        "spot_id": spot_id,
+        "image_url": entry.image_url,
+    }
+
+
+def _new_open_ticket(data: schemas.TicketEntry, spot_id: int) -> models.Ticket:
+    return models.Ticket(**_open_ticket_values(data.garage_id, spot_id, data))
+
+
+# Token collisions are retried by the caller; any other integrity error is fatal.
+def _check_token_collision(exc: IntegrityError) -> None:
+    error_text = str(exc.orig).lower()
+    if "ticket_token" not in error_text:
+        raise TicketPersistenceError(
+            f"Database integrity error: {str(exc.orig)}"
+        ) from exc
+
+
 def create_ticket_entry(db: Session, data: schemas.TicketEntry) -> models.Ticket:
     vehicle = db.get(models.Vehicle, data.vehicle_id)
     if not vehicle:
@@ -97,35 +191,137 @@ def create_ticket_entry(db: Session, data: schemas.TicketEntry) -> models.Ticket
 
     spot_id = _resolve_spot_id(db, data)
 
+    try:
+        for _ in range(MAX_RETRIES):
+            try:
+                ticket = _new_open_ticket(data, spot_id)
+                db.add(ticket)
+                db.commit()
+                db.refresh(ticket)
+                occupancy.ticket_opened(ticket.garage_id, ticket.spot_id)
+                garage_data_changed(data.garage_id)
+                events.publish(
+                    "ticket_entered",
+                    ticket.garage_id,
+                    ticket_id=ticket.id,
+                    spot_id=ticket.spot_id,
+                )
+                return ticket
+            except IntegrityError as exc:
+                db.rollback()
+                _check_token_collision(exc)
+
+        raise TicketTokenRetryExceededError(
+            "Failed to generate unique ticket token after multiple retries"
+        )
+    except Exception:
+        # No-op once ticket_opened() has taken the spot.
+        occupancy.entry_failed(data.garage_id, spot_id)
+        raise
+
+
+async def create_ticket_entry_async(
+    db: AsyncSession, data: schemas.TicketEntry
+) -> models.Ticket:
+    """Async variant of create_ticket_entry (USE_ASYNC_DB)."""
+    vehicle = await db.get(models.Vehicle, data.vehicle_id)
+    if not vehicle:
+        raise InvalidVehicleError("Invalid vehicle_id")
+
+    spot_id = await _resolve_spot_id_async(db, data)
+
+    try:
+        for _ in range(MAX_RETRIES):
+            try:
+                ticket = _new_open_ticket(data, spot_id)
+                ticket.entry_time = naive_utc(ticket.entry_time)
+                db.add(ticket)
+                await db.commit()
+                await db.refresh(ticket)
+                occupancy.ticket_opened(ticket.garage_id, ticket.spot_id)
+                garage_data_changed(data.garage_id)
+                events.publish(
+                    "ticket_entered",
+                    ticket.garage_id,
+                    ticket_id=ticket.id,
+                    spot_id=ticket.spot_id,
+                )
+                return ticket
+            except IntegrityError as exc:
+                await db.rollback()
+                _check_token_collision(exc)
+
+        raise TicketTokenRetryExceededError(
+            "Failed to generate unique ticket token after multiple retries"
+        )
+    except Exception:
+        occupancy.entry_failed(data.garage_id, spot_id)
+        raise
+
+
+def create_ticket_entries(
+    db: Session, data: schemas.TicketBulkEntry
+) -> list[schemas.TicketResponse | TicketServiceError]:
+    """Open a ticket per entry; result i is entry i's ticket or why it failed.
+
+    Vehicles are checked in one query, spots allocated in one FOR UPDATE SKIP
+    LOCKED statement and the tickets inserted with one multi-row INSERT ...
+    RETURNING. Entries with an unknown vehicle or without a free spot fail on
+    their own; the rest commit together.
+    """
+    vehicle_ids = {e.vehicle_id for e in data.entries}
+    known = set(
+        db.scalars(select(models.Vehicle.id).where(models.Vehicle.id.in_(vehicle_ids)))
+    )
+    results: list = [
+        None if e.vehicle_id in known else InvalidVehicleError("Invalid vehicle_id")
+        for e in data.entries
+    ]
+    pending = [i for i, result in enumerate(results) if result is None]
+    spot_ids = allocate_free_spots(
+        db, data.garage_id, len(pending), rentable_only=data.rentable_only
+    )
+    for i in pending[len(spot_ids):]:
+        results[i] = NoFreeSpotError("No free spots available")
+    placed = list(zip(pending, spot_ids))
+    if not placed:
+        db.rollback()
+        return results
+
+    now = datetime.now(timezone.utc)
+    statement = insert(models.Ticket).returning(models.Ticket, sort_by_parameter_order=True)
     for _ in range(MAX_RETRIES):
+        rows = [
+            _open_ticket_values(data.garage_id, spot_id, data.entries[i], now)
+            for i, spot_id in placed
+        ]
         try:
-            ticket = models.Ticket(
-                ticket_token=generate_ticket_token(data.garage_id),
-                vehicle_id=data.vehicle_id,
-                entry_time=data.entry_time or datetime.now(timezone.utc),
-                ticket_state="OPEN",
-                payment_status="NOT_APPLICABLE",
-                operational_status="OK",
-                garage_id=data.garage_id,
-                fee=0,
-                spot_id=spot_id,
-                image_url=data.image_url,
-            )
-            db.add(ticket)
-            db.commit()
-            db.refresh(ticket)
-            return ticket
+            # A savepoint, so a token collision keeps the spot locks.
+            with db.begin_nested():
+                tickets = db.scalars(statement, rows).all()
+            break
         except IntegrityError as exc:
-            db.rollback()
-            error_text = str(exc.orig).lower()
-            if "ticket_token" not in error_text:
-                raise TicketPersistenceError(
-                    f"Database integrity error: {str(exc.orig)}"
-                ) from exc
-
-    raise TicketTokenRetryExceededError(
-        "Failed to generate unique ticket token after multiple retries"
-    )
+            _check_token_collision(exc)
+    else:
+        db.rollback()
+        raise TicketTokenRetryExceededError(
+            "Failed to generate unique ticket token after multiple retries"
+        )
+
+    # Built from the RETURNING values; commit expires the ORM objects.
+    for (i, _), ticket in zip(placed, tickets):
+        results[i] = schemas.TicketResponse.model_validate(ticket)
+    db.commit()
+    occupancy.tickets_opened(data.garage_id, [spot_id for _, spot_id in placed])
+    garage_data_changed(data.garage_id)
+    for i, _ in placed:
+        events.publish(
+            "ticket_entered",
+            data.garage_id,
+            ticket_id=results[i].id,
+            spot_id=results[i].spot_id,
+        )
+    return results
 
 
 # Validate that the requested spot can be assigned to this open ticket.
@@ -174,6 +370,7 @@ def apply_ticket_update(
     if "image_url" in updates:
         ticket.image_url = updates["image_url"]
 
+    old_spot_id = ticket.spot_id
     if "spot_id" in updates:
         if ticket.ticket_state != "OPEN":
             raise TicketStateError("Spot can only be changed on open tickets")
@@ -185,25 +382,175 @@ def apply_ticket_update(
 
     db.commit()
     db.refresh(ticket)
+    if ticket.spot_id != old_spot_id:
+        occupancy.ticket_moved(ticket.garage_id, old_spot_id, ticket.spot_id)
+    garage_data_changed(ticket.garage_id)
+    events.publish(
+        "ticket_updated", ticket.garage_id, ticket_id=ticket.id, spot_id=ticket.spot_id
+    )
     return ticket
 
 
-def close_ticket(
-    db: Session, ticket_id: int, data: schemas.TicketExit
+def edit_ticket_times(
+    db: Session, ticket_id: int, data: schemas.TicketTimesUpdate
 ) -> models.Ticket:
+    """Correct entry/exit times and fix the stored fee (and payment status) to match."""
     ticket = db.get(models.Ticket, ticket_id)
     if not ticket:
         raise TicketNotFoundError("Ticket not found")
 
+    updates = data.model_dump(exclude_unset=True)
+    if not updates:
+        return ticket
+    if any(value is None for value in updates.values()):
+        raise InvalidTicketTimesError("Times cannot be cleared")
+    if "exit_time" in updates and ticket.ticket_state != "CLOSED":
+        raise TicketStateError("Exit time can only be set on closed tickets")
+
+    entry_time = updates.get("entry_time", ticket.entry_time)
+    exit_time = updates.get("exit_time", ticket.exit_time)
+    exit_utc, entry_utc = ensure_utc(exit_time), ensure_utc(entry_time)
+    if exit_utc is not None and entry_utc is not None and exit_utc < entry_utc:
+        raise InvalidTicketTimesError("exit_time must not be before entry_time")
+
+    ticket.entry_time = entry_time
+    ticket.exit_time = exit_time
+    # Without USE_API_FEE_CALCULATION the DB trigger prices the update, as on exit.
+    if ticket.ticket_state == "CLOSED" and USE_API_FEE_CALCULATION:
+        ticket.fee = get_ticket_fee(ticket, db)
+        if USE_API_PAYMENT_STATUS:
+            recalc_ticket_payment_status(db, ticket.id)
+
+    db.commit()
+    db.refresh(ticket)
+    garage_data_changed(ticket.garage_id)
+    events.publish(
+        "ticket_updated",
+        ticket.garage_id,
+        ticket_id=ticket.id,
+        spot_id=ticket.spot_id,
+        fee=float(ticket.fee) if ticket.fee is not None else None,
+    )
+    return ticket
+
+
+def _mark_closed(ticket: models.Ticket | None, data: schemas.TicketExit) -> None:
+    if not ticket:
+        raise TicketNotFoundError("Ticket not found")
+
     if ticket.ticket_state != "OPEN" or ticket.exit_time is not None:
         raise TicketStateError("Ticket is not open")
 
     ticket.exit_time = data.exit_time or datetime.now(timezone.utc)
     ticket.ticket_state = "CLOSED"
+
+
+def _publish_closed(ticket: models.Ticket | schemas.TicketResponse) -> None:
+    events.publish(
+        "ticket_closed",
+        ticket.garage_id,
+        ticket_id=ticket.id,
+        spot_id=ticket.spot_id,
+        fee=float(ticket.fee) if ticket.fee is not None else None,
+    )
+
+
+def close_ticket(
+    db: Session, ticket_id: int, data: schemas.TicketExit
+) -> models.Ticket:
+    ticket = db.get(models.Ticket, ticket_id)
+    _mark_closed(ticket, data)
     if USE_API_FEE_CALCULATION:
         ticket.fee = get_ticket_fee(ticket, db)
 
     db.commit()
     db.refresh(ticket)
+    occupancy.ticket_closed(ticket.garage_id, ticket.spot_id)
+    garage_data_changed(ticket.garage_id)
+    _publish_closed(ticket)
     return ticket
 
+
+async def close_ticket_async(
+    db: AsyncSession, ticket_id: int, data: schemas.TicketExit
+) -> models.Ticket:
+    """Async variant of close_ticket (USE_ASYNC_DB)."""
+    ticket = await db.get(models.Ticket, ticket_id)
+    _mark_closed(ticket, data)
+    ticket.exit_time = naive_utc(ticket.exit_time)
+    if USE_API_FEE_CALCULATION:
+        # Pricing walks lazy relationships (vehicle -> vehicle_type); run_sync
+        # lets those loads happen on the async connection.
+        ticket.fee = await db.run_sync(
+            lambda session: get_ticket_fee(ticket, session)
+        )
+
+    await db.commit()
+    await db.refresh(ticket)
+    occupancy.ticket_closed(ticket.garage_id, ticket.spot_id)
+    garage_data_changed(ticket.garage_id)
+    _publish_closed(ticket)
+    return ticket
+
+
+def close_tickets(
+    db: Session, data: schemas.TicketBulkExit
+) -> list[schemas.TicketResponse | TicketServiceError]:
+    """Close many tickets; result i is exits[i]'s closed ticket or why it failed.
+
+    One UPDATE ... RETURNING locks and closes every open ticket in the list.
+    Fees are priced together against one RateSnapshot and stored with one
+    more UPDATE. Unknown or already closed tickets fail on their own, and so
+    does a repeated ticket_id after its first occurrence.
+    """
+    now = datetime.now(timezone.utc)
+    exit_times: dict[int, datetime] = {}
+    for item in data.exits:
+        exit_times.setdefault(item.ticket_id, item.exit_time or now)
+
+    t = models.Ticket
+    closed = db.scalars(
+        update(t)
+        .where(t.id.in_(list(exit_times)), t.ticket_state == "OPEN", t.exit_time.is_(None))
+        .values(exit_time=case(exit_times, value=t.id), ticket_state="CLOSED")
+        .returning(t)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    ).all()
+
+    if USE_API_FEE_CALCULATION and closed:
+        fees = dict(zip((ticket.id for ticket in closed), price_tickets(db, closed)))
+        db.execute(
+            update(t)
+            .where(t.id.in_(list(fees)))
+            .values(fee=case(fees, value=t.id))
+            .execution_options(synchronize_session=False)
+        )
+        for ticket in closed:
+            set_committed_value(ticket, "fee", fees[ticket.id])
+
+    # Built before commit, which expires the ORM objects.
+    by_id = {ticket.id: schemas.TicketResponse.model_validate(ticket) for ticket in closed}
+    missing = set(exit_times) - set(by_id)
+    existing = (
+        set(db.scalars(select(t.id).where(t.id.in_(missing)))) if missing else set()
+    )
+    results: list[schemas.TicketResponse | TicketServiceError] = []
+    seen: set[int] = set()
+    for item in data.exits:
+        ticket_id = item.ticket_id
+        if ticket_id in by_id and ticket_id not in seen:
+            results.append(by_id[ticket_id])
+        elif ticket_id in by_id or ticket_id in existing:
+            results.append(TicketStateError("Ticket is not open"))
+        else:
+            results.append(TicketNotFoundError("Ticket not found"))
+        seen.add(ticket_id)
+
+    db.commit()
+    for ticket in by_id.values():
+        occupancy.ticket_closed(ticket.garage_id, ticket.spot_id)
+    for garage_id in {ticket.garage_id for ticket in by_id.values()}:
+        garage_data_changed(garage_id)
+    for ticket in by_id.values():
+        _publish_closed(ticket)
+    return results
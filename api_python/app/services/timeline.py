@@ -0,0 +1,204 @@
+"""Bucketed occupancy timeline for GET /dashboard/timeline."""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+BUCKET_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# 100 days of hourly buckets; day buckets never get close.
+MAX_TIMELINE_BUCKETS = 2400
+
+
+def _utc_day_start(d: date) -> datetime:
+    return datetime.fromisoformat(d.isoformat() + "T00:00:00+00:00")
+
+
+# Buckets come from generate_series; tickets and payments are attached with
+# range joins. Every ticket present at some point in [start, end) is scanned
+# once: those that entered before start form the opening occupancy, the rest
+# become +1 (entry) / -1 (exit) events. Exits sort before entries at the same
+# instant so a car leaving as another arrives is not counted twice. Peak is
+# the higher of the bucket's opening occupancy and the running total after any
+# event inside it. The step is a fixed number of seconds, so day buckets stay
+# 24 h UTC regardless of the session time zone.
+TIMELINE_SQL = text(
+    """
+    WITH buckets AS (
+      SELECT b AS bucket_start, b + make_interval(secs => :step) AS bucket_end
+      FROM generate_series(
+        CAST(:start AS timestamptz),
+        CAST(:end AS timestamptz) - make_interval(secs => :step),
+        make_interval(secs => :step)
+      ) AS b
+    ),
+    scoped AS (
+      SELECT t.entry_time, t.exit_time
+      FROM tickets t
+      WHERE t.entry_time < :end
+        AND (t.exit_time IS NULL OR t.exit_time >= :start)
+        AND (CAST(:garage_id AS integer) IS NULL OR t.garage_id = :garage_id)
+    ),
+    opening AS (
+      SELECT COUNT(*) AS n FROM scoped WHERE entry_time < :start
+    ),
+    events AS (
+      SELECT entry_time AS at, 1 AS delta FROM scoped WHERE entry_time >= :start
+      UNION ALL
+      SELECT exit_time, -1 FROM scoped WHERE exit_time < :end
+    ),
+    running AS (
+      SELECT
+        at,
+        delta,
+        (SELECT n FROM opening)
+          + SUM(delta) OVER (ORDER BY at, delta ROWS UNBOUNDED PRECEDING)
+          AS occupancy
+      FROM events
+    ),
+    moves AS (
+      SELECT
+        b.bucket_start,
+        COUNT(*) FILTER (WHERE r.delta = 1) AS entries,
+        COUNT(*) FILTER (WHERE r.delta = -1) AS exits,
+        MAX(r.occupancy) AS event_peak
+      FROM buckets b
+      LEFT JOIN running r ON r.at >= b.bucket_start AND r.at < b.bucket_end
+      GROUP BY b.bucket_start
+    ),
+    revenue AS (
+      SELECT b.bucket_start, SUM(p.amount) AS revenue
+      FROM buckets b
+      JOIN payments p ON p.paid_at >= b.bucket_start AND p.paid_at < b.bucket_end
+      JOIN tickets t ON t.id = p.ticket_id
+      WHERE CAST(:garage_id AS integer) IS NULL OR t.garage_id = :garage_id
+      GROUP BY b.bucket_start
+    ),
+    opened AS (
+      SELECT
+        m.*,
+        (SELECT n FROM opening) + COALESCE(
+          SUM(m.entries - m.exits) OVER (
+            ORDER BY m.bucket_start
+            ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+          ),
+          0
+        ) AS opening_occupancy
+      FROM moves m
+    )
+    SELECT
+      o.bucket_start,
+      o.entries,
+      o.exits,
+      GREATEST(o.opening_occupancy, COALESCE(o.event_peak, 0)) AS peak_occupancy,
+      COALESCE(v.revenue, 0) AS revenue
+    FROM opened o
+    LEFT JOIN revenue v ON v.bucket_start = o.bucket_start
+    ORDER BY o.bucket_start
+    """
+)
+
+# Entries and exits per bucket and vehicle type (the timeline chart's series).
+# Only non-empty (bucket, type) pairs are returned.
+TIMELINE_BY_TYPE_SQL = text(
+    """
+    WITH buckets AS (
+      SELECT b AS bucket_start, b + make_interval(secs => :step) AS bucket_end
+      FROM generate_series(
+        CAST(:start AS timestamptz),
+        CAST(:end AS timestamptz) - make_interval(secs => :step),
+        make_interval(secs => :step)
+      ) AS b
+    ),
+    events AS (
+      SELECT t.entry_time AS at, 1 AS delta, t.vehicle_id
+      FROM tickets t
+      WHERE t.entry_time >= :start AND t.entry_time < :end
+        AND (CAST(:garage_id AS integer) IS NULL OR t.garage_id = :garage_id)
+      UNION ALL
+      SELECT t.exit_time, -1, t.vehicle_id
+      FROM tickets t
+      WHERE t.exit_time >= :start AND t.exit_time < :end
+        AND (CAST(:garage_id AS integer) IS NULL OR t.garage_id = :garage_id)
+    )
+    SELECT
+      b.bucket_start,
+      vt.type AS vehicle_type,
+      COUNT(*) FILTER (WHERE e.delta = 1) AS entries,
+      COUNT(*) FILTER (WHERE e.delta = -1) AS exits
+    FROM buckets b
+    JOIN events e ON e.at >= b.bucket_start AND e.at < b.bucket_end
+    LEFT JOIN vehicle v ON v.id = e.vehicle_id
+    LEFT JOIN vehicle_types vt ON vt.id = v.vehicle_type_id
+    GROUP BY b.bucket_start, vt.type
+    ORDER BY b.bucket_start, vt.type
+    """
+)
+
+
+def timeline_bounds(from_date: date, to_date: date) -> tuple[datetime, datetime]:
+    """UTC [start, end) for calendar dates from_date..to_date (inclusive)."""
+    return _utc_day_start(from_date), _utc_day_start(to_date + timedelta(days=1))
+
+
+def bucket_count(from_date: date, to_date: date, bucket: str) -> int:
+    start, end = timeline_bounds(from_date, to_date)
+    return (end - start) // BUCKET_STEPS[bucket]
+
+
+def _params(garage_id: int | None, from_date: date, to_date: date, bucket: str) -> dict:
+    start, end = timeline_bounds(from_date, to_date)
+    return {
+        "garage_id": garage_id,
+        "start": start,
+        "end": end,
+        "step": int(BUCKET_STEPS[bucket].total_seconds()),
+    }
+
+
+def timeline_statement(
+    garage_id: int | None, from_date: date, to_date: date, bucket: str
+):
+    return TIMELINE_SQL.bindparams(**_params(garage_id, from_date, to_date, bucket))
+
+
+def compute_timeline(
+    db: Session,
+    garage_id: int | None,
+    from_date: date,
+    to_date: date,
+    bucket: str,
+    by_vehicle_type: bool = False,
+) -> list[dict]:
+    """One dict per bucket (oldest first); vehicle_types only when requested."""
+    rows = db.execute(
+        timeline_statement(garage_id, from_date, to_date, bucket)
+    ).mappings().all()
+    per_type: dict[datetime, list[dict]] = {}
+    if by_vehicle_type:
+        for row in db.execute(
+            TIMELINE_BY_TYPE_SQL.bindparams(
+                **_params(garage_id, from_date, to_date, bucket)
+            )
+        ).mappings():
+            per_type.setdefault(row["bucket_start"], []).append(
+                {
+                    "vehicle_type": row["vehicle_type"],
+                    "entries": int(row["entries"]),
+                    "exits": int(row["exits"]),
+                }
+            )
+    return [
+        {
+            "bucket_start": row["bucket_start"],
+            "entries": int(row["entries"]),
+            "exits": int(row["exits"]),
+            "peak_occupancy": int(row["peak_occupancy"]),
+            "revenue": float(row["revenue"]),
+            "vehicle_types": (
+                per_type.get(row["bucket_start"], []) if by_vehicle_type else None
+            ),
+        }
+        for row in rows
+    ]
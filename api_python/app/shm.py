@@ -0,0 +1,122 @@
+"""
+Named shared-memory int64 arrays for tables every uvicorn worker on the host
+reads and updates (occupancy counters, change versions). Falls back to a
+process-local buffer when shared memory is disabled or unavailable.
+
+Every access should hold `cells.lock`: a thread lock plus an OS file lock
+(fcntl / msvcrt), so updates from different workers serialise.
+"""
+
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import threading
+from multiprocessing import shared_memory
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+_log = logging.getLogger(__name__)
+
+_ITEM_SIZE = 8
+
+
+class SegmentLock:
+    """Thread lock plus an exclusive lock on a file shared by the workers."""
+
+    def __init__(self, path: str | None) -> None:
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600) if path else None
+
+    def __enter__(self) -> None:
+        self._thread_lock.acquire()
+        if self._fd is None:
+            return
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if self._fd is not None:
+                if os.name == "nt":
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+def attach_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size, **kwargs)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=name, **kwargs)
+    if not kwargs and os.name != "nt":
+        # Before 3.13 every attaching process registers the segment and
+        # unlinks it on exit; workers come and go, the segment has to stay.
+        from multiprocessing import resource_tracker
+
+        # The tracker keys POSIX segments by the "/"-prefixed name.
+        resource_tracker.unregister("/" + shm.name, "shared_memory")
+    if shm.size < size:
+        raise ValueError(f"segment {name} is {shm.size} bytes, need {size}")
+    return shm
+
+
+class SharedCells:
+    """`length` int64 cells in segment `name` (zeroed when first created)."""
+
+    def __init__(self, name: str, length: int, shared: bool) -> None:
+        self.name = name
+        size = length * _ITEM_SIZE
+        self.shared = False
+        self._shm: shared_memory.SharedMemory | None = None
+        buffer: memoryview | bytearray = bytearray(size)
+        lock_path = None
+        if shared:
+            try:
+                shm = attach_segment(name, size)
+                assert shm.buf is not None  # None only after close()
+                self._shm = shm
+                buffer = shm.buf
+                lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+                self.shared = True
+            except (OSError, ValueError):
+                _log.warning(
+                    "shared memory %r unavailable, using a per-process table",
+                    name,
+                    exc_info=True,
+                )
+        self._view = memoryview(buffer)[:size]
+        self.cells = self._view.cast("q")
+        self.lock = SegmentLock(lock_path)
+        if self._shm is not None:
+            atexit.register(self.close)
+
+    def close(self) -> None:
+        """Detach from the segment (it stays for the other workers)."""
+        if self._shm is None:
+            return
+        self.cells.release()
+        self._view.release()
+        self._shm.close()
+        self._shm = None
+        atexit.unregister(self.close)
+
+    def unlink(self) -> None:
+        """Remove the segment itself (tests; workers keep theirs mapped)."""
+        if self._shm is not None:
+            self._shm.unlink()
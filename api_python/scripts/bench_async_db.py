@@ -0,0 +1,140 @@
+"""
+Compare sync vs async throughput of the gate hot path (entry + exit) on the
+same PostgreSQL database.
+
+Sync mode runs create_ticket_entry/close_ticket on a thread pool sized like
+Starlette's default (40); async mode runs the *_async variants on one event
+loop with the same number of in-flight operations.
+
+Run from project root:
+  python api_python/scripts/bench_async_db.py --garage-id 1 --vehicle-id 1
+
+The garage needs at least --concurrency free spots. Tickets created by the
+benchmark are deleted at the end unless --keep is passed.
+"""
+
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The async engine is only built when enabled; turn it on before app imports.
+os.environ.setdefault("USE_ASYNC_DB", "true")
+
+from api_python.app import models, schemas  # noqa: E402
+from api_python.app.db import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from api_python.app.services.tickets import (  # noqa: E402
+    TicketServiceError,
+    close_ticket,
+    close_ticket_async,
+    create_ticket_entry,
+    create_ticket_entry_async,
+)
+
+
+def _sync_cycle(garage_id: int, vehicle_id: int) -> int | None:
+    db = SessionLocal()
+    try:
+        ticket = create_ticket_entry(
+            db, schemas.TicketEntry(vehicle_id=vehicle_id, garage_id=garage_id)
+        )
+        close_ticket(db, ticket.id, schemas.TicketExit())
+        return ticket.id
+    except TicketServiceError:
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+async def _async_cycle(garage_id: int, vehicle_id: int) -> int | None:
+    async with AsyncSessionLocal() as db:
+        try:
+            ticket = await create_ticket_entry_async(
+                db, schemas.TicketEntry(vehicle_id=vehicle_id, garage_id=garage_id)
+            )
+            await close_ticket_async(db, ticket.id, schemas.TicketExit())
+            return ticket.id
+        except TicketServiceError:
+            await db.rollback()
+            return None
+
+
+def run_sync(args) -> tuple[float, list[int | None]]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(
+            pool.map(
+                lambda _: _sync_cycle(args.garage_id, args.vehicle_id),
+                range(args.operations),
+            )
+        )
+    return time.perf_counter() - start, results
+
+
+async def run_async(args) -> tuple[float, list[int | None]]:
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def bounded() -> int | None:
+        async with limit:
+            return await _async_cycle(args.garage_id, args.vehicle_id)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded() for _ in range(args.operations)))
+    elapsed = time.perf_counter() - start
+    await async_engine.dispose()
+    return elapsed, list(results)
+
+
+def _report(label: str, elapsed: float, results: list[int | None]) -> None:
+    ok = sum(1 for r in results if r is not None)
+    print(
+        f"{label:<6} {len(results):>6} ops  {ok:>6} ok  "
+        f"{elapsed:8.2f}s  {ok / elapsed:8.1f} entry+exit/s"
+    )
+
+
+def _cleanup(ticket_ids: list[int]) -> None:
+    if not ticket_ids:
+        return
+    db = SessionLocal()
+    try:
+        db.query(models.Ticket).filter(models.Ticket.id.in_(ticket_ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    description = (__doc__ or "").strip().partition("\n")[0]
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--garage-id", type=int, required=True)
+    parser.add_argument("--vehicle-id", type=int, required=True)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--keep", action="store_true", help="keep created tickets")
+    args = parser.parse_args()
+
+    sync_elapsed, sync_results = run_sync(args)
+    async_elapsed, async_results = asyncio.run(run_async(args))
+
+    print()
+    _report("sync", sync_elapsed, sync_results)
+    _report("async", async_elapsed, async_results)
+
+    if not args.keep:
+        _cleanup([r for r in sync_results + async_results if r is not None])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Flag closed tickets whose stored fee no longer matches their entry/exit times.
+
+Reads use the fee stored at exit (or by PATCH /tickets/{id}/times). Run this
+after direct SQL edits of ticket times, or periodically; it exits with status
+1 when drifted tickets are found. Tickets closed before a rate change also
+differ from current rates; use --since to skip them. --fix stores the
+expected fee (and payment status) instead; running API workers pick it up
+once their dashboard cache TTL expires.
+
+Run from project root:
+  python api_python/scripts/check_ticket_fees.py
+  python api_python/scripts/check_ticket_fees.py --garage-id 1 --since 2026-01-01 --fix
+"""
+
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+from datetime import date, datetime, timezone
+
+from api_python.app.db import SessionLocal
+from api_python.app.services.fee_drift import find_fee_drift, fix_fee_drift
+
+
+def _day_start(value: str) -> datetime:
+    return datetime.combine(date.fromisoformat(value), datetime.min.time(), timezone.utc)
+
+
+def main():
+    description = (__doc__ or "").strip().partition("\n")[0]
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--garage-id", type=int, default=None)
+    parser.add_argument(
+        "--since", type=_day_start, default=None, help="Only tickets exited on/after this UTC day."
+    )
+    parser.add_argument("--fix", action="store_true", help="Store the expected fees.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drifted = find_fee_drift(db, args.garage_id, args.since)
+        for row in drifted:
+            print(
+                f"ticket {row['ticket_id']} (garage {row['garage_id']}): "
+                f"stored {row['stored_fee']}, expected {row['expected_fee']} "
+                f"[{row['entry_time']} -> {row['exit_time']}]"
+            )
+        if args.fix and drifted:
+            fix_fee_drift(db, drifted)
+            db.commit()
+    finally:
+        db.close()
+
+    if not drifted:
+        print("tickets: no fee drift.")
+    elif args.fix:
+        print(f"tickets: {len(drifted)} fee(s) fixed.")
+    else:
+        print(f"tickets: {len(drifted)} ticket(s) with drifted fees.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Rebuild the daily_revenue rollup from payments.
+
+The payments API keeps the rollup current; run this after bulk imports or
+direct SQL edits to payments, or to verify the rollup. Deletes and recomputes
+the rows in scope in one transaction.
+
+Run from project root:
+  python api_python/scripts/rebuild_daily_revenue.py
+  python api_python/scripts/rebuild_daily_revenue.py --garage-id 1 --from 2026-01-01 --to 2026-01-31
+"""
+
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+from datetime import date
+
+from api_python.app.db import SessionLocal
+from api_python.app.services.revenue_rollup import rebuild_daily_revenue
+
+
+def main():
+    description = (__doc__ or "").strip().partition("\n")[0]
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--garage-id", type=int, default=None)
+    parser.add_argument("--from", dest="from_day", type=date.fromisoformat, default=None)
+    parser.add_argument("--to", dest="to_day", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_revenue(db, args.garage_id, args.from_day, args.to_day)
+        db.commit()
+    finally:
+        db.close()
+    print(f"daily_revenue: {rows} row(s) rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,13 @@ os.environ.setdefault("USE_API_PAYMENT_STATUS", "true")
 # Integration tests call the API without headers; .env may set API_KEY. Empty string makes
 # config treat auth as disabled; test_auth.py patches api_python.app.auth.API_KEY when it needs auth on.
 os.environ["API_KEY"] = ""
+# Occupancy counters per test process, not in a segment shared with a running server.
+os.environ.setdefault("OCCUPANCY_SHARED_MEMORY", "false")
+# Dashboard events go straight to the in-process hub (NOTIFY is sent on a
+# separate connection and would escape the test transaction).
+os.environ.setdefault("DASHBOARD_EVENTS_PG_NOTIFY", "false")
+# ETags only change on writes, so a test cannot straddle a time window.
+os.environ.setdefault("ETAG_WINDOW_SECONDS", "0")
 
 import pytest
 from fastapi.testclient import TestClient
@@ -15,7 +22,12 @@ from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 from api_python.app.main import app
-from api_python.app.db import get_db, engine
+from api_python.app.db import get_db, get_db_readonly, engine
+from api_python.app.cache import CACHES
+from api_python.app.events import hub as event_hub
+from api_python.app.db_metrics import query_budget as _query_budget
+from api_python.app.services.occupancy import counters as occupancy_counters
+from api_python.app.services.occupancy import free_spots
 
 # Session bound to a connection; we control the transaction and roll back after each test.
 _SessionLocal = sessionmaker(autocommit=False, autoflush=False)
@@ -72,6 +84,14 @@ def client() -> TestClient:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    # Replica reads must see the test transaction too (one database behind both).
+    app.dependency_overrides[get_db_readonly] = override_get_db
+    # Cached responses would outlive the rolled-back transaction of an earlier test.
+    for cache in CACHES.values():
+        cache.clear()
+    occupancy_counters.clear()
+    free_spots.clear()
+    event_hub.clear()
     try:
         yield TestClient(app)
     finally:
@@ -81,3 +101,61 @@ def client() -> TestClient:
             transaction.rollback()
         connection.close()
 
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Statement budget for a block of requests:
+
+        with query_budget(2):
+            client.get("/tickets")
+
+    Fails the test (QueryBudgetExceeded) listing the statements if more ran.
+    """
+    return _query_budget
+
+
+@pytest.fixture
+def make_garage(client: TestClient):
+    """
+    Create a garage with one active, non-rentable spot per code:
+
+        garage_id, spot_ids = make_garage("Garage", ["A1", "A2"])
+    """
+
+    def make(name: str, codes: list[str]) -> tuple[int, list[int]]:
+        r = client.post(
+            "/garages",
+            json={"name": name, "capacity": len(codes), "default_rate": "40.00"},
+        )
+        assert r.status_code == 200
+        garage_id = r.json()["id"]
+        spot_ids = []
+        for code in codes:
+            r = client.post(
+                "/spots",
+                json={"garage_id": garage_id, "code": code, "is_rentable": False, "is_active": True},
+            )
+            assert r.status_code == 200
+            spot_ids.append(r.json()["id"])
+        return garage_id, spot_ids
+
+    return make
+
+
+@pytest.fixture
+def make_vehicle(client: TestClient):
+    """Create a vehicle with a new vehicle type: make_vehicle("ABC-123", "SomeVT") -> id."""
+
+    def make(plate: str, vt_name: str) -> int:
+        r = client.post("/vehicle-types", json={"type": vt_name, "rate": "20.00"})
+        assert r.status_code == 200
+        r = client.post(
+            "/vehicles",
+            json={"licence_plate": plate, "vehicle_type_id": r.json()["id"], "status": 1},
+        )
+        assert r.status_code == 200
+        return r.json()["id"]
+
+    return make
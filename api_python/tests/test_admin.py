@@ -0,0 +1,37 @@
+"""Admin (operational metrics) endpoint tests."""
+
+from fastapi.testclient import TestClient
+
+
+def test_db_pool_metrics_shape(client: TestClient) -> None:
+    """GET /admin/db/pool returns configured settings and the primary pool."""
+    r = client.get("/admin/db/pool")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["settings"]["pool_size"] >= 0
+    names = [p["name"] for p in data["pools"]]
+    assert "primary" in names
+    primary = next(p for p in data["pools"] if p["name"] == "primary")
+    for key in ("checked_out", "idle", "overflow", "waits", "wait_max_ms", "timeouts"):
+        assert key in primary
+
+
+def test_db_pool_metrics_counts_checkouts(client: TestClient) -> None:
+    """The client fixture holds a checked-out connection, so checkouts >= 1."""
+    primary = next(
+        p for p in client.get("/admin/db/pool").json()["pools"] if p["name"] == "primary"
+    )
+    assert primary["checkouts"] >= 1
+    assert primary["checked_out"] >= 1
+
+
+def test_cache_metrics_count_hits(client: TestClient) -> None:
+    params = {"today": "2026-01-15", "month_from": "2026-01-01", "month_to": "2026-01-31"}
+    client.get("/dashboard/analytics", params=params)
+    client.get("/dashboard/analytics", params=params)
+    r = client.get("/admin/cache")
+    assert r.status_code == 200
+    cache = next(c for c in r.json() if c["name"] == "dashboard_analytics")
+    assert cache["hits"] >= 1
+    assert cache["misses"] >= 1
+    assert cache["size"] >= 1
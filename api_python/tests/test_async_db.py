@@ -0,0 +1,180 @@
+"""USE_ASYNC_DB routes (entry, exit, payment) end to end on the async driver."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from api_python.app import models, schemas
+from api_python.app import db as db_module
+from api_python.app.db import ASYNC_DATABASE_URL, _create_async_engine, get_async_db
+from api_python.app.error_handlers import register_exception_handlers
+from api_python.app.routers.payments import create_payment_async
+from api_python.app.routers.tickets import ticket_entry_async, ticket_exit_async
+from api_python.app.services.occupancy import counters as occupancy_counters
+from api_python.app.services.occupancy import free_spots
+
+
+def _async_app(session: AsyncSession) -> FastAPI:
+    """The routes main.py mounts with USE_ASYNC_DB=true, on the test session."""
+    app = FastAPI()
+    register_exception_handlers(app)
+    app.add_api_route(
+        "/tickets/entry",
+        ticket_entry_async,
+        methods=["POST"],
+        response_model=schemas.TicketResponse,
+    )
+    app.add_api_route(
+        "/tickets/{ticket_id}/exit",
+        ticket_exit_async,
+        methods=["POST"],
+        response_model=schemas.TicketResponse,
+    )
+    app.add_api_route(
+        "/payments",
+        create_payment_async,
+        methods=["POST"],
+        response_model=schemas.PaymentResponse,
+    )
+
+    async def override_get_async_db():
+        yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return app
+
+
+def _run(scenario):
+    """Run scenario(session, client) in a transaction that is rolled back.
+
+    The routes' commit() only releases a savepoint (create_savepoint), like
+    the sync client fixture's fake commit.
+    """
+
+    async def run():
+        occupancy_counters.clear()
+        free_spots.clear()
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                transaction = await connection.begin()
+                session = AsyncSession(
+                    bind=connection,
+                    expire_on_commit=False,
+                    join_transaction_mode="create_savepoint",
+                )
+                try:
+                    transport = httpx.ASGITransport(app=_async_app(session))
+                    async with httpx.AsyncClient(
+                        transport=transport, base_url="http://test"
+                    ) as client:
+                        return await scenario(session, client)
+                finally:
+                    await session.close()
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+            occupancy_counters.clear()
+            free_spots.clear()
+
+    return asyncio.run(run())
+
+
+async def _garage_and_vehicle(session: AsyncSession, name: str, plate: str) -> tuple[int, int]:
+    garage = models.ParkingConfig(name=name, capacity=1, default_rate=Decimal("40.00"))
+    vehicle_type = models.VehicleType(type=f"{name} VT", rate=Decimal("20.00"))
+    session.add_all([garage, vehicle_type])
+    await session.flush()
+    session.add(
+        models.ParkingSpot(garage_id=garage.id, code="AS1", is_rentable=False, is_active=True)
+    )
+    vehicle = models.Vehicle(licence_plate=plate, vehicle_type_id=vehicle_type.id, status=1)
+    session.add(vehicle)
+    await session.flush()
+    return garage.id, vehicle.id
+
+
+def test_async_entry_exit_and_payment() -> None:
+    async def scenario(session: AsyncSession, client: httpx.AsyncClient):
+        garage_id, vehicle_id = await _garage_and_vehicle(session, "Async Garage", "ASY-001")
+        r = await client.post(
+            "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+        )
+        assert r.status_code == 200, r.text
+        ticket = r.json()
+        assert ticket["ticket_state"] == "OPEN"
+
+        # No free spot left: the error goes through the same handlers.
+        r = await client.post(
+            "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+        )
+        assert r.status_code == 409
+
+        exit_time = datetime.now(timezone.utc) + timedelta(hours=2)
+        r = await client.post(
+            f"/tickets/{ticket['id']}/exit", json={"exit_time": exit_time.isoformat()}
+        )
+        assert r.status_code == 200, r.text
+        closed = r.json()
+        assert closed["ticket_state"] == "CLOSED"
+        assert float(closed["fee"]) > 0
+
+        r = await client.post(
+            "/payments",
+            json={"ticket_id": ticket["id"], "amount": closed["fee"], "method": "CASH"},
+        )
+        assert r.status_code == 200, r.text
+        payment_status = await session.scalar(
+            select(models.Ticket.payment_status).where(models.Ticket.id == ticket["id"])
+        )
+        assert payment_status == "PAID"
+
+    _run(scenario)
+
+
+def test_async_entry_stores_offset_times_as_utc() -> None:
+    async def scenario(session: AsyncSession, client: httpx.AsyncClient):
+        garage_id, vehicle_id = await _garage_and_vehicle(session, "Async UTC Garage", "ASY-002")
+        r = await client.post(
+            "/tickets/entry",
+            json={
+                "vehicle_id": vehicle_id,
+                "garage_id": garage_id,
+                "entry_time": "2026-03-01T10:00:00+02:00",
+            },
+        )
+        assert r.status_code == 200, r.text
+        stored = await session.scalar(
+            select(models.Ticket.entry_time).where(models.Ticket.id == r.json()["id"])
+        )
+        assert stored == datetime(2026, 3, 1, 8, 0)
+
+    _run(scenario)
+
+
+def test_async_psycopg_engine_caps_prepared_statements(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """The async engine gets the same psycopg 3 prepared-statement settings."""
+    # Not psycopg's own default of 100, so the listener is what sets it.
+    monkeypatch.setattr(db_module, "_prepared_max", 7)
+    url = make_url(ASYNC_DATABASE_URL).set(drivername="postgresql+psycopg")
+
+    async def prepared_max() -> int:
+        engine = _create_async_engine(url.render_as_string(hide_password=False), "test")
+        try:
+            async with engine.connect() as connection:
+                raw = await connection.get_raw_connection()
+                return raw.driver_connection.prepared_max
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(prepared_max()) == 7
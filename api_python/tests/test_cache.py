@@ -0,0 +1,40 @@
+"""TTLCache (app/cache.py) against invalidations that race a computation."""
+
+from api_python.app.cache import CACHES, TTLCache
+
+
+def test_invalidate_during_compute_is_not_overwritten() -> None:
+    cache = TTLCache("test_race", maxsize=8, ttl_seconds=60, register=False)
+
+    def compute_then_write() -> str:
+        # A write commits and invalidates while the old data is being read.
+        cache.invalidate(lambda key: key == "garage-1")
+        return "before write"
+
+    assert cache.get_or_compute("garage-1", compute_then_write) == "before write"
+    assert cache.get("garage-1") is None
+    assert cache.get_or_compute("garage-1", lambda: "after write") == "after write"
+    assert cache.get("garage-1") == "after write"
+    assert "test_race" not in CACHES
+
+
+def test_unrelated_invalidation_keeps_the_result() -> None:
+    cache = TTLCache("test_race_other_key", maxsize=8, ttl_seconds=60, register=False)
+
+    def compute() -> str:
+        cache.invalidate(lambda key: key == "garage-2")
+        return "value"
+
+    cache.get_or_compute("garage-1", compute)
+    assert cache.get("garage-1") == "value"
+
+
+def test_clear_during_compute_is_not_overwritten() -> None:
+    cache = TTLCache("test_race_clear", maxsize=8, ttl_seconds=60, register=False)
+
+    def compute() -> str:
+        cache.clear()
+        return "value"
+
+    cache.get_or_compute("garage-1", compute)
+    assert cache.get("garage-1") is None
@@ -0,0 +1,310 @@
+"""Dashboard analytics API integration tests."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _analytics_params(garage_id: int | None = None) -> dict:
+    # Revenue days are UTC days (payments are stamped in UTC).
+    today = datetime.now(timezone.utc).date()
+    params = {
+        "today": today.isoformat(),
+        "month_from": today.replace(day=1).isoformat(),
+        "month_to": today.isoformat(),
+    }
+    if garage_id is not None:
+        params["garage_id"] = garage_id
+    return params
+
+
+def test_dashboard_analytics_shape(client: TestClient) -> None:
+    """GET /dashboard/analytics returns every status-card and revenue field."""
+    r = client.get("/dashboard/analytics", params=_analytics_params())
+    assert r.status_code == 200
+    data = r.json()
+    for key in (
+        "free_spots",
+        "occupied_spots",
+        "inactive_spots",
+        "open_tickets",
+        "today_revenue",
+        "month_revenue",
+        "unpaid_partially_paid_count",
+        "total_outstanding",
+    ):
+        assert key in data
+
+
+def test_dashboard_analytics_counts_for_garage(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    """One open ticket in a 3-spot garage with one inactive spot: 1 free, 1 occupied."""
+    garage_id, _ = make_garage("Analytics Garage", ["AN1", "AN2", "AN3"])
+    spots = client.get(
+        "/spots", params={"garage_id": garage_id, "active_only": False}
+    ).json()["items"]
+    r = client.patch(f"/spots/{spots[0]['id']}", json={"is_active": False})
+    assert r.status_code == 200
+    vehicle_id = make_vehicle("ANL-001", "AnalyticsVT")
+    r = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    )
+    assert r.status_code == 200
+
+    r = client.get("/dashboard/analytics", params=_analytics_params(garage_id))
+    assert r.status_code == 200
+    data = r.json()
+    assert data["free_spots"] == 1
+    assert data["occupied_spots"] == 1
+    assert data["inactive_spots"] == 1
+    assert data["open_tickets"] == 1
+    assert data["today_revenue"] == 0
+    assert data["unpaid_partially_paid_count"] == 0
+
+
+def test_dashboard_analytics_revenue_includes_payment(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    """A payment recorded today shows up in today's and this month's revenue."""
+    garage_id, _ = make_garage("Revenue Garage", ["RV1"])
+    vehicle_id = make_vehicle("REV-001", "RevenueVT")
+    r = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    )
+    ticket_id = r.json()["id"]
+    r = client.post(f"/tickets/{ticket_id}/exit", json={})
+    assert r.status_code == 200
+    r = client.post(
+        "/payments",
+        json={"ticket_id": ticket_id, "amount": "10.00", "method": "CASH"},
+    )
+    assert r.status_code == 200
+
+    data = client.get(
+        "/dashboard/analytics", params=_analytics_params(garage_id)
+    ).json()
+    assert data["today_revenue"] == pytest.approx(10.0)
+    assert data["month_revenue"] == pytest.approx(10.0)
+
+
+def test_dashboard_analytics_per_garage_rows(client: TestClient, make_garage) -> None:
+    """per_garage=true returns rows whose counts add up to the totals.
+
+    Cold occupancy counters cost one more query (loading every garage at once).
+    """
+    garage_id, _ = make_garage("Per Garage", ["PG1", "PG2"])
+    r = client.get(
+        "/dashboard/analytics", params={**_analytics_params(), "per_garage": True}
+    )
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "2"
+    data = r.json()
+    rows = {row["garage_id"]: row for row in data["garages"]}
+    assert rows[garage_id]["free_spots"] == 2
+    assert rows[garage_id]["name"] == "Per Garage"
+    for key in ("free_spots", "occupied_spots", "inactive_spots", "open_tickets"):
+        assert sum(row[key] for row in data["garages"]) == data[key]
+
+    data = client.get(
+        "/dashboard/analytics", params=_analytics_params(garage_id)
+    ).json()
+    assert data["garages"] is None
+    assert data["free_spots"] == 2
+
+
+def test_dashboard_analytics_batch_rows_and_total(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    """One grouped statement for the listed garages, plus their grand total."""
+    first, _ = make_garage("Batch Garage A", ["BA1", "BA2"])
+    second, _ = make_garage("Batch Garage B", ["BB1"])
+    make_garage("Batch Garage C", ["BC1"])
+    vehicle_id = make_vehicle("BAT-001", "BatchVT")
+    r = client.post("/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": first})
+    assert r.status_code == 200
+
+    params = {
+        **_analytics_params(),
+        # Duplicates are ignored, unknown ids skipped.
+        "garage_ids": [second, first, first, 999999999],
+    }
+    r = client.get("/dashboard/analytics/batch", params=params)
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "2"
+    data = r.json()
+    assert [row["garage_id"] for row in data["garages"]] == [first, second]
+    assert data["garages"][0]["occupied_spots"] == 1
+    for key in ("free_spots", "occupied_spots", "inactive_spots", "open_tickets"):
+        assert data["total"][key] == sum(row[key] for row in data["garages"])
+    assert data["total"]["free_spots"] == 2
+    assert data["total"]["garages"] is None
+
+    everything = client.get("/dashboard/analytics/batch", params=_analytics_params())
+    ids = {row["garage_id"] for row in everything.json()["garages"]}
+    assert {first, second} < ids
+
+
+def test_dashboard_analytics_batch_limits_garage_count(client: TestClient) -> None:
+    params = {**_analytics_params(), "garage_ids": list(range(1, 502))}
+    r = client.get("/dashboard/analytics/batch", params=params)
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "TOO_MANY_GARAGES"
+
+
+def test_dashboard_analytics_cached_until_garage_write(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    """A repeat poll is served from cache; a ticket entry in the garage invalidates it."""
+    garage_id, _ = make_garage("Cache Garage", ["CA1", "CA2"])
+    other_id, _ = make_garage("Other Cache Garage", ["CB1"])
+    params = _analytics_params(garage_id)
+    # Status cards plus loading the garage's occupancy counters.
+    first = client.get("/dashboard/analytics", params=params)
+    assert first.headers["X-DB-Query-Count"] == "2"
+    other = client.get("/dashboard/analytics", params=_analytics_params(other_id))
+    assert other.headers["X-DB-Query-Count"] == "2"
+
+    again = client.get("/dashboard/analytics", params=params)
+    assert again.headers["X-DB-Query-Count"] == "0"
+    assert again.json() == first.json()
+
+    vehicle_id = make_vehicle("CCH-001", "CacheVT")
+    r = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    )
+    assert r.status_code == 200
+
+    # The entry updated the counters in place; only the status cards rerun.
+    after = client.get("/dashboard/analytics", params=params)
+    assert after.headers["X-DB-Query-Count"] == "1"
+    assert after.json()["open_tickets"] == 1
+    # Other garages keep their entries.
+    other = client.get("/dashboard/analytics", params=_analytics_params(other_id))
+    assert other.headers["X-DB-Query-Count"] == "0"
+
+
+def test_past_revenue_comes_from_rollup(client: TestClient, make_garage, make_vehicle) -> None:
+    """Payment create/update/delete keep daily_revenue in step for closed days."""
+    garage_id, _ = make_garage("Rollup Garage", ["RU1"])
+    vehicle_id = make_vehicle("ROL-001", "RollupVT")
+    ticket_id = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    ).json()["id"]
+    assert client.post(f"/tickets/{ticket_id}/exit", json={}).status_code == 200
+    # A month entirely in the past: every day is served from the rollup.
+    params = {
+        "garage_id": garage_id,
+        "today": "2020-01-10",
+        "month_from": "2020-01-01",
+        "month_to": "2020-01-31",
+    }
+
+    r = client.post(
+        "/payments",
+        json={
+            "ticket_id": ticket_id,
+            "amount": "10.00",
+            "method": "CASH",
+            "paid_at": "2020-01-10T12:00:00Z",
+        },
+    )
+    assert r.status_code == 200
+    payment_id = r.json()["id"]
+    data = client.get("/dashboard/analytics", params=params).json()
+    assert data["today_revenue"] == pytest.approx(10.0)
+    assert data["month_revenue"] == pytest.approx(10.0)
+
+    r = client.put(
+        f"/payments/{payment_id}",
+        json={"amount": "15.00", "method": "CASH", "paid_at": "2020-01-20T12:00:00Z"},
+    )
+    assert r.status_code == 200
+    data = client.get("/dashboard/analytics", params=params).json()
+    assert data["today_revenue"] == pytest.approx(0.0)
+    assert data["month_revenue"] == pytest.approx(15.0)
+
+    assert client.delete(f"/payments/{payment_id}").status_code == 200
+    data = client.get("/dashboard/analytics", params=params).json()
+    assert data["month_revenue"] == pytest.approx(0.0)
+
+
+def test_dashboard_timeline_buckets(client: TestClient, make_garage, make_vehicle) -> None:
+    """Two entries, one exit and a payment today land in today's bucket."""
+    garage_id, _ = make_garage("Timeline Garage", ["TL1", "TL2"])
+    first = make_vehicle("TML-001", "TimelineVT")
+    second = make_vehicle("TML-002", "TimelineVT2")
+    ticket_id = client.post(
+        "/tickets/entry", json={"vehicle_id": first, "garage_id": garage_id}
+    ).json()["id"]
+    r = client.post(
+        "/tickets/entry", json={"vehicle_id": second, "garage_id": garage_id}
+    )
+    assert r.status_code == 200
+    assert client.post(f"/tickets/{ticket_id}/exit", json={}).status_code == 200
+    r = client.post(
+        "/payments", json={"ticket_id": ticket_id, "amount": "10.00", "method": "CASH"}
+    )
+    assert r.status_code == 200
+
+    today = datetime.now(timezone.utc).date()
+    r = client.get(
+        "/dashboard/timeline",
+        params={
+            "garage_id": garage_id,
+            "from": (today - timedelta(days=2)).isoformat(),
+            "to": today.isoformat(),
+            "by_vehicle_type": True,
+        },
+    )
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "2"
+    buckets = r.json()["buckets"]
+    assert len(buckets) == 3
+    assert [b["entries"] for b in buckets] == [0, 0, 2]
+    last = buckets[-1]
+    assert last["exits"] == 1
+    assert last["peak_occupancy"] == 2
+    assert last["revenue"] == pytest.approx(10.0)
+    assert {t["vehicle_type"]: t["entries"] for t in last["vehicle_types"]} == {
+        "TimelineVT": 1,
+        "TimelineVT2": 1,
+    }
+    assert buckets[0]["vehicle_types"] == []
+
+    r = client.get(
+        "/dashboard/timeline",
+        params={
+            "garage_id": garage_id,
+            "from": today.isoformat(),
+            "to": today.isoformat(),
+            "bucket": "hour",
+        },
+    )
+    assert r.status_code == 200
+    hours = r.json()["buckets"]
+    assert len(hours) == 24
+    assert sum(b["entries"] for b in hours) == 2
+    assert max(b["peak_occupancy"] for b in hours) == 2
+    assert hours[0]["vehicle_types"] is None
+
+
+def test_dashboard_timeline_rejects_bad_ranges(client: TestClient) -> None:
+    """Inverted ranges and too many hourly buckets are 400s."""
+    today = datetime.now(timezone.utc).date()
+    r = client.get(
+        "/dashboard/timeline",
+        params={"from": today.isoformat(), "to": (today - timedelta(days=1)).isoformat()},
+    )
+    assert r.status_code == 400
+    r = client.get(
+        "/dashboard/timeline",
+        params={
+            "from": (today - timedelta(days=365)).isoformat(),
+            "to": today.isoformat(),
+            "bucket": "hour",
+        },
+    )
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "TIMELINE_TOO_MANY_BUCKETS"
@@ -0,0 +1,143 @@
+"""ETag / If-None-Match on polled GETs, driven by per-garage change versions."""
+
+from fastapi.testclient import TestClient
+
+from api_python.app.change_versions import ChangeVersions, versions
+from api_python.app.etag import etag_matches
+
+
+def _etag(client: TestClient, url: str, **params) -> str:
+    r = client.get(url, params=params)
+    assert r.status_code == 200
+    assert r.headers["ETag"].startswith('W/"')
+    return r.headers["ETag"]
+
+
+def _revalidate(client: TestClient, url: str, etag: str, **params):
+    return client.get(url, params=params, headers={"If-None-Match": etag})
+
+
+def test_matching_etag_gets_304_without_queries(client: TestClient, make_garage) -> None:
+    garage_id, _ = make_garage("ETag Garage", ["ET1"])
+    for url, params in [
+        ("/garages/overview", {"garage_id": garage_id}),
+        ("/spots", {"garage_id": garage_id}),
+        ("/tickets/dashboard", {"garage_id": garage_id}),
+        (
+            "/dashboard/analytics",
+            {
+                "garage_id": garage_id,
+                "today": "2025-03-10",
+                "month_from": "2025-03-01",
+                "month_to": "2025-03-31",
+            },
+        ),
+    ]:
+        etag = _etag(client, url, **params)
+        r = _revalidate(client, url, etag, **params)
+        assert r.status_code == 304, url
+        assert r.content == b""
+        assert r.headers["ETag"] == etag
+        assert r.headers["X-DB-Query-Count"] == "0"
+
+
+def test_writes_change_the_garage_etag_only(client: TestClient, make_garage, make_vehicle) -> None:
+    garage_id, _ = make_garage("ETag Write Garage", ["EW1"])
+    other_id, _ = make_garage("ETag Other Garage", ["EO1"])
+    vehicle_id = make_vehicle("ETG-001", "ETagVT")
+    mine = _etag(client, "/garages/overview", garage_id=garage_id)
+    all_garages = _etag(client, "/garages/overview")
+
+    r = client.post("/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": other_id})
+    assert r.status_code == 200
+    assert _revalidate(client, "/garages/overview", mine, garage_id=garage_id).status_code == 304
+    assert _revalidate(client, "/garages/overview", all_garages).status_code == 200
+
+    ticket = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    ).json()
+    r = _revalidate(client, "/garages/overview", mine, garage_id=garage_id)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != mine
+    assert r.json()[0]["occupied_spots"] == 1
+
+    mine = r.headers["ETag"]
+    assert client.post(f"/tickets/{ticket['id']}/exit", json={}).status_code == 200
+    assert _revalidate(client, "/garages/overview", mine, garage_id=garage_id).status_code == 200
+
+
+def test_etag_depends_on_query_params(client: TestClient, make_garage) -> None:
+    garage_id, _ = make_garage("ETag Params Garage", ["EP1"])
+    active = _etag(client, "/spots", garage_id=garage_id)
+    assert _etag(client, "/spots", garage_id=garage_id, active_only=False) != active
+    assert _revalidate(client, "/spots", active, garage_id=garage_id, limit=5).status_code == 200
+
+
+def test_etag_matching_is_weak_and_accepts_lists() -> None:
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('W/"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+
+
+def test_versions_tables_do_not_share_tags() -> None:
+    """Per-process tables (or a recreated segment) never hand out the same tag."""
+    first = ChangeVersions("unused", max_garages=2, shared=False)
+    second = ChangeVersions("unused", max_garages=2, shared=False)
+    assert first.tag(1) != second.tag(1)
+
+    before = first.tag(1)
+    first.bump(2)
+    assert first.tag(1) == before
+    first.bump(None)
+    assert first.tag(1) != before
+    # No slot left for garage 3: it follows every write.
+    first.bump(1)
+    before = first.tag(3)
+    first.bump(1)
+    assert first.tag(3) != before
+
+
+def test_versions_slots_are_claimed_by_writes_only() -> None:
+    table = ChangeVersions("unused", max_garages=2, shared=False)
+    for garage_id in range(100, 110):
+        table.tag(garage_id)
+    table.bump(1)
+    before = table.tag(2)
+    table.bump(1)
+    # Reads of unknown garages left garage 2 a slot of its own.
+    assert table.tag(2) == before
+    table.bump(2)
+    assert table.tag(2) != before
+
+    # A deleted garage's slot is reused; old per-garage tags stop matching.
+    before = table.tag(2)
+    table.forget(1)
+    assert table.tag(2) != before
+    table.bump(3)
+    before = table.tag(3)
+    table.bump(2)
+    assert table.tag(3) == before
+    assert table.changed_within(3, 60) and not table.changed_within(4, 0)
+
+
+def test_cached_analytics_follow_writes_from_other_workers(
+    client: TestClient, make_garage
+) -> None:
+    """Another worker's write only moves the shared version; the cached body must not outlive it."""
+    garage_id, _ = make_garage("ETag Cache Garage", ["EC1"])
+    params = {
+        "garage_id": garage_id,
+        "today": "2025-03-10",
+        "month_from": "2025-03-01",
+        "month_to": "2025-03-31",
+    }
+    etag = _etag(client, "/dashboard/analytics", **params)
+    assert client.get("/dashboard/analytics", params=params).headers["X-DB-Query-Count"] == "0"
+
+    versions.bump(garage_id)
+    r = _revalidate(client, "/dashboard/analytics", etag, **params)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.headers["X-DB-Query-Count"] == "1"
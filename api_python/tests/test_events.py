@@ -0,0 +1,97 @@
+"""Dashboard SSE stream: deltas on writes, garage filter, resume, heartbeat."""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from api_python.app import events
+from api_python.app.routers.events import dashboard_event_stream
+
+
+class _Request:
+    """Stands in for the Starlette request; disconnects after `polls` checks."""
+
+    def __init__(self, polls: int = 0) -> None:
+        self.polls = polls
+
+    async def is_disconnected(self) -> bool:
+        self.polls -= 1
+        return self.polls < 0
+
+
+def _parse(frame: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+def test_entry_and_exit_stream_deltas_for_the_garage(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    garage_id, _ = make_garage("Events Garage", ["EV1", "EV2"])
+    other_id, _ = make_garage("Other Events Garage", ["EW1"])
+    vehicle_id = make_vehicle("EVT-001", "EventsVT")
+    other_vehicle = make_vehicle("EVT-002", "EventsVT2")
+    # Loads the occupancy counters, so events carry them.
+    client.get("/garages/overview", params={"garage_id": garage_id})
+
+    async def scenario() -> list[dict]:
+        stream = dashboard_event_stream(_Request(), garage_id, None, 0.05)
+        assert (await stream.__anext__()).startswith("retry:")
+        client.post(
+            "/tickets/entry", json={"vehicle_id": other_vehicle, "garage_id": other_id}
+        )
+        ticket = client.post(
+            "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+        ).json()
+        assert client.post(f"/tickets/{ticket['id']}/exit", json={}).status_code == 200
+        frames = [frame async for frame in stream]
+        return [_parse(frame) for frame in frames]
+
+    frames = asyncio.run(scenario())
+    assert [f["event"] for f in frames] == ["ticket_entered", "ticket_closed"]
+    entered, closed = frames
+    assert entered["data"]["garage_id"] == garage_id
+    assert entered["data"]["occupancy"] == {
+        "free_spots": 1,
+        "occupied_spots": 1,
+        "open_tickets": 1,
+    }
+    assert closed["data"]["occupancy"]["free_spots"] == 2
+    assert entered["id"] != closed["id"]
+
+
+def test_resume_from_last_event_id() -> None:
+    async def scenario() -> tuple[list[str], list[dict], list[dict]]:
+        live = dashboard_event_stream(_Request(), None, None, 0.05)
+        await live.__anext__()
+        for n in range(3):
+            events.publish("payment_recorded", 1, payment_id=n)
+        ids = [_parse(frame)["id"] async for frame in live]
+
+        resumed = dashboard_event_stream(_Request(), None, ids[0], 0.05)
+        await resumed.__anext__()
+        after_first = [_parse(frame) async for frame in resumed]
+
+        lost = dashboard_event_stream(_Request(), None, "no-such-id", 0.05)
+        await lost.__anext__()
+        reset = [_parse(frame) async for frame in lost]
+        return ids, after_first, reset
+
+    ids, after_first, reset = asyncio.run(scenario())
+    assert len(ids) == 3
+    assert [f["id"] for f in after_first] == ids[1:]
+    assert [f["data"]["payment_id"] for f in after_first] == [1, 2]
+    assert [f["event"] for f in reset] == ["reset"]
+
+
+def test_idle_stream_sends_heartbeat() -> None:
+    async def scenario() -> list[str]:
+        stream = dashboard_event_stream(_Request(polls=1), None, None, 0.01)
+        return [frame async for frame in stream]
+
+    frames = asyncio.run(scenario())
+    assert frames[0].startswith("retry:")
+    assert frames[1:] == [": heartbeat\n\n"]
@@ -0,0 +1,160 @@
+"""The ticket_fee() SQL function against pricing.calculate_fee over random tickets."""
+
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import MappingProxyType
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from api_python.app import models
+from api_python.app.db import engine, get_db
+from api_python.app.services.pricing import (
+    TICKET_FEE_SQL,
+    PricingInput,
+    RateSnapshot,
+    price_many,
+    price_tickets,
+)
+
+T0 = datetime(2026, 3, 29, 0, 30, tzinfo=timezone.utc)
+
+# Durations on and around the minute and hour edges, plus nonsense ones.
+EDGE_DURATIONS = [
+    timedelta(0),
+    timedelta(microseconds=1),
+    timedelta(seconds=59, microseconds=999999),
+    timedelta(minutes=1),
+    timedelta(minutes=59, seconds=59, microseconds=999999),
+    timedelta(minutes=60),
+    timedelta(minutes=60, seconds=59),
+    timedelta(minutes=61),
+    timedelta(hours=24),
+    timedelta(days=400, minutes=1),
+    timedelta(minutes=-90),
+]
+
+PARITY_SQL = """
+    SELECT ticket_fee(u.entry_time, u.exit_time, u.vehicle_type_rate, u.default_rate)
+    FROM unnest(
+      CAST(:entry_times AS {ts}[]),
+      CAST(:exit_times AS {ts}[]),
+      CAST(:vehicle_type_rates AS numeric[]),
+      CAST(:default_rates AS numeric[])
+    ) WITH ORDINALITY AS u(entry_time, exit_time, vehicle_type_rate, default_rate, n)
+    ORDER BY u.n
+"""
+
+
+def _random_rate(rng: random.Random) -> Decimal | None:
+    if rng.random() < 0.2:
+        return None
+    return Decimal(rng.randrange(0, 100_000)) / 100
+
+
+def _random_cases(rng: random.Random, count: int) -> list[tuple]:
+    cases = []
+    for n in range(count):
+        entry = T0 + timedelta(
+            seconds=rng.randrange(-(10**8), 10**8), microseconds=rng.randrange(10**6)
+        )
+        if n < len(EDGE_DURATIONS):
+            duration = EDGE_DURATIONS[n]
+        elif rng.random() < 0.5:
+            duration = timedelta(minutes=rng.randrange(0, 600), seconds=rng.randrange(60))
+        else:
+            duration = timedelta(microseconds=rng.randrange(0, 10**6 * 86400 * 60))
+        exit_time = None if rng.random() < 0.05 else entry + duration
+        cases.append((entry, exit_time, _random_rate(rng), _random_rate(rng)))
+    return cases
+
+
+def _python_fees(cases: list[tuple]) -> list[Decimal]:
+    """calculate_fee's pricing, each case with its own vehicle type and garage."""
+    snapshot = RateSnapshot(
+        vehicle_type_rates=MappingProxyType(
+            {n: vt_rate for n, (_, _, vt_rate, _) in enumerate(cases) if vt_rate is not None}
+        ),
+        garage_rates=MappingProxyType(
+            {n: rate for n, (_, _, _, rate) in enumerate(cases) if rate is not None}
+        ),
+    )
+    return price_many(
+        [PricingInput(entry, exit_time, n, n) for n, (entry, exit_time, _, _) in enumerate(cases)],
+        snapshot,
+    )
+
+
+@pytest.mark.parametrize(("ts", "naive"), [("timestamptz", False), ("timestamp", True)])
+@pytest.mark.parametrize("seed", [20261017, 1, 2])
+def test_sql_fee_matches_python_fee(ts: str, naive: bool, seed: int) -> None:
+    cases = _random_cases(random.Random(seed), 2000)
+    if naive:
+        cases = [
+            (entry.replace(tzinfo=None), exit_time and exit_time.replace(tzinfo=None), vt, rate)
+            for entry, exit_time, vt, rate in cases
+        ]
+    with engine.connect() as conn:
+        sql_fees = conn.execute(
+            text(PARITY_SQL.format(ts=ts)),
+            {
+                "entry_times": [c[0] for c in cases],
+                "exit_times": [c[1] for c in cases],
+                "vehicle_type_rates": [c[2] for c in cases],
+                "default_rates": [c[3] for c in cases],
+            },
+        ).scalars().all()
+    mismatches = [
+        (case, sql_fee, py_fee)
+        for case, sql_fee, py_fee in zip(cases, sql_fees, _python_fees(cases))
+        if sql_fee != py_fee
+    ]
+    assert mismatches == []
+
+
+def test_ticket_fee_sql_matches_calculate_fee_on_tickets(client: TestClient) -> None:
+    garage_id = client.post(
+        "/garages", json={"name": "Parity Garage", "capacity": 5, "default_rate": "45.50"}
+    ).json()["id"]
+    vt_id = client.post("/vehicle-types", json={"type": "ParityVT", "rate": "12.25"}).json()["id"]
+    vehicle_id = client.post(
+        "/vehicles", json={"licence_plate": "PAR-001", "vehicle_type_id": vt_id, "status": 1}
+    ).json()["id"]
+    db = next(client.app.dependency_overrides[get_db]())
+    # Winter to winter, so a timestamptz column and a session time zone agree.
+    entry = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+    tickets = [
+        models.Ticket(
+            ticket_token=f"PAR-{n}",
+            entry_time=entry,
+            exit_time=entry + duration,
+            vehicle_id=vehicle,
+            garage_id=garage_id,
+            ticket_state="CLOSED",
+            payment_status="UNPAID",
+            operational_status="OK",
+        )
+        for n, (duration, vehicle) in enumerate(
+            [(d, vehicle_id) for d in EDGE_DURATIONS] + [(d, None) for d in EDGE_DURATIONS]
+        )
+    ]
+    db.add_all(tickets)
+    db.flush()
+    sql_fees = dict(
+        db.execute(
+            text(
+                f"""
+                SELECT t.id, {TICKET_FEE_SQL}
+                FROM tickets t
+                LEFT JOIN vehicle v ON v.id = t.vehicle_id
+                LEFT JOIN vehicle_types vt ON vt.id = v.vehicle_type_id
+                LEFT JOIN parking_config pc ON pc.id = t.garage_id
+                WHERE t.id = ANY(:ids)
+                """
+            ),
+            {"ids": [t.id for t in tickets]},
+        ).all()
+    )
+    assert [sql_fees[t.id] for t in tickets] == price_tickets(db, tickets)
@@ -0,0 +1,159 @@
+"""Free-spot index (app/free_spots.py) and its use by ticket entry."""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api_python.app import models
+from api_python.app.db import get_db
+from api_python.app.free_spots import FreeSpotIndex, GarageFreeSpots
+from api_python.app.services import tickets as tickets_service
+from api_python.app.services.occupancy import free_spots, reconcile_occupancy
+
+
+def test_garage_pops_lowest_free_spot() -> None:
+    garage = GarageFreeSpots({5: True, 3: False, 9: True, 1: True}, occupied={1})
+    assert garage.pop(rentable_only=True) == 5
+    assert garage.pop() == 3
+    garage.push(5)
+    garage.push(1)
+    assert [garage.pop() for _ in range(4)] == [1, 5, 9, None]
+
+
+def test_garage_skips_spots_taken_through_the_other_heap() -> None:
+    garage = GarageFreeSpots({1: True, 2: False, 3: True}, occupied=set())
+    assert garage.pop() == 1
+    assert garage.pop(rentable_only=True) == 3
+    assert garage.pop(rentable_only=True) is None
+    garage.deactivate(2)
+    assert garage.pop() is None
+    garage.activate(2, rentable=True, occupied=False)
+    assert garage.pop(rentable_only=True) == 2
+
+
+def test_garage_heaps_stay_bounded_under_churn() -> None:
+    garage = GarageFreeSpots({n: n % 2 == 0 for n in range(100)}, occupied=set())
+    for _ in range(10_000):
+        spot_id = garage.pop()
+        garage.push(spot_id)
+    assert len(garage._heap) + len(garage._rentable_heap) <= 4 * len(garage.free) + 64
+    assert garage.pop() == 0
+
+
+def test_released_picks_are_offered_again() -> None:
+    index = FreeSpotIndex()
+    index.store(1, {10: True, 11: True, 12: True}, set(), index.version(1))
+    assert index.pick(1) == 10
+    assert index.pick(1) == 11
+    # A rolled-back entry gives its spot back; a spot the DB has taken does not.
+    index.release(1, 10)
+    index.release(1, 11, free=False)
+    assert [index.pick(1), index.pick(1), index.pick(1)] == [10, 12, None]
+    # Committed entries take their spot; a late release is a no-op.
+    index.taken(1, [10])
+    index.release(1, 10)
+    assert index.pick(1) is None
+
+
+def test_index_drops_loads_that_raced_with_a_write() -> None:
+    index = FreeSpotIndex()
+    version = index.version(1)
+    index.taken(1, [10])
+    assert not index.store(1, {10: True, 11: True}, set(), version)
+    assert index.pick(1) is None
+
+    assert index.store(1, {10: True, 11: True}, {10}, index.version(1))
+    assert index.pick(1) == 11
+    index.freed(1, 10)
+    assert index.pick(1) == 10
+    assert index.stats() == {"garages": 1, "free_spots": 0}
+
+    index.invalidate(None)
+    assert not index.loaded(1)
+
+
+def _entry(client: TestClient, garage_id: int, vt_id: int, plate: str):
+    vehicle_id = client.post(
+        "/vehicles", json={"licence_plate": plate, "vehicle_type_id": vt_id, "status": 1}
+    ).json()["id"]
+    return client.post("/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id})
+
+
+def test_entry_allocates_from_the_index(client: TestClient, make_garage) -> None:
+    garage_id, spot_ids = make_garage("Index Garage", ["IX1", "IX2", "IX3"])
+    vt_id = client.post("/vehicle-types", json={"type": "IndexVT", "rate": "20.00"}).json()["id"]
+    first = _entry(client, garage_id, vt_id, "FS-001").json()
+    assert first["spot_id"] == spot_ids[0]
+    assert free_spots.loaded(garage_id)
+    assert _entry(client, garage_id, vt_id, "FS-002").json()["spot_id"] == spot_ids[1]
+
+    assert client.post(f"/tickets/{first['id']}/exit", json={}).status_code == 200
+    assert _entry(client, garage_id, vt_id, "FS-003").json()["spot_id"] == spot_ids[0]
+    assert _entry(client, garage_id, vt_id, "FS-004").json()["spot_id"] == spot_ids[2]
+    r = _entry(client, garage_id, vt_id, "FS-005")
+    assert r.status_code == 409
+    assert r.json()["error"]["code"] == "NO_FREE_SPOTS_AVAILABLE"
+
+
+def test_stale_index_is_confirmed_by_the_db(client: TestClient, make_garage) -> None:
+    garage_id, spot_ids = make_garage("Stale Index Garage", ["SI1", "SI2"])
+    vt_id = client.post("/vehicle-types", json={"type": "StaleVT", "rate": "20.00"}).json()["id"]
+    db = next(client.app.dependency_overrides[get_db]())
+    reconcile_occupancy(db)
+    assert free_spots.loaded(garage_id)
+
+    # A ticket written behind the API's back: the index still lists its spot.
+    db.add(
+        models.Ticket(
+            ticket_token="STALE-1",
+            entry_time=datetime.now(timezone.utc),
+            garage_id=garage_id,
+            spot_id=spot_ids[0],
+            ticket_state="OPEN",
+            payment_status="UNPAID",
+            operational_status="OK",
+        )
+    )
+    db.flush()
+    assert _entry(client, garage_id, vt_id, "FS-006").json()["spot_id"] == spot_ids[1]
+
+    # The index lost a spot the DB still has free: the scan finds it.
+    assert _entry(client, garage_id, vt_id, "FS-007").status_code == 409
+    db.execute(
+        models.Ticket.__table__.update()
+        .where(models.Ticket.ticket_token == "STALE-1")
+        .values(ticket_state="CLOSED", exit_time=datetime.now(timezone.utc))
+    )
+    assert _entry(client, garage_id, vt_id, "FS-008").json()["spot_id"] == spot_ids[0]
+    assert not free_spots.loaded(garage_id)
+
+
+def test_moving_a_ticket_swaps_free_spots(client: TestClient, make_garage) -> None:
+    garage_id, spot_ids = make_garage("Move Garage", ["MV1", "MV2", "MV3"])
+    vt_id = client.post("/vehicle-types", json={"type": "MoveVT", "rate": "20.00"}).json()["id"]
+    ticket = _entry(client, garage_id, vt_id, "FS-009").json()
+    assert ticket["spot_id"] == spot_ids[0]
+
+    r = client.put(f"/tickets/{ticket['id']}", json={"spot_id": spot_ids[1]})
+    assert r.status_code == 200
+    # The old spot is free again, the new one is not offered.
+    assert _entry(client, garage_id, vt_id, "FS-010").json()["spot_id"] == spot_ids[0]
+    assert _entry(client, garage_id, vt_id, "FS-011").json()["spot_id"] == spot_ids[2]
+    assert free_spots.stats()["free_spots"] == 0
+
+
+def test_failed_entry_gives_its_spot_back(
+    client: TestClient, make_garage, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    garage_id, spot_ids = make_garage("Failed Entry Garage", ["FE1"])
+    vt_id = client.post("/vehicle-types", json={"type": "FailVT", "rate": "20.00"}).json()["id"]
+
+    def failing_ticket(data, spot_id):
+        raise tickets_service.TicketPersistenceError("insert failed")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(tickets_service, "_new_open_ticket", failing_ticket)
+        assert _entry(client, garage_id, vt_id, "FS-012").status_code == 500
+    assert free_spots.stats()["free_spots"] == 1
+    assert _entry(client, garage_id, vt_id, "FS-013").json()["spot_id"] == spot_ids[0]
@@ -0,0 +1,98 @@
+"""Occupancy counter table and its use by the overview / status cards."""
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+from api_python.app.db import get_db
+from api_python.app.occupancy import Occupancy, OccupancyCounters
+from api_python.app.services.occupancy import counters, reconcile_occupancy
+
+
+def _overview(client: TestClient, garage_id: int):
+    r = client.get("/garages/overview", params={"garage_id": garage_id})
+    assert r.status_code == 200
+    return r
+
+
+def test_counters_store_add_and_invalidate() -> None:
+    table = OccupancyCounters("unused", max_garages=4, shared=False)
+    assert table.get(7) is None
+    version = table.version(7)
+    assert version is not None
+    assert table.store(7, Occupancy(3, 2, 1, 0, 1), version)
+    stored = table.get(7)
+    assert stored is not None and stored.free_spots == 1
+
+    table.add(7, occupied_spots=1, open_tickets=1)
+    assert table.get(7) == Occupancy(3, 2, 2, 0, 2)
+    # A load that started before the delta must not overwrite it.
+    assert not table.store(7, Occupancy(3, 2, 1, 0, 1), version)
+
+    table.invalidate(7)
+    assert table.get(7) is None
+
+
+def test_counters_full_table_reports_no_slot() -> None:
+    table = OccupancyCounters("unused", max_garages=2, shared=False)
+    assert table.version(1) is not None
+    assert table.version(2) is not None
+    assert table.version(3) is None
+    assert table.get(3) is None
+
+
+def test_counters_shared_between_instances() -> None:
+    """Two attachments to the same segment (as two workers would) see one table."""
+    name = f"occupancy_test_{uuid.uuid4().hex[:12]}"
+    first = OccupancyCounters(name, max_garages=8, shared=True)
+    second = OccupancyCounters(name, max_garages=8, shared=True)
+    try:
+        assert first.shared and second.shared
+        version = first.version(5)
+        assert version is not None
+        first.store(5, Occupancy(10, 10, 0, 0, 0), version)
+        second.add(5, occupied_spots=1, open_tickets=1)
+        assert first.get(5) == Occupancy(10, 10, 1, 0, 1)
+    finally:
+        second.close()
+        first._table.unlink()
+        first.close()
+
+
+def test_overview_follows_entry_exit_and_spot_changes(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    garage_id, _ = make_garage("Occupancy Garage", ["OC1", "OC2", "OC3"])
+    row = _overview(client, garage_id).json()[0]
+    assert (row["total_spots"], row["free_spots"], row["occupied_spots"]) == (3, 3, 0)
+
+    vehicle_id = make_vehicle("OCC-001", "OccupancyVT")
+    ticket = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    ).json()
+    # Loaded counters: the overview only reads the garage names.
+    r = _overview(client, garage_id)
+    assert r.headers["X-DB-Query-Count"] == "1"
+    assert (r.json()[0]["free_spots"], r.json()[0]["occupied_spots"]) == (2, 1)
+
+    spots = client.get("/spots", params={"garage_id": garage_id}).json()["items"]
+    free_spot = next(s for s in spots if s["id"] != ticket["spot_id"])
+    assert client.delete(f"/spots/{free_spot['id']}").status_code == 200
+    assert _overview(client, garage_id).json()[0]["free_spots"] == 1
+    assert client.patch(f"/spots/{free_spot['id']}/activate").status_code == 200
+    assert _overview(client, garage_id).json()[0]["free_spots"] == 2
+
+    assert client.post(f"/tickets/{ticket['id']}/exit", json={}).status_code == 200
+    row = _overview(client, garage_id).json()[0]
+    assert (row["free_spots"], row["occupied_spots"]) == (3, 0)
+
+
+def test_reconcile_corrects_drift(client: TestClient, make_garage) -> None:
+    garage_id, _ = make_garage("Drift Garage", ["DR1", "DR2"])
+    _overview(client, garage_id)
+    counters.add(garage_id, occupied_spots=2)
+    assert _overview(client, garage_id).json()[0]["free_spots"] == 0
+
+    db = next(client.app.dependency_overrides[get_db]())
+    assert reconcile_occupancy(db) >= 1
+    assert _overview(client, garage_id).json()[0]["free_spots"] == 2
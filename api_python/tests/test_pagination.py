@@ -0,0 +1,112 @@
+"""Keyset (cursor) pagination tests for list endpoints."""
+
+from fastapi.testclient import TestClient
+
+
+def _walk(client: TestClient, path: str, params: dict) -> list[dict]:
+    """Follow next_cursor from the first page to the last."""
+    items: list[dict] = []
+    r = client.get(path, params=params)
+    while True:
+        assert r.status_code == 200
+        data = r.json()
+        items.extend(data["items"])
+        if data["next_cursor"] is None:
+            return items
+        r = client.get(path, params={**params, "cursor": data["next_cursor"]})
+
+
+def test_vehicles_cursor_matches_offset(client: TestClient, make_vehicle) -> None:
+    """Walking by cursor yields the same rows, in the same order, as one big page."""
+    for i in range(3):
+        make_vehicle(f"CUR-00{i}", f"CursorVT{i}")
+    expected = [v["id"] for v in client.get("/vehicles", params={"limit": 1000}).json()["items"]]
+    walked = [v["id"] for v in _walk(client, "/vehicles", {"limit": 2})]
+    assert walked == expected
+
+
+def test_tickets_cursor_descending(client: TestClient, make_garage, make_vehicle) -> None:
+    garage_id, _ = make_garage("Cursor Garage", ["CG1", "CG2", "CG3"])
+    ticket_ids = []
+    for i in range(3):
+        vehicle_id = make_vehicle(f"CURT-{i}", f"CursorTicketVT{i}")
+        r = client.post(
+            "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+        )
+        assert r.status_code == 200
+        ticket_ids.append(r.json()["id"])
+
+    walked = _walk(client, "/tickets", {"garage_id": garage_id, "limit": 2})
+    assert [t["id"] for t in walked] == sorted(ticket_ids, reverse=True)
+    walked = _walk(client, "/tickets/dashboard", {"garage_id": garage_id, "limit": 1})
+    assert [t["id"] for t in walked] == sorted(ticket_ids, reverse=True)
+
+
+def test_payments_cursor_breaks_paid_at_ties(
+    client: TestClient, make_garage, make_vehicle
+) -> None:
+    """Payments with the same paid_at are neither skipped nor repeated across pages."""
+    garage_id, _ = make_garage("Cursor Pay Garage", ["CP1"])
+    vehicle_id = make_vehicle("CURP-001", "CursorPayVT")
+    ticket_id = client.post(
+        "/tickets/entry", json={"vehicle_id": vehicle_id, "garage_id": garage_id}
+    ).json()["id"]
+    assert client.post(f"/tickets/{ticket_id}/exit", json={}).status_code == 200
+    payment_ids = []
+    for _ in range(3):
+        r = client.post(
+            "/payments",
+            json={
+                "ticket_id": ticket_id,
+                "amount": "1.00",
+                "method": "CASH",
+                "paid_at": "2020-01-01T10:00:00Z",
+            },
+        )
+        assert r.status_code == 200
+        payment_ids.append(r.json()["id"])
+
+    walked = _walk(client, "/payments", {"garage_id": garage_id, "limit": 1})
+    assert [p["id"] for p in walked] == sorted(payment_ids, reverse=True)
+
+
+def test_invalid_cursor_returns_400(client: TestClient) -> None:
+    r = client.get("/tickets", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+def test_offset_still_supported(client: TestClient) -> None:
+    r = client.get("/garages", params={"limit": 1, "offset": 0})
+    assert r.status_code == 200
+    assert r.json()["offset"] == 0
+
+
+def test_include_total_modes(client: TestClient) -> None:
+    """exact counts, estimated comes from the planner, none skips the count."""
+    r = client.get("/tickets", params={"include_total": "exact"})
+    assert r.status_code == 200
+    assert r.json()["total_is_exact"] is True
+    assert isinstance(r.json()["total"], int)
+
+    for params in ({}, {"garage_id": 1}):
+        r = client.get("/tickets", params={**params, "include_total": "estimated"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["total_is_exact"] is False
+        assert data["total"] >= 0
+
+    r = client.get("/payments", params={"garage_id": 1, "include_total": "estimated"})
+    assert r.status_code == 200
+    assert r.json()["total"] >= 0
+
+    r = client.get("/tickets", params={"include_total": "none"})
+    assert r.status_code == 200
+    assert r.json()["total"] is None
+    assert r.json()["total_is_exact"] is False
+
+
+def test_include_total_none_skips_count(client: TestClient, query_budget) -> None:
+    with query_budget(1):
+        r = client.get("/vehicles", params={"include_total": "none"})
+    assert r.status_code == 200
@@ -141,3 +141,62 @@ def test_get_payment_404(client: TestClient) -> None:
     """GET /payments/{id} returns 404 for non-existent id."""
     r = client.get("/payments/999999")
     assert r.status_code == 404
+
+
+def test_outstanding_total_and_breakdown(client: TestClient) -> None:
+    """2h30m at 50/h bills 3 hours (150); after paying 40, 110 is outstanding."""
+    r = client.post(
+        "/garages",
+        json={"name": "Outstanding Garage", "capacity": 5, "default_rate": "100.00"},
+    )
+    garage_id = r.json()["id"]
+    r = client.post(
+        "/spots",
+        json={"garage_id": garage_id, "code": "OS1", "is_rentable": False, "is_active": True},
+    )
+    assert r.status_code == 200
+    vt_id = client.post("/vehicle-types", json={"type": "CarOut", "rate": "50.00"}).json()["id"]
+    vehicle_id = client.post(
+        "/vehicles",
+        json={"licence_plate": "OUT-001", "vehicle_type_id": vt_id, "status": 1},
+    ).json()["id"]
+    r = client.post(
+        "/tickets/entry",
+        json={
+            "vehicle_id": vehicle_id,
+            "garage_id": garage_id,
+            "entry_time": "2026-01-05T08:00:00Z",
+        },
+    )
+    ticket_id = r.json()["id"]
+    r = client.post(
+        f"/tickets/{ticket_id}/exit", json={"exit_time": "2026-01-05T10:30:00Z"}
+    )
+    assert r.status_code == 200
+    r = client.post(
+        "/payments",
+        json={"ticket_id": ticket_id, "amount": "40.00", "method": "CASH"},
+    )
+    assert r.status_code == 200
+
+    r = client.get(
+        "/payments/outstanding", params={"garage_id": garage_id, "breakdown": True}
+    )
+    assert r.status_code == 200
+    # Total and breakdown come from one statement.
+    assert r.headers["X-DB-Query-Count"] == "1"
+    data = r.json()
+    assert data["total_outstanding"] == pytest.approx(110.0)
+    assert data["tickets"] == [
+        {
+            "ticket_id": ticket_id,
+            "garage_id": garage_id,
+            "fee": pytest.approx(150.0),
+            "total_paid": pytest.approx(40.0),
+            "rest_to_pay": pytest.approx(110.0),
+        }
+    ]
+
+    r = client.get("/payments/outstanding", params={"garage_id": garage_id})
+    assert r.json()["tickets"] is None
+    assert r.headers["X-DB-Query-Count"] == "1"
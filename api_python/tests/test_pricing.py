@@ -0,0 +1,104 @@
+"""Batch pricing against a rate snapshot, and parity with the SQL fee."""
+
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from types import MappingProxyType
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api_python.app import models
+from api_python.app.db import get_db
+from api_python.app.services.pricing import (
+    PricingInput,
+    RateSnapshot,
+    billed_hours,
+    calculate_fee,
+    price_many,
+    price_tickets,
+)
+from api_python.app.services.tariffs import compile_schedule
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ("duration", "hours"),
+    [
+        (timedelta(0), 1),
+        (timedelta(seconds=59), 1),
+        (timedelta(minutes=60), 1),
+        (timedelta(minutes=60, seconds=59), 1),
+        (timedelta(minutes=61), 2),
+        (timedelta(hours=2, minutes=30), 3),
+        (timedelta(minutes=-5), 1),
+    ],
+)
+def test_billed_hours(duration: timedelta, hours: int) -> None:
+    assert billed_hours(T0, T0 + duration) == hours
+
+
+def test_price_many_uses_vehicle_type_rate_then_garage_default() -> None:
+    snapshot = RateSnapshot(
+        vehicle_type_rates=MappingProxyType({1: Decimal("50")}),
+        garage_rates=MappingProxyType({7: Decimal("100")}),
+    )
+    naive_exit = (T0 + timedelta(hours=2, minutes=30)).replace(tzinfo=None)
+    fees = price_many(
+        [
+            PricingInput(T0, T0 + timedelta(hours=2, minutes=30), 1, 7),
+            PricingInput(T0, naive_exit, None, 7),
+            PricingInput(T0, T0 + timedelta(minutes=10), 99, 7),
+            PricingInput(T0, None, 1, 7),
+            PricingInput(T0, T0 + timedelta(hours=1), None, 8),
+        ],
+        snapshot,
+    )
+    assert fees == [Decimal("150"), Decimal("300"), Decimal("100"), 0, 0]
+
+
+def test_price_many_uses_garage_schedule_below_vehicle_type_rate() -> None:
+    snapshot = RateSnapshot(
+        vehicle_type_rates=MappingProxyType({1: Decimal("50")}),
+        garage_rates=MappingProxyType({7: Decimal("100")}),
+        garage_schedules=MappingProxyType(
+            {7: compile_schedule(Decimal("90"), Decimal("30"), time(9), time(17))}
+        ),
+    )
+    # 08:00-10:30 is billed 08:00-11:00: one night hour, two day hours.
+    exit_time = T0 + timedelta(hours=2, minutes=30)
+    fees = price_many(
+        [
+            PricingInput(T0, exit_time, None, 7),
+            PricingInput(T0, exit_time, 1, 7),
+            PricingInput(T0, None, None, 7),
+        ],
+        snapshot,
+    )
+    assert fees == [Decimal("210.00"), Decimal("150"), 0]
+
+
+def test_price_tickets_matches_single_ticket_path(client: TestClient) -> None:
+    """One snapshot for many tickets gives the fees calculate_fee gives each."""
+    garage_id = client.post(
+        "/garages", json={"name": "Pricing Garage", "capacity": 5, "default_rate": "70.00"}
+    ).json()["id"]
+    vt_id = client.post("/vehicle-types", json={"type": "PricingVT", "rate": "30.00"}).json()["id"]
+    with_type = client.post(
+        "/vehicles", json={"licence_plate": "PRC-001", "vehicle_type_id": vt_id, "status": 1}
+    ).json()["id"]
+    db = next(client.app.dependency_overrides[get_db]())
+    tickets = [
+        models.Ticket(
+            ticket_token=f"PRC-{n}",
+            entry_time=T0,
+            exit_time=T0 + timedelta(minutes=minutes),
+            vehicle_id=vehicle_id,
+            garage_id=garage_id,
+            ticket_state="CLOSED",
+        )
+        for n, (minutes, vehicle_id) in enumerate([(30, with_type), (150, with_type), (61, None)])
+    ]
+    fees = price_tickets(db, tickets)
+    assert fees == [Decimal("30"), Decimal("90"), Decimal("140")]
+    assert fees == [calculate_fee(t, db) for t in tickets]
@@ -0,0 +1,42 @@
+"""Per-request statement counting and query budget tests."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api_python.app.db_metrics import QueryBudgetExceeded, QueryStats
+
+
+def test_query_count_headers(client: TestClient) -> None:
+    """/health runs exactly one statement and reports it in the headers."""
+    r = client.get("/health")
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "1"
+    assert float(r.headers["X-DB-Time-Ms"]) >= 0
+
+
+def test_query_budget_passes_within_limit(client: TestClient, query_budget) -> None:
+    with query_budget(1) as budget:
+        client.get("/health")
+    assert budget.stats.count == 1
+
+
+def test_query_budget_fails_when_exceeded(client: TestClient, query_budget) -> None:
+    with pytest.raises(QueryBudgetExceeded, match="SELECT 1"):
+        with query_budget(0):
+            client.get("/health")
+
+
+def test_list_tickets_budget(client: TestClient, query_budget) -> None:
+    """Paginated list: one count and one page query, regardless of page size."""
+    with query_budget(2):
+        r = client.get("/tickets", params={"limit": 50})
+    assert r.status_code == 200
+
+
+def test_repeated_statements_flagged() -> None:
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT * FROM payments WHERE ticket_id = %(id)s", 0.1)
+    stats.record("SELECT 1", 0.1)
+    assert stats.repeated(5) == [("SELECT * FROM payments WHERE ticket_id = %(id)s", 5)]
+    assert stats.repeated(0) == []
@@ -0,0 +1,167 @@
+"""
+Plan regression tests for the hot-path indexes (alembic e3b7c1d94a20).
+
+Each test seeds a garage with a few thousand tickets and payments inside a
+rolled-back transaction, runs EXPLAIN on the query the app actually issues and
+asserts the expected index appears in the plan. enable_seqscan is turned off
+so the assertion is about the index being usable for the query shape, not
+about the planner's cost guess on a small test table.
+"""
+
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from api_python.app import models
+from api_python.app.db import engine
+from api_python.app.services.dashboard_analytics import status_cards_statement
+from api_python.app.services.occupancy import OCCUPANCY_SQL
+from api_python.app.services.outstanding import garage_scope
+from api_python.app.services.spots import ALLOCATE_FREE_SPOT_SQL
+
+SPOTS = 200
+TICKETS = 5000
+
+
+@pytest.fixture
+def seeded() -> Iterator[tuple[Session, int]]:
+    """Session on a seeded garage; everything is rolled back afterwards."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    garage_id = db.execute(
+        text(
+            "INSERT INTO parking_config (name, capacity, default_rate) "
+            "VALUES ('Plan Garage', :capacity, 40) RETURNING id"
+        ),
+        {"capacity": SPOTS},
+    ).scalar_one()
+    db.execute(
+        text(
+            "INSERT INTO parking_spot (garage_id, code, is_rentable, is_active) "
+            "SELECT :g, 'PL' || i, false, true FROM generate_series(1, :n) AS i"
+        ),
+        {"g": garage_id, "n": SPOTS},
+    )
+    # Closed, paid tickets spread over the last ~200 days; the newest few are
+    # open on the first spots.
+    db.execute(
+        text(
+            """
+            INSERT INTO tickets (ticket_token, entry_time, exit_time, fee,
+                                 ticket_state, payment_status, operational_status,
+                                 garage_id, spot_id)
+            SELECT 'PLAN' || :g || 'X' || i,
+                   now() - (i || ' hours')::interval,
+                   CASE WHEN i > 20 THEN now() - (i || ' hours')::interval + interval '1 hour' END,
+                   CASE WHEN i > 20 THEN 40 END,
+                   CASE WHEN i > 20 THEN 'CLOSED' ELSE 'OPEN' END,
+                   CASE WHEN i > 20 THEN 'PAID' ELSE 'NOT_APPLICABLE' END,
+                   'OK',
+                   :g,
+                   CASE WHEN i > 20 THEN NULL
+                        ELSE (SELECT id FROM parking_spot WHERE garage_id = :g AND code = 'PL' || i)
+                   END
+            FROM generate_series(1, :n) AS i
+            """
+        ),
+        {"g": garage_id, "n": TICKETS},
+    )
+    db.execute(
+        text(
+            "INSERT INTO payments (ticket_id, amount, method, paid_at) "
+            "SELECT id, 40, 'CASH', exit_time FROM tickets "
+            "WHERE garage_id = :g AND ticket_state = 'CLOSED'"
+        ),
+        {"g": garage_id},
+    )
+    db.execute(text("ANALYZE parking_spot, tickets, payments"))
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        yield db, garage_id
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+def _index_names(node: dict) -> set[str]:
+    names = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def _plan_indexes(db: Session, stmt) -> set[str]:
+    compiled = stmt.compile(
+        dialect=engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = (
+        db.connection()
+        .exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+        .scalar()
+    )
+    return _index_names(plan[0]["Plan"])
+
+
+def test_free_spot_allocation_uses_open_spot_index(seeded) -> None:
+    db, garage_id = seeded
+    stmt = ALLOCATE_FREE_SPOT_SQL.bindparams(garage_id=garage_id, rentable_only=False)
+    assert "ix_tickets_open_spot_id" in _plan_indexes(db, stmt)
+
+
+def _status_cards(garage_id: int | None):
+    today = date.today()
+    return status_cards_statement(
+        garage_scope(garage_id), today, today.replace(day=1), today
+    )
+
+
+def test_status_cards_use_unpaid_index(seeded) -> None:
+    db, garage_id = seeded
+    assert "ix_tickets_unpaid_garage_id" in _plan_indexes(db, _status_cards(garage_id))
+
+
+# Partial indexes on open tickets; which one serves a lookup is the planner's call.
+OPEN_TICKET_INDEXES = {"ix_tickets_open_spot_id", "ix_tickets_open_garage_id"}
+
+
+def test_occupancy_recount_uses_open_ticket_indexes(seeded) -> None:
+    db, garage_id = seeded
+    indexes = _plan_indexes(db, OCCUPANCY_SQL.bindparams(garage_ids=[garage_id]))
+    assert indexes & OPEN_TICKET_INDEXES
+    # The open_tickets subquery on its own.
+    open_tickets = text(
+        "SELECT COUNT(*) FROM tickets t "
+        "WHERE t.garage_id = :garage_id AND t.ticket_state = 'OPEN'"
+    ).bindparams(garage_id=garage_id)
+    assert _plan_indexes(db, open_tickets) & OPEN_TICKET_INDEXES
+
+
+def test_tickets_by_garage_and_entry_time_use_composite_index(seeded) -> None:
+    db, garage_id = seeded
+    since = datetime.now(timezone.utc) - timedelta(days=7)
+    stmt = select(models.Ticket.id).where(
+        models.Ticket.garage_id == garage_id, models.Ticket.entry_time >= since
+    )
+    assert "ix_tickets_garage_id_entry_time" in _plan_indexes(db, stmt)
+
+
+def test_payment_sum_by_ticket_uses_ticket_index(seeded) -> None:
+    db, garage_id = seeded
+    ticket_ids = db.scalars(
+        select(models.Ticket.id).where(models.Ticket.garage_id == garage_id).limit(50)
+    ).all()
+    stmt = (
+        select(models.Payment.ticket_id, models.Payment.amount)
+        .where(models.Payment.ticket_id.in_(ticket_ids))
+    )
+    assert "ix_payments_ticket_id" in _plan_indexes(db, stmt)
+
+
+def test_status_cards_revenue_uses_paid_at_index(seeded) -> None:
+    db, _ = seeded
+    assert "ix_payments_paid_at_id" in _plan_indexes(db, _status_cards(None))
@@ -0,0 +1,123 @@
+"""Compiled day/night tariff schedules against a per-minute reference."""
+
+from datetime import datetime, time, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from api_python.app.services.tariffs import (
+    MINUTES_PER_DAY,
+    TariffSchedule,
+    compile_schedule,
+    epoch_minute,
+)
+
+rates = st.decimals(min_value=0, max_value=500, places=2, allow_nan=False, allow_infinity=False)
+minute_times = st.builds(time, st.integers(0, 23), st.integers(0, 59))
+entries = st.datetimes(
+    min_value=datetime(1990, 1, 1),
+    max_value=datetime(2100, 1, 1),
+    timezones=st.just(timezone.utc),
+)
+billed_minutes = st.integers(1, 5 * 24).map(lambda hours: hours * 60)
+
+
+def reference_fee(day_rate, night_rate, open_time, close_time, entry_time, minutes):
+    """Walk the window minute by minute; no boundary tables, no bisect."""
+    opens = open_time.hour * 60 + open_time.minute
+    closes = close_time.hour * 60 + close_time.minute
+    start = entry_time.replace(second=0, microsecond=0)
+    total = Fraction(0)
+    for n in range(minutes):
+        minute = start + timedelta(minutes=n)
+        minute_of_day = minute.hour * 60 + minute.minute
+        if opens < closes:
+            is_day = opens <= minute_of_day < closes
+        else:
+            is_day = minute_of_day >= opens or minute_of_day < closes
+        total += Fraction(day_rate if is_day else night_rate) / 60
+    return (Decimal(total.numerator) / total.denominator).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP
+    )
+
+
+@given(rates, rates, minute_times, minute_times, entries, billed_minutes)
+def test_schedule_matches_per_minute_reference(
+    day_rate, night_rate, open_time, close_time, entry_time, minutes
+) -> None:
+    schedule = compile_schedule(day_rate, night_rate, open_time, close_time)
+    if open_time == close_time:
+        assert schedule is None
+        return
+    assert schedule is not None
+    assert schedule.fee(entry_time, minutes) == reference_fee(
+        day_rate, night_rate, open_time, close_time, entry_time, minutes
+    )
+
+
+@given(rates, minute_times, minute_times, entries, st.integers(1, 24 * 365))
+def test_equal_rates_bill_like_a_flat_rate(rate, open_time, close_time, entry_time, hours) -> None:
+    schedule = compile_schedule(rate, rate, open_time, close_time)
+    if schedule is not None:
+        assert schedule.fee(entry_time, hours * 60) == hours * rate
+
+
+@given(
+    st.lists(
+        st.tuples(st.integers(1, MINUTES_PER_DAY - 1), rates), max_size=6, unique_by=lambda s: s[0]
+    ),
+    rates,
+    st.integers(-(10**7), 10**8),
+    st.integers(0, 10**6),
+    st.integers(0, 10**6),
+)
+def test_window_costs_add_up(segments, first_rate, start, a, b) -> None:
+    """Cost of [s, s+a+b) is cost of [s, s+a) plus cost of [s+a, s+a+b)."""
+    schedule = TariffSchedule.from_segments([(0, first_rate), *segments])
+    whole = schedule.cost_before(start + a + b) - schedule.cost_before(start)
+    first = schedule.cost_before(start + a) - schedule.cost_before(start)
+    second = schedule.cost_before(start + a + b) - schedule.cost_before(start + a)
+    assert whole == first + second
+    assert schedule.cost_before(start + MINUTES_PER_DAY) - schedule.cost_before(start) == (
+        schedule.day_cost
+    )
+
+
+def test_stay_across_close_and_past_midnight() -> None:
+    day = compile_schedule(Decimal("100"), Decimal("40"), time(7, 0), time(19, 0))
+    assert day is not None
+    evening = datetime(2026, 1, 5, 18, 30, 45, tzinfo=timezone.utc)
+    # 30 day minutes (50.00) and 90 night minutes (60.00).
+    assert day.fee(evening, 120) == Decimal("110.00")
+    # 19:00 to 07:00 at night, then an hour of day.
+    assert day.fee(datetime(2026, 1, 5, 19, 0, tzinfo=timezone.utc), 13 * 60) == Decimal(
+        "580.00"
+    )
+
+    overnight = compile_schedule(Decimal("100"), Decimal("40"), time(22, 0), time(6, 0))
+    assert overnight is not None
+    assert overnight.fee(datetime(2026, 1, 5, 5, 0, tzinfo=timezone.utc), 120) == Decimal(
+        "140.00"
+    )
+
+
+@pytest.mark.parametrize(
+    "columns",
+    [
+        (None, Decimal("40"), time(7), time(19)),
+        (Decimal("100"), None, time(7), time(19)),
+        (Decimal("100"), Decimal("40"), None, time(19)),
+        (Decimal("100"), Decimal("40"), time(7), None),
+        (Decimal("100"), Decimal("40"), time(7), time(7)),
+    ],
+)
+def test_incomplete_tariff_has_no_schedule(columns) -> None:
+    assert compile_schedule(*columns) is None
+
+
+def test_epoch_minute_floors() -> None:
+    assert epoch_minute(datetime(1970, 1, 1, 0, 1, 59, tzinfo=timezone.utc)) == 1
+    assert epoch_minute(datetime(1969, 12, 31, 23, 59, 30, tzinfo=timezone.utc)) == -1
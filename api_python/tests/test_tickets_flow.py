@@ -1,6 +1,13 @@
 """Tickets API integration tests (entry/exit flow)."""
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from api_python.app.db import get_db
+from api_python.app.services.fee_drift import find_fee_drift, fix_fee_drift
+from api_python.app.services.quotes import compute_open_quotes
 
 
 def test_list_tickets_returns_paginated(client: TestClient) -> None:
@@ -327,3 +334,210 @@ def test_put_ticket_spot_change_forbidden_when_closed(client: TestClient) -> Non
     client.post(f"/tickets/{ticket_id}/exit", json={})
     r = client.put(f"/tickets/{ticket_id}", json={"spot_id": alt})
     assert r.status_code == 409
+
+
+def _closed_ticket(client: TestClient, suffix: str) -> tuple[int, int]:
+    """Ticket 08:00-10:30 at 10/h (fee 30). Returns (ticket_id, garage_id)."""
+    ticket_id, garage_id, _ = _setup_open_ticket(client, suffix=suffix)
+    r = client.patch(
+        f"/tickets/{ticket_id}/times", json={"entry_time": "2026-01-05T08:00:00Z"}
+    )
+    assert r.status_code == 200
+    r = client.post(
+        f"/tickets/{ticket_id}/exit", json={"exit_time": "2026-01-05T10:30:00Z"}
+    )
+    assert float(r.json()["fee"]) == pytest.approx(30.0)
+    return ticket_id, garage_id
+
+
+def _dashboard_row(client: TestClient, garage_id: int, ticket_id: int) -> dict:
+    r = client.get("/tickets/dashboard", params={"garage_id": garage_id})
+    assert r.status_code == 200
+    return next(row for row in r.json()["items"] if row["id"] == ticket_id)
+
+
+def test_ticket_times_correction_recomputes_fee(client: TestClient) -> None:
+    """PATCH /tickets/{id}/times stores the new fee and payment status."""
+    ticket_id, garage_id = _closed_ticket(client, "tm")
+    r = client.post(
+        "/payments", json={"ticket_id": ticket_id, "amount": "20.00", "method": "CASH"}
+    )
+    assert r.status_code == 200
+    assert _dashboard_row(client, garage_id, ticket_id)["rest_to_pay"] == pytest.approx(10.0)
+
+    r = client.patch(
+        f"/tickets/{ticket_id}/times", json={"exit_time": "2026-01-05T09:30:00Z"}
+    )
+    assert r.status_code == 200
+    assert float(r.json()["fee"]) == pytest.approx(20.0)
+    assert r.json()["payment_status"] == "PAID"
+    row = _dashboard_row(client, garage_id, ticket_id)
+    assert (float(row["fee"]), row["rest_to_pay"]) == (pytest.approx(20.0), 0.0)
+
+
+def test_ticket_times_validation(client: TestClient) -> None:
+    ticket_id, _ = _closed_ticket(client, "tv")
+    r = client.patch(
+        f"/tickets/{ticket_id}/times", json={"exit_time": "2026-01-05T07:00:00Z"}
+    )
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "INVALID_TICKET_TIMES"
+    r = client.patch(f"/tickets/{ticket_id}/times", json={"entry_time": None})
+    assert r.status_code == 400
+
+    open_id, _, _ = _setup_open_ticket(client, suffix="to")
+    r = client.patch(
+        f"/tickets/{open_id}/times", json={"exit_time": "2030-01-01T00:00:00Z"}
+    )
+    assert r.status_code == 409
+    assert client.patch("/tickets/999999999/times", json={}).status_code == 404
+
+
+def test_reads_use_stored_fee_and_drift_is_flagged(client: TestClient) -> None:
+    """A direct DB edit of exit_time leaves the fee as stored until fixed."""
+    ticket_id, garage_id = _closed_ticket(client, "dr")
+    db = next(client.app.dependency_overrides[get_db]())
+    db.execute(
+        text("UPDATE tickets SET exit_time = :t WHERE id = :id"),
+        {"t": "2026-01-05T12:30:00+00:00", "id": ticket_id},
+    )
+    db.expire_all()
+    r = client.get("/tickets/dashboard", params={"garage_id": garage_id})
+    assert r.headers["X-DB-Query-Count"] == "3"
+    assert float(_dashboard_row(client, garage_id, ticket_id)["fee"]) == pytest.approx(30.0)
+
+    drifted = find_fee_drift(db, garage_id)
+    assert [(row["ticket_id"], float(row["expected_fee"])) for row in drifted] == [
+        (ticket_id, 50.0)
+    ]
+    assert fix_fee_drift(db, drifted) == 1
+    db.flush()
+    assert find_fee_drift(db, garage_id) == []
+    assert float(_dashboard_row(client, garage_id, ticket_id)["fee"]) == pytest.approx(50.0)
+
+
+def test_open_ticket_quotes(client: TestClient) -> None:
+    """Running fees from one query, cached for the minute, dropped on writes."""
+    ticket_id, garage_id, _ = _setup_open_ticket(client, suffix="oq")
+    entry = datetime.now(timezone.utc) - timedelta(hours=2, minutes=30)
+    r = client.patch(f"/tickets/{ticket_id}/times", json={"entry_time": entry.isoformat()})
+    assert r.status_code == 200
+
+    r = client.get("/tickets/open/quotes", params={"garage_id": garage_id})
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "1"
+    body = r.json()
+    assert body["garage_id"] == garage_id
+    [quote] = body["items"]
+    assert quote["ticket_id"] == ticket_id
+    assert 2 * 3600 < quote["elapsed_seconds"] <= 2 * 3600 + 30 * 60
+    assert float(quote["fee_now"]) == pytest.approx(30.0)
+
+    r = client.get("/tickets/open/quotes", params={"garage_id": garage_id})
+    assert r.headers["X-DB-Query-Count"] == "0"
+
+    assert client.post(f"/tickets/{ticket_id}/exit", json={}).status_code == 200
+    r = client.get("/tickets/open/quotes", params={"garage_id": garage_id})
+    assert r.json()["items"] == []
+    assert client.get("/tickets/open/quotes").status_code == 422
+
+
+def test_open_ticket_quotes_price_like_an_exit_at_as_of(client: TestClient) -> None:
+    ticket_id, garage_id, _ = _setup_open_ticket(client, suffix="oa")
+    r = client.patch(
+        f"/tickets/{ticket_id}/times", json={"entry_time": "2026-01-05T08:00:00Z"}
+    )
+    assert r.status_code == 200
+    db = next(client.app.dependency_overrides[get_db]())
+    as_of = datetime(2026, 1, 5, 9, 1, tzinfo=timezone.utc)
+    [quote] = compute_open_quotes(db, garage_id, as_of)
+    assert (quote["elapsed_seconds"], float(quote["fee_now"])) == (3660, 20.0)
+    r = client.post(f"/tickets/{ticket_id}/exit", json={"exit_time": as_of.isoformat()})
+    assert float(r.json()["fee"]) == float(quote["fee_now"])
+
+
+def test_bulk_entry_reports_partial_failures(client: TestClient) -> None:
+    """One free spot left: one ticket, one unknown vehicle, one without a spot."""
+    _, garage_id, vehicle_id = _setup_open_ticket(client, suffix="be")
+    r = client.post(
+        "/tickets/entry/bulk",
+        json={
+            "garage_id": garage_id,
+            "entries": [
+                {"vehicle_id": vehicle_id, "entry_time": "2026-01-05T08:00:00Z"},
+                {"vehicle_id": 999999999},
+                {"vehicle_id": vehicle_id},
+            ],
+        },
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["failed"]) == (1, 2)
+    first, unknown, no_spot = body["results"]
+    assert first["index"] == 0 and first["error"] is None
+    assert first["ticket"]["ticket_state"] == "OPEN"
+    assert first["ticket"]["entry_time"].startswith("2026-01-05T08:00:00")
+    assert first["ticket"]["spot_id"] is not None
+    assert unknown["ticket"] is None
+    assert unknown["error"]["code"] == "VEHICLE_NOT_FOUND"
+    assert no_spot["error"]["code"] == "NO_FREE_SPOTS_AVAILABLE"
+
+    r = client.get("/garages/overview", params={"garage_id": garage_id})
+    assert r.json()[0]["occupied_spots"] == 2
+    r = client.get(f"/tickets/{first['ticket']['id']}")
+    assert r.json()["ticket_token"] == first["ticket"]["ticket_token"]
+
+
+def test_bulk_entry_limits(client: TestClient) -> None:
+    r = client.post("/tickets/entry/bulk", json={"garage_id": 1, "entries": []})
+    assert r.status_code == 422
+    r = client.post(
+        "/tickets/entry/bulk",
+        json={"garage_id": 1, "entries": [{"vehicle_id": 1}] * 501},
+    )
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "TOO_MANY_ENTRIES"
+
+
+def test_bulk_exit_closes_and_prices_together(client: TestClient) -> None:
+    first_id, first_garage, _ = _setup_open_ticket(client, suffix="bx1")
+    second_id, _, _ = _setup_open_ticket(client, suffix="bx2")
+    closed_id, _ = _closed_ticket(client, "bx3")
+    for ticket_id in (first_id, second_id):
+        r = client.patch(
+            f"/tickets/{ticket_id}/times", json={"entry_time": "2026-01-05T08:00:00Z"}
+        )
+        assert r.status_code == 200
+
+    r = client.post(
+        "/tickets/exit/bulk",
+        json={
+            "exits": [
+                {"ticket_id": first_id, "exit_time": "2026-01-05T10:30:00Z"},
+                {"ticket_id": second_id, "exit_time": "2026-01-05T08:20:00Z"},
+                {"ticket_id": closed_id},
+                {"ticket_id": 999999999},
+                {"ticket_id": first_id},
+            ]
+        },
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["closed"], body["failed"]) == (2, 3)
+    first, second, *failed = body["results"]
+    assert first["ticket"]["ticket_state"] == "CLOSED"
+    assert float(first["ticket"]["fee"]) == pytest.approx(30.0)
+    assert float(second["ticket"]["fee"]) == pytest.approx(10.0)
+    assert [(f["ticket_id"], f["error"]["code"]) for f in failed] == [
+        (closed_id, "TICKET_ALREADY_CLOSED"),
+        (999999999, "TICKET_NOT_FOUND"),
+        (first_id, "TICKET_ALREADY_CLOSED"),
+    ]
+
+    r = client.get(f"/tickets/{first_id}")
+    assert r.json()["ticket_state"] == "CLOSED"
+    assert float(r.json()["fee"]) == pytest.approx(30.0)
+    r = client.get("/garages/overview", params={"garage_id": first_garage})
+    assert r.json()[0]["occupied_spots"] == 0
+    r = client.post("/tickets/exit/bulk", json={"exits": [{"ticket_id": 1}] * 501})
+    assert r.json()["error"]["code"] == "TOO_MANY_EXITS"
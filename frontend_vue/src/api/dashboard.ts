@@ -26,3 +26,40 @@ export function getDashboardAnalytics(
     ...config,
   });
 }
+
+export interface TimelineVehicleTypeCounts {
+  vehicle_type: string | null;
+  entries: number;
+  exits: number;
+}
+
+export interface TimelineBucket {
+  bucket_start: string;
+  entries: number;
+  exits: number;
+  peak_occupancy: number;
+  revenue: number;
+  vehicle_types: TimelineVehicleTypeCounts[] | null;
+}
+
+export interface DashboardTimeline {
+  garage_id: number | null;
+  bucket: "hour" | "day";
+  buckets: TimelineBucket[];
+}
+
+export function getDashboardTimeline(
+  params: {
+    garage_id?: number;
+    from: string;
+    to: string;
+    bucket?: "hour" | "day";
+    by_vehicle_type?: boolean;
+  },
+  config?: ApiRequestConfig,
+) {
+  return api.get<DashboardTimeline>("/dashboard/timeline", {
+    params,
+    ...config,
+  });
+}
@@ -0,0 +1,102 @@
+import { baseURL } from "./client";
+import { getStoredToken } from "./auth-storage";
+
+const apiKey = import.meta.env.VITE_API_KEY || "";
+
+/** One message from GET /events/dashboard (`reset` means events were missed). */
+export interface DashboardEvent {
+  id: string | null;
+  type: string;
+  data: Record<string, unknown>;
+}
+
+export interface DashboardStreamOptions {
+  garageId?: number;
+  lastEventId?: string | null;
+  signal: AbortSignal;
+  onOpen?: () => void;
+  onEvent: (event: DashboardEvent) => void;
+  /** Server-requested reconnect delay (`retry:` field), milliseconds. */
+  onRetry?: (ms: number) => void;
+}
+
+/** Same auth as the axios client: Bearer token when present, else X-API-Key. */
+function authHeaders(): Record<string, string> {
+  const token = getStoredToken();
+  if (token) return { Authorization: `Bearer ${token}` };
+  return apiKey ? { "X-API-Key": apiKey } : {};
+}
+
+/**
+ * Read the dashboard change stream with fetch. EventSource cannot send the
+ * auth headers, so the text/event-stream frames are parsed here.
+ * Resolves when the server closes the stream; rejects on HTTP or network errors.
+ */
+export async function streamDashboardEvents(
+  options: DashboardStreamOptions,
+): Promise<void> {
+  const url = new URL("/events/dashboard", baseURL);
+  if (options.garageId != null) {
+    url.searchParams.set("garage_id", String(options.garageId));
+  }
+  const headers: Record<string, string> = {
+    Accept: "text/event-stream",
+    ...authHeaders(),
+  };
+  if (options.lastEventId) headers["Last-Event-ID"] = options.lastEventId;
+
+  const response = await fetch(url, {
+    headers,
+    cache: "no-store",
+    signal: options.signal,
+  });
+  if (response.status === 401 && typeof window !== "undefined") {
+    window.dispatchEvent(new CustomEvent("session-expired"));
+  }
+  if (!response.ok || !response.body) {
+    throw new Error(`Event stream failed: HTTP ${response.status}`);
+  }
+  options.onOpen?.();
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value.replace(/\r\n?/g, "\n");
+    let end = buffer.indexOf("\n\n");
+    while (end !== -1) {
+      dispatchFrame(buffer.slice(0, end), options);
+      buffer = buffer.slice(end + 2);
+      end = buffer.indexOf("\n\n");
+    }
+  }
+}
+
+function dispatchFrame(frame: string, options: DashboardStreamOptions) {
+  let id: string | null = null;
+  let type = "message";
+  const data: string[] = [];
+  for (const line of frame.split("\n")) {
+    // Lines starting with ":" are comments (heartbeats).
+    if (!line || line.startsWith(":")) continue;
+    const colon = line.indexOf(":");
+    const field = colon === -1 ? line : line.slice(0, colon);
+    let value = colon === -1 ? "" : line.slice(colon + 1);
+    if (value.startsWith(" ")) value = value.slice(1);
+    if (field === "id") id = value;
+    else if (field === "event") type = value;
+    else if (field === "data") data.push(value);
+    else if (field === "retry" && /^\d+$/.test(value)) {
+      options.onRetry?.(Number(value));
+    }
+  }
+  if (!data.length) return;
+  let payload: Record<string, unknown> = {};
+  try {
+    payload = JSON.parse(data.join("\n"));
+  } catch {
+    // keep the event with empty data; the refresh does not need it
+  }
+  options.onEvent({ id, type, data: payload });
+}
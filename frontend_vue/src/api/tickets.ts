@@ -58,6 +58,28 @@ export function listTicketsDashboard(
   })
 }
 
+export interface OpenTicketQuote {
+  ticket_id: number
+  entry_time: string
+  elapsed_seconds: number
+  /** Fee if the ticket exited at `as_of` (decimal string). */
+  fee_now: string
+}
+
+export interface OpenTicketQuotes {
+  garage_id: number
+  /** Start of the UTC minute the quotes are for (cached server-side per minute). */
+  as_of: string
+  items: OpenTicketQuote[]
+}
+
+export function getOpenTicketQuotes(garageId: number, config?: ApiRequestConfig) {
+  return api.get<OpenTicketQuotes>('/tickets/open/quotes', {
+    params: { garage_id: garageId },
+    ...config,
+  })
+}
+
 export function getTicket(id: number, config?: ApiRequestConfig) {
   return api.get<TicketResponse>(`/tickets/${id}`, config)
 }
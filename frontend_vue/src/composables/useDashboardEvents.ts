@@ -0,0 +1,133 @@
+import { ref, watch, onMounted, onUnmounted } from "vue";
+import type { Ref } from "vue";
+import { streamDashboardEvents } from "../api/events.ts";
+
+const DEFAULT_RETRY_MS = 3_000;
+const MAX_RETRY_MS = 30_000;
+/** Bursts of events (bulk entry, a payment plus its ticket) refresh once. */
+const COALESCE_MS = 300;
+
+/**
+ * Keep the dashboard change stream open while enabled and the tab is visible.
+ * `connected` is true while events are arriving; callers poll only when it is false.
+ */
+export function useDashboardEvents(
+  refresh: () => void,
+  options?: { enabled?: Ref<boolean> }
+) {
+  const enabled = options?.enabled;
+
+  const connected = ref(false);
+
+  let controller: AbortController | null = null;
+  let lastEventId: string | null = null;
+  let retryMs = DEFAULT_RETRY_MS;
+  let failures = 0;
+  let retryId: ReturnType<typeof setTimeout> | null = null;
+  let coalesceId: ReturnType<typeof setTimeout> | null = null;
+
+  function isAllowed(): boolean {
+    return (
+      (enabled === undefined || enabled.value) &&
+      document.visibilityState === "visible"
+    );
+  }
+
+  function scheduleRefresh() {
+    if (coalesceId) return;
+    coalesceId = setTimeout(() => {
+      coalesceId = null;
+      refresh();
+    }, COALESCE_MS);
+  }
+
+  function scheduleReconnect() {
+    if (retryId || !isAllowed()) return;
+    // back off while the server stays down, from the server's retry: value
+    const delay = Math.min(MAX_RETRY_MS, retryMs * 2 ** Math.min(failures, 4));
+    retryId = setTimeout(() => {
+      retryId = null;
+      connect();
+    }, delay);
+  }
+
+  async function connect() {
+    if (controller || !isAllowed()) return;
+    const current = new AbortController();
+    controller = current;
+    try {
+      await streamDashboardEvents({
+        lastEventId,
+        signal: current.signal,
+        onOpen: () => {
+          failures = 0;
+          connected.value = true;
+        },
+        onRetry: (ms) => {
+          retryMs = ms;
+        },
+        onEvent: (event) => {
+          if (event.id) lastEventId = event.id;
+          scheduleRefresh();
+        },
+      });
+    } catch {
+      failures += 1;
+    } finally {
+      if (controller === current) {
+        controller = null;
+        connected.value = false;
+        if (!current.signal.aborted) scheduleReconnect();
+      }
+    }
+  }
+
+  function disconnect() {
+    if (retryId) {
+      clearTimeout(retryId);
+      retryId = null;
+    }
+    if (controller) {
+      const current = controller;
+      controller = null;
+      current.abort();
+    }
+    connected.value = false;
+  }
+
+  function onVisibilityChange() {
+    if (document.visibilityState === "visible") {
+      connect();
+    } else {
+      disconnect();
+    }
+  }
+
+  onMounted(() => {
+    connect();
+    document.addEventListener("visibilitychange", onVisibilityChange);
+  });
+
+  if (enabled !== undefined) {
+    watch(enabled, (on) => {
+      if (on) {
+        connect();
+      } else {
+        disconnect();
+      }
+    });
+  }
+
+  onUnmounted(() => {
+    disconnect();
+    if (coalesceId) {
+      clearTimeout(coalesceId);
+      coalesceId = null;
+    }
+    document.removeEventListener("visibilitychange", onVisibilityChange);
+  });
+
+  return {
+    connected,
+  };
+}
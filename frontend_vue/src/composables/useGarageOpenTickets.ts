@@ -1,5 +1,5 @@
 import { ref, computed, reactive, type ComputedRef } from "vue";
-import { listTicketsDashboard } from "../api/tickets";
+import { getOpenTicketQuotes, listTicketsDashboard } from "../api/tickets";
 import type { TicketDashboardRow } from "../api/tickets";
 
 function isCanceled(err: unknown): boolean {
@@ -8,6 +8,8 @@ function isCanceled(err: unknown): boolean {
 
 export function useGarageOpenTickets(garageId: ComputedRef<number | null>) {
   const openTickets = ref<TicketDashboardRow[]>([]);
+  /** Running fee per open ticket id, from GET /tickets/open/quotes. */
+  const feeNow = ref<Record<number, string>>({});
   const page = ref(1);
   const pageSize = ref(10);
   const total = ref(0);
@@ -22,6 +24,7 @@ export function useGarageOpenTickets(garageId: ComputedRef<number | null>) {
     const id = garageId.value;
     if (!id) {
       openTickets.value = [];
+      feeNow.value = {};
       total.value = 0;
       loading.value = false;
       refreshing.value = false;
@@ -37,16 +40,22 @@ export function useGarageOpenTickets(garageId: ComputedRef<number | null>) {
     }
 
     try {
-      const res = await listTicketsDashboard(
-        {
-          garage_id: id,
-          ticket_state: "OPEN",
-          limit: pageSize.value,
-          offset: offset.value,
-        },
-        { signal },
-      );
+      const [res, quotes] = await Promise.all([
+        listTicketsDashboard(
+          {
+            garage_id: id,
+            ticket_state: "OPEN",
+            limit: pageSize.value,
+            offset: offset.value,
+          },
+          { signal },
+        ),
+        getOpenTicketQuotes(id, { signal }),
+      ]);
       openTickets.value = res.data.items;
+      feeNow.value = Object.fromEntries(
+        quotes.data.items.map((q) => [q.ticket_id, q.fee_now]),
+      );
       total.value = res.data.total;
       error.value = false;
       hasLoadedOnce.value = true;
@@ -55,6 +64,7 @@ export function useGarageOpenTickets(garageId: ComputedRef<number | null>) {
       error.value = true;
       if (!hadData) {
         openTickets.value = [];
+        feeNow.value = {};
         total.value = 0;
       }
     } finally {
@@ -65,6 +75,7 @@ export function useGarageOpenTickets(garageId: ComputedRef<number | null>) {
 
   return reactive({
     openTickets,
+    feeNow,
     page,
     pageSize,
     total,